@@ -26,15 +26,29 @@ theme_set(theme_minimal(base_size = 12) +
 # ============================================================================
 
 cat("Loading HackerOne reports data...\n")
-data <- fromJSON("../scrape/hackerone_reports_combined.json", flatten = TRUE)
 
-# Convert to data frame
-df <- as.data.frame(data)
+# Prefer the partitioned Parquet dataset written by merge_reports.py --parquet:
+# only the needed columns are read, and year partitions before 2020 (dropped below anyway) are
+# pruned on load
+parquet_dir <- "../scrape/hackerone_reports_parquet"
+
+if (dir.exists(parquet_dir) && requireNamespace("arrow", quietly = TRUE)) {
+  df <- arrow::open_dataset(parquet_dir) %>%
+    filter(year >= 2020) %>%
+    select(team, title, url, date_raw, severity, bounty, original_report) %>%
+    collect() %>%
+    as.data.frame()
+} else {
+  data <- fromJSON("../scrape/hackerone_reports_combined.json", flatten = TRUE)
 
-cat(sprintf("Loaded %d reports\n", nrow(df)))
+  # Convert to data frame
+  df <- as.data.frame(data)
+
+  # Extract raw dates
+  df$date_raw <- df$hacktivity_metadata.date
+}
 
-# Extract and parse dates
-df$date_raw <- df$hacktivity_metadata.date
+cat(sprintf("Loaded %d reports\n", nrow(df)))
 
 # Parse dates - handle various formats
 df$date <- mdy_hms(df$date_raw, quiet = TRUE)
@@ -49,6 +63,39 @@ df$year <- year(df$date)
 df$year_month <- floor_date(df$date, "month")
 df$quarter <- quarter(df$date, with_year = TRUE)
 
+# Per-report features precomputed by scrape/metrics.py (one batch pass over the corpus).
+# Metrics found here are not recomputed below.
+features_file <- "../scrape/hackerone_reports_features.csv"
+if (file.exists(features_file)) {
+  features <- read.csv(features_file, stringsAsFactors = FALSE)
+  df <- left_join(df, features, by = "url")
+  cat(sprintf("Joined precomputed features for %d reports\n", sum(!is.na(df$char_count))))
+}
+
+# Metric rollup cube from scrape/rollups.py: (team, year, quarter, month) x metric -> n, sum,
+# sum of squares, min, max. When present, the yearly and monthly summaries below are lookups
+# into it instead of rescans of df.
+rollups_file <- "../scrape/hackerone_metric_rollups.csv"
+rollups <- if (file.exists(rollups_file)) read.csv(rollups_file, stringsAsFactors = FALSE) else NULL
+
+has_rollup <- function(metric_name) {
+  !is.null(rollups) && metric_name %in% rollups$metric
+}
+
+# Merge cube cells up to the given grouping and derive mean, sd and se
+rollup_summary <- function(metric_name, ...) {
+  rollups %>%
+    filter(metric == metric_name, year >= 2020) %>%
+    mutate(month = as.Date(sprintf("%d-%02d-01", year, month))) %>%
+    group_by(...) %>%
+    summarize(count = sum(n), total = sum(sum), total_sq = sum(sumsq), .groups = "drop") %>%
+    mutate(
+      avg = total / count,
+      sd = sqrt(pmax(total_sq - total^2 / count, 0) / (count - 1)),
+      se = sd / sqrt(count)
+    )
+}
+
 # Filter out years with insufficient data (2019 and earlier have sparse data)
 # Focus on 2020+ for more reliable trends
 cat(sprintf("Loaded %d reports from %s to %s\n", 
@@ -75,21 +122,38 @@ cat("\n")
 
 cat("\n[1/6] Analyzing sentiment and politeness...\n")
 
-# Calculate sentiment scores using sentimentr
-# sentiment_by() aggregates sentence-level scores by element_id (document)
-sentiment_results <- sentiment_by(get_sentences(df$original_report))
-df$sentiment_score <- sentiment_results$ave_sentiment
+# Sentiment scores come from scrape/metrics.py --sentiment when available: sentences are
+# scored once per report body (cached by content hash), and both the yearly view and the
+# 2025 monthly breakdown below use the same per-document aggregate.
+# metrics.py scores sentences with VADER (compound, -1..1), not sentimentr, so the two are on
+# different scales; sentiment_method names the one actually plotted (the rollup cube is built
+# from the same feature table)
+if ("sentiment_score" %in% names(df)) {
+  sentiment_method <- "VADER"
+} else {
+  # Calculate sentiment scores using sentimentr
+  # sentiment_by() aggregates sentence-level scores by element_id (document)
+  sentiment_results <- sentiment_by(get_sentences(df$original_report))
+  df$sentiment_score <- sentiment_results$ave_sentiment
+  sentiment_method <- "sentimentr"
+}
 
 # Aggregate by year
-sentiment_by_year <- df %>%
-  group_by(year) %>%
-  summarize(
-    avg_sentiment = mean(sentiment_score, na.rm = TRUE),
-    sd_sentiment = sd(sentiment_score, na.rm = TRUE),
-    se_sentiment = sd(sentiment_score, na.rm = TRUE) / sqrt(n()),
-    count = n()
-  ) %>%
-  filter(count >= 7)  # Only years with sufficient data
+if (has_rollup("sentiment_score")) {
+  sentiment_by_year <- rollup_summary("sentiment_score", year) %>%
+    transmute(year, avg_sentiment = avg, sd_sentiment = sd, se_sentiment = se, count) %>%
+    filter(count >= 7)  # Only years with sufficient data
+} else {
+  sentiment_by_year <- df %>%
+    group_by(year) %>%
+    summarize(
+      avg_sentiment = mean(sentiment_score, na.rm = TRUE),
+      sd_sentiment = sd(sentiment_score, na.rm = TRUE),
+      se_sentiment = sd(sentiment_score, na.rm = TRUE) / sqrt(n()),
+      count = n()
+    ) %>%
+    filter(count >= 7)  # Only years with sufficient data
+}
 
 # Create visualization using sentiment score with error bars
 p1 <- ggplot(sentiment_by_year, aes(x = year, y = avg_sentiment)) +
@@ -101,7 +165,7 @@ p1 <- ggplot(sentiment_by_year, aes(x = year, y = avg_sentiment)) +
   geom_smooth(method = "lm", se = TRUE, color = "#A23B72", linetype = "dashed") +
   labs(
     title = "Sentiment Analysis Over Time",
-    subtitle = "Average sentiment score using sentimentr - Shaded area shows standard error",
+    subtitle = sprintf("Average sentiment score using %s - Shaded area shows standard error", sentiment_method),
     x = "Year",
     y = "Sentiment Score"
   ) +
@@ -121,10 +185,10 @@ p1_standalone <- ggplot(sentiment_by_year, aes(x = year, y = avg_sentiment)) +
               linetype = "dashed", size = 1.5) +
   labs(
     title = "AI Sentiment Signature: Reports Are Getting More Positive",
-    subtitle = "Sentiment score using sentimentr package's sentence-level analysis",
+    subtitle = sprintf("Sentiment score using %s sentence-level analysis", sentiment_method),
     x = "Year",
     y = "Average Sentiment Score",
-    caption = "Source: HackerOne Public Reports | Analyzed with sentimentr"
+    caption = paste("Source: HackerOne Public Reports | Analyzed with", sentiment_method)
   ) +
   theme_minimal(base_size = 16) +
   theme(
@@ -151,17 +215,25 @@ cat("  Saved: metric_1_sentiment.png\n")
 cat("  Creating 2025 monthly sentiment breakdown...\n")
 
 # Filter for 2025 data and aggregate by month
-sentiment_2025 <- df %>%
-  filter(year == 2025) %>%
-  mutate(month = floor_date(date, "month")) %>%
-  group_by(month) %>%
-  summarize(
-    avg_sentiment = mean(sentiment_score, na.rm = TRUE),
-    sd_sentiment = sd(sentiment_score, na.rm = TRUE),
-    se_sentiment = sd(sentiment_score, na.rm = TRUE) / sqrt(n()),
-    count = n()
-  ) %>%
-  filter(count >= 3)  # Only months with sufficient data
+if (has_rollup("sentiment_score")) {
+  # Same cube as the yearly view, just grouped by month
+  sentiment_2025 <- rollup_summary("sentiment_score", year, month) %>%
+    filter(year == 2025) %>%
+    transmute(month, avg_sentiment = avg, sd_sentiment = sd, se_sentiment = se, count) %>%
+    filter(count >= 3)  # Only months with sufficient data
+} else {
+  sentiment_2025 <- df %>%
+    filter(year == 2025) %>%
+    mutate(month = floor_date(date, "month")) %>%
+    group_by(month) %>%
+    summarize(
+      avg_sentiment = mean(sentiment_score, na.rm = TRUE),
+      sd_sentiment = sd(sentiment_score, na.rm = TRUE),
+      se_sentiment = sd(sentiment_score, na.rm = TRUE) / sqrt(n()),
+      count = n()
+    ) %>%
+    filter(count >= 3)  # Only months with sufficient data
+}
 
 # Create 2025 monthly visualization
 if (nrow(sentiment_2025) > 0) {
@@ -184,7 +256,7 @@ if (nrow(sentiment_2025) > 0) {
       subtitle = "Month-by-month sentiment analysis for 2025 reports",
       x = "Month",
       y = "Average Sentiment Score",
-      caption = "Source: HackerOne Public Reports | Analyzed with sentimentr"
+      caption = paste("Source: HackerOne Public Reports | Analyzed with", sentiment_method)
     ) +
     scale_x_date(date_breaks = "1 month", date_labels = "%b\n%Y") +
     theme_minimal(base_size = 16) +
@@ -234,29 +306,41 @@ count_typos <- function(text) {
   sum(!misspelled)
 }
 
-# Sample for performance reasons, as typo checking is expensive
-set.seed(42)
-if (nrow(df) > 500) {
-  sample_idx <- sample(nrow(df), 500)
-  df_sample <- df[sample_idx, ]
-} else {
+if ("typo_rate" %in% names(df)) {
+  # Full-corpus typo rates from scrape/metrics.py --typos (vocabulary checked once, memoized)
+  cat("  Using precomputed typo rates for all reports...\n")
   df_sample <- df
+} else {
+  # Sample for performance reasons, as typo checking is expensive
+  set.seed(42)
+  if (nrow(df) > 500) {
+    sample_idx <- sample(nrow(df), 500)
+    df_sample <- df[sample_idx, ]
+  } else {
+    df_sample <- df
+  }
+
+  # Calculate typo rates on sample
+  cat("  Checking spelling on sample...\n")
+  df_sample$typo_count <- sapply(df_sample$original_report, count_typos)
+  df_sample$word_count <- str_count(df_sample$original_report, "\\b[A-Za-z]+\\b")
+  df_sample$typo_rate <- (df_sample$typo_count / df_sample$word_count) * 100
 }
 
-# Calculate typo rates on sample
-cat("  Checking spelling on sample...\n")
-df_sample$typo_count <- sapply(df_sample$original_report, count_typos)
-df_sample$word_count <- str_count(df_sample$original_report, "\\b[A-Za-z]+\\b")
-df_sample$typo_rate <- (df_sample$typo_count / df_sample$word_count) * 100
-
 # Aggregate by year
-typo_by_year <- df_sample %>%
-  group_by(year) %>%
-  summarize(
-    avg_typo_rate = mean(typo_rate, na.rm = TRUE),
-    count = n()
-  ) %>%
-  filter(count >= 3)
+if (has_rollup("typo_rate")) {
+  typo_by_year <- rollup_summary("typo_rate", year) %>%
+    transmute(year, avg_typo_rate = avg, count) %>%
+    filter(count >= 3)
+} else {
+  typo_by_year <- df_sample %>%
+    group_by(year) %>%
+    summarize(
+      avg_typo_rate = mean(typo_rate, na.rm = TRUE),
+      count = n()
+    ) %>%
+    filter(count >= 3)
+}
 
 # Create visualization
 p2 <- ggplot(typo_by_year, aes(x = year, y = avg_typo_rate)) +
@@ -326,16 +410,24 @@ detect_mixed_case <- function(text) {
   mixed_case_count / length(sentences)
 }
 
-df$mixed_case_ratio <- sapply(df$original_report, detect_mixed_case)
+if (!"mixed_case_ratio" %in% names(df)) {
+  df$mixed_case_ratio <- sapply(df$original_report, detect_mixed_case)
+}
 
 # Aggregate by year
-mixed_case_by_year <- df %>%
-  group_by(year) %>%
-  summarize(
-    avg_mixed_case = mean(mixed_case_ratio, na.rm = TRUE),
-    count = n()
-  ) %>%
-  filter(count >= 7)
+if (has_rollup("mixed_case_ratio")) {
+  mixed_case_by_year <- rollup_summary("mixed_case_ratio", year) %>%
+    transmute(year, avg_mixed_case = avg, count) %>%
+    filter(count >= 7)
+} else {
+  mixed_case_by_year <- df %>%
+    group_by(year) %>%
+    summarize(
+      avg_mixed_case = mean(mixed_case_ratio, na.rm = TRUE),
+      count = n()
+    ) %>%
+    filter(count >= 7)
+}
 
 # Create visualization
 p3 <- ggplot(mixed_case_by_year, aes(x = year, y = avg_mixed_case)) +
@@ -388,24 +480,35 @@ cat("  Saved: metric_3_mixed_case.png\n")
 
 cat("[4/6] Counting em dashes and en dashes...\n")
 
-# Count various dash types
-df$em_dash_count <- str_count(df$original_report, "—")  # Em dash
-df$en_dash_count <- str_count(df$original_report, "–")  # En dash
-df$total_dashes <- df$em_dash_count + df$en_dash_count
+if (!"dashes_per_1k" %in% names(df)) {
+  # Count various dash types
+  df$em_dash_count <- str_count(df$original_report, "—")  # Em dash
+  df$en_dash_count <- str_count(df$original_report, "–")  # En dash
+  df$total_dashes <- df$em_dash_count + df$en_dash_count
 
-# Normalize by text length
-df$dashes_per_1k <- (df$total_dashes / nchar(df$original_report)) * 1000
+  # Normalize by text length
+  df$dashes_per_1k <- (df$total_dashes / nchar(df$original_report)) * 1000
+}
 
 # Aggregate by year
-dashes_by_year <- df %>%
-  group_by(year) %>%
-  summarize(
-    avg_dashes = mean(dashes_per_1k, na.rm = TRUE),
-    avg_em_dash = mean((em_dash_count / nchar(original_report)) * 1000, na.rm = TRUE),
-    avg_en_dash = mean((en_dash_count / nchar(original_report)) * 1000, na.rm = TRUE),
-    count = n()
-  ) %>%
-  filter(count >= 7)
+if (has_rollup("dashes_per_1k")) {
+  dashes_by_year <- rollup_summary("dashes_per_1k", year) %>%
+    transmute(year, avg_dashes = avg, count) %>%
+    left_join(rollup_summary("em_dashes_per_1k", year) %>% transmute(year, avg_em_dash = avg), by = "year") %>%
+    left_join(rollup_summary("en_dashes_per_1k", year) %>% transmute(year, avg_en_dash = avg), by = "year") %>%
+    select(year, avg_dashes, avg_em_dash, avg_en_dash, count) %>%
+    filter(count >= 7)
+} else {
+  dashes_by_year <- df %>%
+    group_by(year) %>%
+    summarize(
+      avg_dashes = mean(dashes_per_1k, na.rm = TRUE),
+      avg_em_dash = mean((em_dash_count / nchar(original_report)) * 1000, na.rm = TRUE),
+      avg_en_dash = mean((en_dash_count / nchar(original_report)) * 1000, na.rm = TRUE),
+      count = n()
+    ) %>%
+    filter(count >= 7)
+}
 
 # Create visualization
 p4 <- ggplot(dashes_by_year, aes(x = year, y = avg_dashes)) +
@@ -459,8 +562,10 @@ cat("  Saved: metric_4_dashes.png\n")
 cat("[5/6] Analyzing report lengths...\n")
 
 # Calculate character and word counts
-df$char_count <- nchar(df$original_report)
-df$word_count_total <- str_count(df$original_report, "\\S+")
+if (!"word_count_total" %in% names(df)) {
+  df$char_count <- nchar(df$original_report)
+  df$word_count_total <- str_count(df$original_report, "\\S+")
+}
 
 # Aggregate by year
 length_by_year <- df %>%
@@ -543,17 +648,25 @@ count_bullets <- function(text) {
   bullets + numbered + markdown
 }
 
-df$bullet_count <- sapply(df$original_report, count_bullets)
-df$bullets_per_1k <- (df$bullet_count / df$char_count) * 1000
+if (!"bullets_per_1k" %in% names(df)) {
+  df$bullet_count <- sapply(df$original_report, count_bullets)
+  df$bullets_per_1k <- (df$bullet_count / df$char_count) * 1000
+}
 
 # Aggregate by year
-bullets_by_year <- df %>%
-  group_by(year) %>%
-  summarize(
-    avg_bullets = mean(bullets_per_1k, na.rm = TRUE),
-    count = n()
-  ) %>%
-  filter(count >= 7)
+if (has_rollup("bullets_per_1k")) {
+  bullets_by_year <- rollup_summary("bullets_per_1k", year) %>%
+    transmute(year, avg_bullets = avg, count) %>%
+    filter(count >= 7)
+} else {
+  bullets_by_year <- df %>%
+    group_by(year) %>%
+    summarize(
+      avg_bullets = mean(bullets_per_1k, na.rm = TRUE),
+      count = n()
+    ) %>%
+    filter(count >= 7)
+}
 
 # Create visualization
 p6 <- ggplot(bullets_by_year, aes(x = year, y = avg_bullets)) +
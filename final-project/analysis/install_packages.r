@@ -15,7 +15,8 @@ packages <- c(
   "scales",
   "gridExtra",
   "viridis",
-  "patchwork"
+  "patchwork",
+  "arrow"
 )
 
 # Function to install if not already installed
@@ -0,0 +1,240 @@
+"""
+Feedback controller for the number of pages the Playwright spiders render in parallel
+
+Every interval the controller looks at the p95 download/render latency and the error rate
+(timeouts, "Connection closed", ...) of the requests finished since its last decision. While both
+stay under their thresholds it adds one parallel page; when either is exceeded it halves the
+concurrency (AIMD, as TCP congestion control does).
+
+ConcurrencyController holds the decision logic and knows nothing about Scrapy, so it can be driven
+directly, e.g. against a local stub server. AdaptiveConcurrency is the Scrapy extension applying
+its decisions to the downloader slots.
+
+Settings:
+    ADAPTIVE_CONCURRENCY_ENABLED         turn the controller on (default False)
+    ADAPTIVE_CONCURRENCY_MIN / _MAX      bounds on parallel pages per domain (default 1 / 8)
+    ADAPTIVE_CONCURRENCY_TARGET_P95      p95 latency threshold in seconds (default 15)
+    ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE  error rate threshold (default 0.1)
+    ADAPTIVE_CONCURRENCY_INTERVAL        seconds between decisions (default 20)
+    ADAPTIVE_CONCURRENCY_MIN_SAMPLES     finished requests needed before deciding (default 4)
+"""
+
+import logging
+import math
+import time
+from typing import Dict, List, Optional
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TARGET_P95 = 15.0
+DEFAULT_MAX_ERROR_RATE = 0.1
+DEFAULT_INTERVAL = 20.0
+DEFAULT_MIN_SAMPLES = 4
+
+# Requests with no response after this long failed; their start times are dropped
+STALE_REQUEST_SECONDS = 300
+
+# Custom signal for failures a spider handled itself (e.g. a wait_for_selector timeout): error=<exception>
+render_failed = object()
+
+# Failures that indicate an overloaded browser or site rather than a broken page; the last three
+# are how Chromium and http.client report a connection dropped without a response
+OVERLOAD_ERROR_MARKERS = ('timeout', 'connection closed', 'target closed', 'browser has been closed',
+                          'err_connection_closed', 'err_empty_response', 'closed connection')
+
+
+def is_overload_error(error) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in OVERLOAD_ERROR_MARKERS)
+
+
+def record_render_failure(crawler, error) -> None:
+    """Report a failure the spider caught itself; a no-op when the controller is not enabled"""
+    crawler.signals.send_catch_log(signal=render_failed, error=error)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class ConcurrencyController:
+    """AIMD controller: +1 while p95 latency and error rate are under target, halve otherwise"""
+
+    def __init__(self, start: int, minimum: int = DEFAULT_MIN_CONCURRENCY, maximum: int = DEFAULT_MAX_CONCURRENCY,
+                 target_p95: float = DEFAULT_TARGET_P95, max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+                 min_samples: int = DEFAULT_MIN_SAMPLES):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.concurrency = min(max(start, self.minimum), self.maximum)
+        self.target_p95 = target_p95
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.latencies: List[float] = []
+        self.finished = 0
+        self.errors = 0
+        self.history: List[Dict] = []
+
+    def observe(self, latency: Optional[float] = None, error: bool = False) -> None:
+        """Record one finished request; latency is None when it failed before a response"""
+        self.finished += 1
+        if latency is not None:
+            self.latencies.append(latency)
+        if error:
+            self.errors += 1
+
+    def decide(self) -> Optional[Dict]:
+        """Pick the next concurrency from the current window and start a new one
+
+        Returns the decision (from, to, requests, errors, p95, reason), or None when the window
+        has too few finished requests to judge.
+        """
+        if self.finished < self.min_samples and not self.errors:
+            return None
+
+        p95 = percentile(self.latencies, 0.95)
+        error_rate = self.errors / max(self.finished, 1)
+        previous = self.concurrency
+
+        if error_rate > self.max_error_rate:
+            self.concurrency = max(self.minimum, previous // 2)
+            reason = f"error rate {error_rate:.0%} > {self.max_error_rate:.0%}"
+        elif p95 is not None and p95 > self.target_p95:
+            self.concurrency = max(self.minimum, previous // 2)
+            reason = f"p95 {p95:.2f}s > {self.target_p95:.2f}s"
+        else:
+            self.concurrency = min(self.maximum, previous + 1)
+            reason = f"p95 {p95 or 0:.2f}s and error rate {error_rate:.0%} under target"
+
+        decision = {
+            'time': time.time(), 'from': previous, 'to': self.concurrency,
+            'requests': self.finished, 'errors': self.errors, 'p95': p95, 'reason': reason,
+        }
+        self.history.append(decision)
+        self.latencies, self.finished, self.errors = [], 0, 0
+        return decision
+
+
+class AdaptiveConcurrency:
+    """Applies ConcurrencyController decisions to the downloader's per-domain slot concurrency
+
+    CONCURRENT_REQUESTS must be at least ADAPTIVE_CONCURRENCY_MAX for increases to take effect;
+    install_adaptive_concurrency() sets that up from a spider's from_crawler.
+    """
+
+    def __init__(self, crawler, controller: ConcurrencyController, interval: float = DEFAULT_INTERVAL):
+        self.crawler = crawler
+        self.controller = controller
+        self.interval = interval
+        self.request_started: Dict = {}
+        self.seen_exceptions = 0
+        self.loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED', False):
+            raise NotConfigured
+        controller = ConcurrencyController(
+            start=settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN'),
+            minimum=settings.getint('ADAPTIVE_CONCURRENCY_MIN', DEFAULT_MIN_CONCURRENCY),
+            maximum=settings.getint('ADAPTIVE_CONCURRENCY_MAX', DEFAULT_MAX_CONCURRENCY),
+            target_p95=settings.getfloat('ADAPTIVE_CONCURRENCY_TARGET_P95', DEFAULT_TARGET_P95),
+            max_error_rate=settings.getfloat('ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE', DEFAULT_MAX_ERROR_RATE),
+            min_samples=settings.getint('ADAPTIVE_CONCURRENCY_MIN_SAMPLES', DEFAULT_MIN_SAMPLES),
+        )
+        extension = cls(crawler, controller, settings.getfloat('ADAPTIVE_CONCURRENCY_INTERVAL', DEFAULT_INTERVAL))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.render_failed, signal=render_failed)
+        return extension
+
+    def request_reached_downloader(self, request, spider):
+        self.request_started[request] = time.perf_counter()
+        # Slots created after the last decision start at CONCURRENT_REQUESTS_PER_DOMAIN; bring them in line
+        # before the downloader processes their queue
+        downloader = self.crawler.engine.downloader
+        slot = downloader.slots.get(request.meta.get(downloader.DOWNLOAD_SLOT))
+        if slot is not None and slot.concurrency != self.controller.concurrency:
+            slot.concurrency = self.controller.concurrency
+
+    def response_received(self, response, request, spider):
+        start = self.request_started.pop(request, None)
+        if start is not None:
+            self.controller.observe(time.perf_counter() - start)
+
+    def render_failed(self, error):
+        # Counted as a finished request of its own, so a window's error rate never exceeds 100%
+        if is_overload_error(error):
+            self.controller.observe(error=True)
+
+    def spider_opened(self, spider):
+        self.loop = task.LoopingCall(self.adjust)
+        self.loop.start(self.interval, now=False)
+        logger.info(f"Adaptive concurrency starting at {self.controller.concurrency} "
+                    f"(range {self.controller.minimum}-{self.controller.maximum})")
+
+    def collect_download_failures(self):
+        """Count downloads that raised (timeouts, closed connections) since the last decision"""
+        exceptions = self.crawler.stats.get_value('downloader/exception_count', 0)
+        for _ in range(exceptions - self.seen_exceptions):
+            self.controller.observe(error=True)
+        self.seen_exceptions = exceptions
+
+        # Failed requests never get a response, so forget their start times eventually
+        cutoff = time.perf_counter() - STALE_REQUEST_SECONDS
+        for request in [request for request, start in self.request_started.items() if start < cutoff]:
+            del self.request_started[request]
+
+    def adjust(self):
+        self.collect_download_failures()
+        decision = self.controller.decide()
+        if decision is None:
+            return
+        self.apply(decision['to'])
+
+        stats = self.crawler.stats
+        stats.set_value('adaptive_concurrency/current', decision['to'])
+        stats.max_value('adaptive_concurrency/max', decision['to'])
+        if decision['to'] != decision['from']:
+            stats.inc_value('adaptive_concurrency/changes')
+            logger.info(f"Adaptive concurrency {decision['from']} -> {decision['to']}: {decision['reason']} "
+                        f"({decision['requests']} requests, {decision['errors']} errors)")
+        else:
+            logger.info(f"Adaptive concurrency holding at {decision['to']}: {decision['reason']}")
+
+    def apply(self, concurrency: int) -> None:
+        for slot in self.crawler.engine.downloader.slots.values():
+            slot.concurrency = concurrency
+
+    def spider_closed(self, spider):
+        if self.loop and self.loop.running:
+            self.loop.stop()
+        changes = sum(1 for entry in self.controller.history if entry['from'] != entry['to'])
+        logger.info(f"Adaptive concurrency finished at {self.controller.concurrency} after {changes} changes")
+
+
+def install_adaptive_concurrency(crawler, maximum: int, start: Optional[int] = None) -> None:
+    """Enable the controller for a spider: allow up to `maximum` requests and let it pick the level
+
+    AutoThrottle is turned off so the two controllers do not fight; DOWNLOAD_DELAY stays as the
+    politeness floor.
+    """
+    settings = crawler.settings
+    settings.set('ADAPTIVE_CONCURRENCY_ENABLED', True, priority='spider')
+    settings.set('ADAPTIVE_CONCURRENCY_MAX', maximum, priority='spider')
+    settings.set('CONCURRENT_REQUESTS', maximum, priority='spider')
+    if start is not None:
+        settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', start, priority='spider')
+    settings.set('AUTOTHROTTLE_ENABLED', False, priority='spider')
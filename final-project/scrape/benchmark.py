@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks of the scrape -> merge -> metrics pipeline on the saved corpus
+
+Each suite runs at 1x, 10x and 100x the corpus (reports replicated under distinct URLs) and is
+timed over several rounds after a warmup, as pytest-benchmark does. Results are written with sorted
+keys, one case per entry, so two runs can be compared with --compare or a plain diff.
+
+Suites:
+    html_to_markdown   report page bodies, rendered as fixture_server.py serves them, to markdown
+    url_content_map    merge_reports.create_url_to_content_map over the content output
+    merge_reports      merge_reports.merge_reports of the reports against that map
+    features           metrics.compute_features (--workers for the process pool)
+    fixture_fetch      report JSON fetched from a local fixture server (--fetch, uses --latency etc.)
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from fixture_server import FixtureCorpus, FixtureServer, render_markdown_html
+from merge_reports import create_url_to_content_map, merge_reports
+from metrics import compute_features
+from report_store import CONTENT_JSON_FILE, REPORTS_FILE, load_records
+
+RESULTS_FILE = 'benchmark_results.json'
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_ROUNDS = 5
+WARMUP_ROUNDS = 1
+
+# Median slowdown reported as a regression by --compare
+DEFAULT_THRESHOLD = 0.10
+
+SUITES = ['html_to_markdown', 'url_content_map', 'merge_reports', 'features']
+
+
+def scale_records(records: List[Dict[str, Any]], factor: int) -> List[Dict[str, Any]]:
+    """Replicate records `factor` times, giving each copy beyond the first its own URL"""
+    scaled = list(records)
+    for copy in range(1, factor):
+        for record in records:
+            replica = dict(record)
+            if replica.get('url'):
+                replica['url'] = f"{replica['url']}-{copy}"
+            scaled.append(replica)
+    return scaled
+
+
+def run_case(func: Callable[[], Any], rounds: int, warmup: int = WARMUP_ROUNDS) -> Dict[str, Any]:
+    """Time `func` over `rounds` runs after `warmup` untimed ones"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        'rounds': rounds,
+        'min': min(times),
+        'max': max(times),
+        'mean': statistics.mean(times),
+        'median': statistics.median(times),
+        'stddev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def html_case(content: List[Dict[str, Any]]) -> Optional[Callable[[], Any]]:
+    try:
+        from html_convert import html_to_markdown
+    except ImportError as e:
+        print(f"Skipping html_to_markdown: {e}")
+        return None
+    pages = [render_markdown_html(item['original_report']) for item in content if item.get('original_report')]
+    return lambda: [html_to_markdown(page) for page in pages]
+
+
+def fetch_case(corpus: FixtureCorpus, args) -> Tuple[Callable[[], Any], FixtureServer]:
+    server = FixtureServer(corpus, port=0, latency=args.latency, jitter=args.jitter,
+                           failure_rate=args.failure_rate, drop_rate=args.drop_rate, seed=0).start_background()
+    urls = [f'{server.base_url}{path}.json' for path in sorted(corpus.bodies)]
+
+    def fetch(url):
+        try:
+            with urlopen(url, timeout=30) as response:
+                return len(response.read())
+        except (URLError, ConnectionError):
+            return None
+
+    def fetch_all():
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            return list(pool.map(fetch, urls))
+
+    return fetch_all, server
+
+
+def run_suites(reports: List[Dict[str, Any]], content: List[Dict[str, Any]], args) -> Dict[str, Dict[str, Any]]:
+    results = {}
+
+    def record(suite: str, scale: int, items: int, func: Optional[Callable[[], Any]], rounds: int):
+        if func is None:
+            return
+        name = f'{suite}[{scale}x]'
+        print(f"{name}: {items} items x {rounds} rounds...", flush=True)
+        case = run_case(func, rounds)
+        case.update({'suite': suite, 'scale': scale, 'items': items, 'items_per_second': items / case['median']})
+        results[name] = case
+        print(f"  median {case['median']:.4f}s, min {case['min']:.4f}s, {case['items_per_second']:.0f} items/s")
+
+    for scale in args.scales:
+        scaled_reports = scale_records(reports, scale)
+        scaled_content = scale_records(content, scale)
+        url_to_content = create_url_to_content_map(scaled_content)
+        merged = merge_reports(scaled_reports, url_to_content)
+
+        if 'html_to_markdown' in args.suites:
+            record('html_to_markdown', scale, len(scaled_content), html_case(scaled_content), args.rounds)
+        if 'url_content_map' in args.suites:
+            record('url_content_map', scale, len(scaled_content),
+                   lambda: create_url_to_content_map(scaled_content), args.rounds)
+        if 'merge_reports' in args.suites:
+            record('merge_reports', scale, len(scaled_reports),
+                   lambda: merge_reports(scaled_reports, url_to_content), args.rounds)
+        if 'features' in args.suites:
+            record('features', scale, len(merged),
+                   lambda: sum(1 for _ in compute_features(merged, workers=args.workers)), args.rounds)
+
+    if args.fetch:
+        corpus = FixtureCorpus(reports, content)
+        fetch_all, server = fetch_case(corpus, args)
+        try:
+            record('fixture_fetch', 1, len(corpus.bodies), fetch_all, args.rounds)
+            results['fixture_fetch[1x]']['server_counts'] = dict(server.counts)
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args) -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'revision': git_revision(),
+        'rounds': args.rounds,
+        'workers': args.workers,
+    }
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the median change of every case present in both runs; returns the regressed case names"""
+    regressions = []
+    print(f"{'case':<28} {'before':>10} {'after':>10} {'change':>8}")
+    for name in sorted(set(previous['benchmarks']) & set(current['benchmarks'])):
+        before = previous['benchmarks'][name]['median']
+        after = current['benchmarks'][name]['median']
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<28} {before:>9.4f}s {after:>9.4f}s {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark conversion, merge and feature extraction offline")
+    parser.add_argument('--reports', default=REPORTS_FILE, help="Hacktivity metadata (.json array or .jsonl)")
+    parser.add_argument('--content', default=CONTENT_JSON_FILE, help="Report bodies (.json array or .jsonl)")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=SUITES)
+    parser.add_argument('--scales', nargs='+', type=int, default=DEFAULT_SCALES, help="Corpus multiples to run")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="Timed runs per case")
+    parser.add_argument('--workers', type=int, default=1, help="Processes for the features suite")
+    parser.add_argument('--fetch', action='store_true', help="Also time fetching every report from a fixture server")
+    parser.add_argument('--concurrency', type=int, default=4, help="Parallel fetches in the fixture_fetch suite")
+    parser.add_argument('--latency', type=float, default=0.0, help="Fixture server latency per response (seconds)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Fixture server random extra latency (seconds)")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of fixture responses that are 503s")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Share of fixture connections dropped")
+    parser.add_argument('--output', default=RESULTS_FILE, help="Results file (JSON, sorted keys)")
+    parser.add_argument('--compare', metavar='RESULTS', help="Earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Median slowdown counted as a regression by --compare (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    reports = load_records(args.reports)
+    content = load_records(args.content)
+    print(f"Benchmarking on {len(reports)} reports and {len(content)} bodies at scales {args.scales}")
+
+    results = {'environment': environment(args), 'benchmarks': run_suites(reports, content, args)}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"Wrote {len(results['benchmarks'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare(previous, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
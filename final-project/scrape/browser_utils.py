@@ -0,0 +1,293 @@
+"""
+Playwright helpers shared by the hacktivity and report spiders
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from scrapy import signals
+
+logger = logging.getLogger(__name__)
+
+# Counted inside the page so element handles never have to cross the driver connection
+COUNT_ITEMS_JS = "(selector) => document.querySelectorAll(selector).length"
+ITEMS_INCREASED_JS = "(args) => document.querySelectorAll(args.selector).length > args.count"
+
+DEFAULT_MAX_SCROLLS = 100
+DEFAULT_WAIT_TIMEOUT = 10000  # ms to wait for new items after a scroll
+DEFAULT_IDLE_TIMEOUT = 3000  # ms to wait for network idle before giving up on a scroll
+
+# The spiders only need the hacktivity DOM and the report markdown, which the SPA builds from
+# its own documents, scripts, styles and API calls; everything else is aborted
+DEFAULT_ALLOWED_RESOURCE_TYPES = ['document', 'script', 'stylesheet', 'xhr', 'fetch']
+DEFAULT_ALLOWED_DOMAINS = ['hackerone.com', 'localhost', '127.0.0.1']
+# Analytics and error-reporting endpoints are blocked even when they match the allowlists
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    'datadoghq', 'sentry', 'errors.hackerone.net', 'google-analytics', 'googletagmanager', 'segment.io',
+]
+
+# Browser RSS is read from /proc, so it is only checked every few pages
+RSS_CHECK_EVERY = 10
+
+
+async def count_items(page, selector):
+    """Count matching elements in the page without marshalling their handles"""
+    return await page.evaluate(COUNT_ITEMS_JS, selector)
+
+
+async def scroll_until_loaded(page, selector, logger, max_scrolls=DEFAULT_MAX_SCROLLS,
+                              wait_timeout=DEFAULT_WAIT_TIMEOUT, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                              should_stop=None, on_scroll=None, label='', timer=None):
+    """Scroll an infinite feed until no more items load, waiting on the item count instead of a fixed sleep
+
+    `should_stop` is an optional coroutine function called with the item count before the latest
+    batch; returning True ends the scroll early (used for incremental crawls). `on_scroll` is an
+    optional callback receiving the scroll number and item count after each scroll. `timer` is an
+    optional callable receiving (stage, seconds) for each scroll iteration and its wait.
+    Returns a summary with the scroll count, final item count and the time spent waiting vs. loading.
+    """
+    prefix = f"[{label}] " if label else ""
+    summary = {'scrolls': 0, 'items': 0, 'wait_time': 0.0, 'load_time': 0.0}
+
+    previous_count = 0
+    current_count = await count_items(page, selector)
+
+    while summary['scrolls'] < max_scrolls:
+        try:
+            if should_stop and await should_stop(previous_count):
+                logger.info(f"{prefix}Stop condition reached. Stopping scroll. Total items: {current_count}")
+                break
+
+            previous_count = current_count
+
+            # Scroll to bottom
+            load_start = time.time()
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            load_time = time.time() - load_start
+
+            # Wait for the item count to grow, then for the network to settle as a fallback
+            wait_start = time.time()
+            try:
+                await page.wait_for_function(
+                    ITEMS_INCREASED_JS, arg={'selector': selector, 'count': previous_count}, timeout=wait_timeout
+                )
+            except PlaywrightTimeoutError:
+                try:
+                    await page.wait_for_load_state('networkidle', timeout=idle_timeout)
+                except PlaywrightTimeoutError:
+                    pass
+            wait_time = time.time() - wait_start
+
+            load_start = time.time()
+            current_count = await count_items(page, selector)
+            load_time += time.time() - load_start
+
+            summary['scrolls'] += 1
+            summary['wait_time'] += wait_time
+            summary['load_time'] += load_time
+            if timer:
+                timer('scroll', wait_time + load_time)
+                timer('scroll_wait', wait_time)
+            logger.info(
+                f"{prefix}Scroll attempt {summary['scrolls']}, items loaded: {current_count} "
+                f"(waited {wait_time:.2f}s, loading {load_time:.2f}s)"
+            )
+            if on_scroll:
+                on_scroll(summary['scrolls'], current_count)
+
+            # If no new items loaded after scrolling, we're done
+            if current_count == previous_count:
+                logger.info(f"{prefix}No new items loaded. Stopping scroll. Total items: {current_count}")
+                break
+
+        except Exception as e:
+            logger.error(f"{prefix}Error during scrolling: {e}")
+            break
+
+    summary['items'] = current_count
+    logger.info(
+        f"{prefix}Scrolling finished after {summary['scrolls']} scrolls: {current_count} items, "
+        f"{summary['wait_time']:.2f}s waiting, {summary['load_time']:.2f}s loading"
+    )
+    return summary
+
+
+class ResourceBlocker:
+    """PLAYWRIGHT_ABORT_REQUEST predicate that aborts non-essential browser requests and counts them
+
+    Configured with the RESOURCE_BLOCKER_* settings; aborted requests are recorded in the crawl stats
+    under playwright/blocked/*. The size of an aborted response is never known, so savings are
+    reported as request counts per resource type and domain.
+    """
+
+    def __init__(self, allowed_types, allowed_domains, blocked_patterns, stats=None):
+        self.allowed_types = set(allowed_types)
+        self.allowed_domains = [domain.lower() for domain in allowed_domains]
+        self.blocked_patterns = [pattern.lower() for pattern in blocked_patterns]
+        self.stats = stats
+        self.blocked = Counter()
+        self.allowed = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        blocker = cls(
+            settings.getlist('RESOURCE_BLOCKER_ALLOWED_TYPES', DEFAULT_ALLOWED_RESOURCE_TYPES),
+            settings.getlist('RESOURCE_BLOCKER_ALLOWED_DOMAINS', DEFAULT_ALLOWED_DOMAINS),
+            settings.getlist('RESOURCE_BLOCKER_BLOCKED_PATTERNS', DEFAULT_BLOCKED_URL_PATTERNS),
+        )
+        # Installed from Spider.from_crawler, before the crawl has created its stats collector
+        crawler.signals.connect(blocker.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(blocker.spider_closed, signal=signals.spider_closed)
+        return blocker
+
+    def spider_opened(self, spider):
+        self.stats = spider.crawler.stats
+
+    def domain_allowed(self, host):
+        return any(host == domain or host.endswith('.' + domain) for domain in self.allowed_domains)
+
+    def should_abort(self, url, resource_type):
+        """Return the reason a request should be aborted, or None to let it through"""
+        lowered = url.lower()
+        if any(pattern in lowered for pattern in self.blocked_patterns):
+            return 'pattern'
+        if resource_type not in self.allowed_types:
+            return 'type'
+        if not self.domain_allowed(urlparse(url).hostname or ''):
+            return 'domain'
+        return None
+
+    def __call__(self, request):
+        reason = self.should_abort(request.url, request.resource_type)
+        if reason is None:
+            self.allowed += 1
+            return False
+
+        host = urlparse(request.url).hostname or 'unknown'
+        self.blocked[request.resource_type] += 1
+        if self.stats:
+            self.stats.inc_value('playwright/blocked/count')
+            self.stats.inc_value(f'playwright/blocked/reason/{reason}')
+            self.stats.inc_value(f'playwright/blocked/resource_type/{request.resource_type}')
+            self.stats.inc_value(f'playwright/blocked/domain/{host}')
+        return True
+
+    def spider_closed(self, spider):
+        total = sum(self.blocked.values())
+        breakdown = ', '.join(f"{resource_type}={count}" for resource_type, count in self.blocked.most_common())
+        logger.info(f"Resource blocker aborted {total} of {total + self.allowed} browser requests ({breakdown or 'none'})")
+
+
+class ContextRecycler:
+    """Rotates browser requests onto a fresh Playwright context after `max_pages` pages, or once the
+    browser processes' RSS passes `max_rss_mb`
+
+    acquire() is called when a request is built, since scrapy-playwright reads the context name
+    from its meta before opening the page. Page counts and rotation therefore follow the order
+    requests are built, and `pending` includes requests still waiting in the scheduler; counting
+    those keeps a retired context open until the last request assigned to it has run. The context
+    object is recorded by page_opened(), the requests' playwright_page_init_callback, so it is
+    known even when every page on it fails. Once a retired context has no pending requests it is
+    closed, which frees the renderer memory that gc.collect() in the Python process never could.
+    """
+
+    def __init__(self, prefix, max_pages, max_rss_mb=None, stats=None, logger=logger, crawler=None):
+        self.prefix = prefix
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._stats = stats
+        self.logger = logger
+        self.crawler = crawler
+        self.generation = 0
+        self.pages_in_context = 0
+        self.pending = Counter()
+        self.contexts = {}
+        self.retired = set()
+
+    @property
+    def stats(self):
+        # A crawler's stats collector is only created once its crawl starts, after from_crawler
+        return self.crawler.stats if self.crawler else self._stats
+
+    @property
+    def current(self):
+        return f'{self.prefix}-{self.generation}'
+
+    def browser_rss_mb(self):
+        from crawl_stats import descendant_pids, process_rss
+
+        sizes = [process_rss(pid) for pid in descendant_pids(os.getpid())]
+        return sum(size for size in sizes if size) / 1e6
+
+    def rotation_reason(self):
+        if self.pages_in_context >= self.max_pages:
+            return f"{self.pages_in_context} pages"
+        if self.max_rss_mb and self.pages_in_context and self.pages_in_context % RSS_CHECK_EVERY == 0:
+            rss = self.browser_rss_mb()
+            if rss > self.max_rss_mb:
+                return f"browser RSS {rss:.0f} MB"
+        return None
+
+    def acquire(self):
+        """Name of the context the next browser request should use"""
+        reason = self.rotation_reason()
+        if reason:
+            retired = self.current
+            self.retired.add(retired)
+            self.generation += 1
+            self.pages_in_context = 0
+            if self.stats:
+                self.stats.inc_value('playwright/context_recycled')
+            self.logger.info(f"Recycling browser context {retired} after {reason}; new requests use {self.current}")
+            self._close_if_drained(retired)
+        self.pages_in_context += 1
+        self.pending[self.current] += 1
+        return self.current
+
+    async def page_opened(self, page, request):
+        """playwright_page_init_callback: remember the context the page was opened in"""
+        self.contexts[request.meta['playwright_context']] = page.context
+
+    def release(self, name):
+        """Mark one request on `name` as finished, closing the context if it is retired and drained"""
+        self.pending[name] -= 1
+        self._close_if_drained(name)
+
+    def handler_context(self, name):
+        """A context scrapy-playwright created without opening a page in it (new_page() failed)"""
+        if self.crawler is None or self.crawler.engine is None:
+            return None
+        handler = self.crawler.engine.downloader.handlers._get_handler('https')
+        wrapper = getattr(handler, 'context_wrappers', {}).get(name)
+        return wrapper.context if wrapper else None
+
+    def _close_if_drained(self, name):
+        if name not in self.retired or self.pending[name] > 0:
+            return
+        self.retired.discard(name)
+        del self.pending[name]
+        context = self.contexts.pop(name, None) or self.handler_context(name)
+        if context is not None:
+            asyncio.ensure_future(self._close(name, context))
+
+    async def _close(self, name, context):
+        try:
+            await context.close()
+            self.logger.info(f"Closed drained browser context {name}")
+        except Exception as e:
+            self.logger.warning(f"Error closing browser context {name}: {e}")
+
+
+def install_resource_blocker(crawler):
+    """Route every Playwright request through a ResourceBlocker unless RESOURCE_BLOCKER_ENABLED is False"""
+    if not crawler.settings.getbool('RESOURCE_BLOCKER_ENABLED', True):
+        return None
+    blocker = ResourceBlocker.from_crawler(crawler)
+    crawler.settings.set('PLAYWRIGHT_ABORT_REQUEST', blocker, priority='spider')
+    return blocker
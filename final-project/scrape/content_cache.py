@@ -0,0 +1,175 @@
+"""
+Persistent on-disk cache of fetched report bodies, keyed by report URL
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from report_store import write_records
+
+CACHE_FILE = 'hackerone_reports_content_cache.sqlite3'
+
+# How raw report HTML is stored; markup compresses roughly 5-10x with zlib
+RAW_COMPRESSIONS = ('zlib', 'none')
+
+
+def encode_html(html: str, compression: str) -> bytes:
+    data = html.encode('utf-8')
+    if compression == 'zlib':
+        return zlib.compress(data, 6)
+    if compression == 'none':
+        return data
+    raise ValueError(f"Unknown compression {compression!r}, expected one of {RAW_COMPRESSIONS}")
+
+
+def decode_html(data: bytes, compression: str) -> str:
+    if compression == 'zlib':
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+
+class ContentCache:
+    """SQLite-backed store of report content that commits every write immediately"""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS report_content (
+                url TEXT PRIMARY KEY,
+                original_report TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        # Report innerHTML as fetched, so bodies can be re-converted without re-crawling
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS raw_report_html (
+                url TEXT PRIMARY KEY,
+                html BLOB NOT NULL,
+                compression TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM report_content").fetchone()[0]
+
+    def __contains__(self, url: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM report_content WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def cached_urls(self) -> Set[str]:
+        """Return every URL that already has a cached body"""
+        return {row[0] for row in self.conn.execute("SELECT url FROM report_content")}
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the cached body for a URL, or None"""
+        row = self.conn.execute("SELECT original_report FROM report_content WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, url: str, original_report: str) -> None:
+        """Store a report body and commit straight away so a crash loses nothing"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO report_content (url, original_report, fetched_at) VALUES (?, ?, ?)",
+            (url, original_report, time.time()),
+        )
+        self.conn.commit()
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Store a batch of converted bodies in one transaction"""
+        rows = [(record['url'], record['original_report'], time.time()) for record in records]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO report_content (url, original_report, fetched_at) VALUES (?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def put_raw(self, url: str, html: str, compression: str = 'zlib') -> None:
+        """Store a report's raw innerHTML and commit straight away"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO raw_report_html (url, html, compression, fetched_at) VALUES (?, ?, ?, ?)",
+            (url, encode_html(html, compression), compression, time.time()),
+        )
+        self.conn.commit()
+
+    def raw_urls(self) -> Set[str]:
+        """Return every URL with stored raw HTML"""
+        return {row[0] for row in self.conn.execute("SELECT url FROM raw_report_html")}
+
+    def unconverted_urls(self) -> List[str]:
+        """URLs whose raw HTML has no converted body yet, in fetch order"""
+        rows = self.conn.execute(
+            "SELECT url FROM raw_report_html WHERE url NOT IN (SELECT url FROM report_content) ORDER BY rowid"
+        )
+        return [row[0] for row in rows]
+
+    def iter_raw(self, urls: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str]]:
+        """Yield (url, html) for the given URLs, or for all stored raw HTML in fetch order"""
+        if urls is None:
+            for url, data, compression in self.conn.execute(
+                "SELECT url, html, compression FROM raw_report_html ORDER BY rowid"
+            ):
+                yield url, decode_html(data, compression)
+            return
+        for url in urls:
+            row = self.conn.execute(
+                "SELECT html, compression FROM raw_report_html WHERE url = ?", (url,)
+            ).fetchone()
+            if row:
+                yield url, decode_html(*row)
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Seed the cache from existing content records (e.g. a previous JSON feed)"""
+        rows = [
+            (record['url'], record['original_report'], time.time())
+            for record in records
+            if record.get('url') and record.get('original_report') is not None
+        ]
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO report_content (url, original_report, fetched_at) VALUES (?, ?, ?)",
+            rows,
+        )
+        self.conn.commit()
+        return len(rows)
+
+    def iter_records(self):
+        """Yield cached records in the order they were first fetched"""
+        for url, original_report in self.conn.execute(
+            "SELECT url, original_report FROM report_content ORDER BY rowid"
+        ):
+            yield {'url': url, 'original_report': original_report}
+
+    def export_json(self, filepath: str) -> None:
+        """Write the cache out in the content spider's JSON feed layout"""
+        write_records(filepath, list(self.iter_records()))
+
+    def export_csv(self, filepath: str) -> None:
+        """Write the cache out in the content spider's CSV feed layout"""
+        with open(filepath, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['url', 'original_report'], lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(self.iter_records())
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_cache(path: str = CACHE_FILE, seed_file: Optional[str] = None) -> ContentCache:
+    """Open the content cache, seeding it from a previous JSON feed the first time"""
+    cache = ContentCache(path)
+    if seed_file and len(cache) == 0 and os.path.exists(seed_file):
+        with open(seed_file, 'r', encoding='utf-8') as f:
+            cache.import_records(json.load(f))
+    return cache
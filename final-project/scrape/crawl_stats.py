@@ -0,0 +1,296 @@
+"""
+Scrapy extension recording per-stage timings, browser page counts and memory over a crawl
+
+Spiders report how long each stage took with timed_stage()/record_stage(); the extension keeps a
+histogram per stage, samples RSS and open Chromium pages on a timer, and at close writes a JSON
+summary (and optionally a Prometheus text-format file).
+
+Settings:
+    CRAWL_STATS_ENABLED          turn the extension off (default True)
+    CRAWL_STATS_FILE             JSON summary path (default crawl_stats_<spider>.json)
+    CRAWL_STATS_PROMETHEUS_FILE  Prometheus text-format output path (default: not written)
+    CRAWL_STATS_SAMPLE_INTERVAL  seconds between RSS/page-count samples (default 5)
+"""
+
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+logger = logging.getLogger(__name__)
+
+# Custom signal carrying one stage timing: stage=<name>, seconds=<float>
+stage_timed = object()
+
+# Upper bounds (seconds) of the histogram buckets, Prometheus style; the last bucket is +Inf
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+
+DEFAULT_SAMPLE_INTERVAL = 5.0
+
+
+def record_stage(crawler, stage: str, seconds: float) -> None:
+    """Report a stage timing; a no-op when the extension is not enabled"""
+    crawler.signals.send_catch_log(signal=stage_timed, stage=stage, seconds=seconds)
+
+
+@contextmanager
+def timed_stage(crawler, stage: str):
+    """Time the enclosed block (awaits included) as one observation of `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(crawler, stage, time.perf_counter() - start)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum, min and max"""
+
+    def __init__(self, buckets: List[float] = BUCKETS):
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def cumulative(self) -> List[int]:
+        totals, running = [], 0
+        for bucket_count in self.counts:
+            running += bucket_count
+            totals.append(running)
+        return totals
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(bound) for bound in self.bounds] + ['+Inf'], self.cumulative())),
+        }
+
+
+def process_rss(pid='self') -> Optional[int]:
+    """Resident set size of a process in bytes (Linux /proc), or None if unavailable"""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def descendant_pids(root: int) -> List[int]:
+    """Every process below `root` (the Playwright driver and its Chromium processes), via /proc"""
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # The command name may contain spaces, so split after its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    found, stack = [], [root]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+class CrawlStats:
+    """Per-stage timing histograms plus periodic RSS and Chromium page samples for one crawl"""
+
+    def __init__(self, crawler, output_file: Optional[str], prometheus_file: Optional[str],
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.crawler = crawler
+        self.output_file = output_file
+        self.prometheus_file = prometheus_file
+        self.sample_interval = sample_interval
+        self.histograms: Dict[str, Histogram] = {}
+        self.samples: List[Dict[str, Any]] = []
+        self.request_started: Dict[Any, float] = {}
+        self.started = None
+        self.sampler = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('CRAWL_STATS_ENABLED', True):
+            raise NotConfigured
+        extension = cls(
+            crawler,
+            settings.get('CRAWL_STATS_FILE'),
+            settings.get('CRAWL_STATS_PROMETHEUS_FILE'),
+            settings.getfloat('CRAWL_STATS_SAMPLE_INTERVAL', DEFAULT_SAMPLE_INTERVAL),
+        )
+        crawler.signals.connect(extension.stage_timed, signal=stage_timed)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.engine_started, signal=signals.engine_started)
+        crawler.signals.connect(extension.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(extension.request_left_downloader, signal=signals.request_left_downloader)
+        return extension
+
+    def observe(self, stage: str, seconds: float) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+    def stage_timed(self, stage, seconds):
+        self.observe(stage, seconds)
+
+    def engine_started(self):
+        self.wrap_feed_exporter()
+
+    def wrap_feed_exporter(self):
+        """Time the feed exporter's per-item write by re-registering its item_scraped handler"""
+        from scrapy.extensions.feedexport import FeedExporter
+
+        for extension in self.crawler.extensions.middlewares:
+            if isinstance(extension, FeedExporter):
+                original = extension.item_scraped
+
+                def timed_item_scraped(item, spider, original=original):
+                    start = time.perf_counter()
+                    try:
+                        return original(item, spider)
+                    finally:
+                        self.observe('feed_write', time.perf_counter() - start)
+
+                self.feed_handler = timed_item_scraped
+                self.crawler.signals.disconnect(original, signal=signals.item_scraped)
+                self.crawler.signals.connect(self.feed_handler, signal=signals.item_scraped)
+
+    def request_reached_downloader(self, request, spider):
+        self.request_started[request] = time.perf_counter()
+
+    def request_left_downloader(self, request, spider):
+        start = self.request_started.pop(request, None)
+        if start is not None:
+            # Rendered pages spend their download time navigating; plain requests just download
+            stage = 'navigation' if request.meta.get('playwright') else 'http_download'
+            self.observe(stage, time.perf_counter() - start)
+
+    def spider_opened(self, spider):
+        self.started = time.time()
+        self.sampler = task.LoopingCall(self.sample)
+        self.sampler.start(self.sample_interval, now=True)
+
+    def sample(self):
+        """Record process and browser RSS plus open Chromium pages/contexts"""
+        stats = self.crawler.stats
+        browser_rss = [process_rss(pid) for pid in descendant_pids(os.getpid())]
+        self.samples.append({
+            'elapsed': round(time.time() - self.started, 3),
+            'rss_bytes': process_rss(),
+            'browser_rss_bytes': sum(rss for rss in browser_rss if rss) if browser_rss else None,
+            'open_pages': stats.get_value('playwright/page_count', 0) - stats.get_value('playwright/page_count/closed', 0),
+            'contexts': stats.get_value('playwright/context_count', 0),
+            'items': stats.get_value('item_scraped_count', 0),
+            'requests': stats.get_value('downloader/request_count', 0),
+        })
+
+    def summary(self, spider, reason) -> Dict[str, Any]:
+        def peak(key):
+            values = [sample[key] for sample in self.samples if sample[key] is not None]
+            return max(values) if values else None
+
+        return {
+            'spider': spider.name,
+            'reason': reason,
+            'elapsed': time.time() - self.started,
+            'stages': {stage: histogram.summary() for stage, histogram in sorted(self.histograms.items())},
+            'peak_rss_bytes': peak('rss_bytes'),
+            'peak_browser_rss_bytes': peak('browser_rss_bytes'),
+            'peak_open_pages': peak('open_pages'),
+            'samples': self.samples,
+            'scrapy_stats': self.crawler.stats.get_stats(),
+        }
+
+    def prometheus_text(self, summary: Dict[str, Any]) -> str:
+        """Render the histograms and peak gauges in the Prometheus text exposition format"""
+        spider = summary['spider']
+        lines = [
+            '# HELP scrapy_stage_seconds Time spent per crawl stage',
+            '# TYPE scrapy_stage_seconds histogram',
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            labels = f'spider="{spider}",stage="{stage}"'
+            for bound, total in zip([str(bound) for bound in histogram.bounds] + ['+Inf'], histogram.cumulative()):
+                lines.append(f'scrapy_stage_seconds_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f'scrapy_stage_seconds_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'scrapy_stage_seconds_count{{{labels}}} {histogram.count}')
+
+        for name, key, help_text in (
+            ('scrapy_peak_rss_bytes', 'peak_rss_bytes', 'Peak resident memory of the crawler process'),
+            ('scrapy_peak_browser_rss_bytes', 'peak_browser_rss_bytes', 'Peak resident memory of the browser processes'),
+            ('scrapy_peak_open_pages', 'peak_open_pages', 'Most Chromium pages open at once'),
+        ):
+            if summary[key] is not None:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name}{{spider="{spider}"}} {summary[key]}']
+        return '\n'.join(lines) + '\n'
+
+    def spider_closed(self, spider, reason):
+        if self.sampler and self.sampler.running:
+            self.sampler.stop()
+        self.sample()
+
+        summary = self.summary(spider, reason)
+        output_file = self.output_file or f'crawl_stats_{spider.name}.json'
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, default=str)
+
+        for stage, histogram in sorted(self.histograms.items()):
+            logger.info(
+                f"Stage {stage}: {histogram.count} x, mean {histogram.sum / histogram.count:.3f}s, "
+                f"p90 {histogram.quantile(0.9):.3f}s, max {histogram.max:.3f}s"
+            )
+        logger.info(f"Crawl stats written to {output_file}")
+
+        if self.prometheus_file:
+            with open(self.prometheus_file, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text(summary))
+            logger.info(f"Prometheus metrics written to {self.prometheus_file}")
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Local HTTP server replaying hacktivity feeds and report pages from the saved corpus
+
+Hacktivity pages (/<team>/hacktivity) and report pages (/reports/<id>, /reports/<id>.json) are
+generated from hackerone_reports_output.json and the content output, with the same markup the
+spiders select on. The hacktivity feed loads further items over XHR as the page is scrolled, like
+the live site. Every response can be delayed and a share of them failed, so crawl throughput and
+the adaptive concurrency controller can be measured offline:
+
+    python fixture_server.py --latency 0.5 --jitter 0.5 --failure-rate 0.05
+    python hackerone_scraper_reports.py --base-url http://127.0.0.1:8800
+"""
+
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from report_store import CONTENT_JSON_FILE, REPORTS_FILE, load_records
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8800
+
+# Hacktivity items in the initial page and in each scroll-triggered batch, as on hackerone.com
+FEED_PAGE_SIZE = 25
+
+REPORT_PATH_RE = re.compile(r'^/reports/(\d+)(\.json)?$')
+HACKTIVITY_PATH_RE = re.compile(r'^/([^/]+)/hacktivity(/items)?$')
+
+HACKTIVITY_PAGE = """<!DOCTYPE html>
+<html><head><title>{team} hacktivity</title>
+<style>div[data-testid="hacktivity-item"] {{ min-height: 120px; border-bottom: 1px solid #ccc; }}</style>
+</head><body>
+<div id="feed">{items}</div>
+<script>
+let offset = {count}, loading = false, done = {done};
+window.addEventListener('scroll', async () => {{
+    if (loading || done || window.innerHeight + window.scrollY < document.body.scrollHeight - 10) return;
+    loading = true;
+    try {{
+        const response = await fetch('/{team}/hacktivity/items?offset=' + offset);
+        const batch = await response.json();
+        document.getElementById('feed').insertAdjacentHTML('beforeend', batch.html);
+        offset += batch.count;
+        done = batch.done;
+    }} finally {{
+        loading = false;
+    }}
+}});
+</script>
+</body></html>
+"""
+
+HACKTIVITY_ITEM = """<div data-testid="hacktivity-item">
+<div data-testid="report-title"><span class="line-clamp-2">{title}</span></div>
+<div class="md:text-md"><a href="{path}">{title}</a></div>
+{severity}{bounty}<span title="{date}">{date}</span>
+</div>
+"""
+
+REPORT_PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title></head><body>
+<h1>{title}</h1>
+<div id="report-information"><div class="spec-vulnerability-information">
+<div class="interactive-markdown">{body}</div>
+</div></div>
+</body></html>
+"""
+
+
+def report_path(url: str) -> str:
+    return urlparse(url).path
+
+
+def render_markdown_html(markdown: str) -> str:
+    """Minimal markdown-to-HTML rendering: fenced code blocks as interactive-markdown__code divs, the rest as paragraphs"""
+    parts = []
+    for i, block in enumerate(re.split(r'^```[^\n]*\n', markdown, flags=re.MULTILINE)):
+        if i % 2:
+            parts.append(f'<div class="interactive-markdown__code"><pre><code>{html.escape(block)}</code></pre></div>')
+            continue
+        for paragraph in re.split(r'\n\s*\n', block):
+            if paragraph.strip():
+                parts.append(f'<p>{html.escape(paragraph.strip())}</p>')
+    return '\n'.join(parts)
+
+
+def render_hacktivity_item(report: Dict[str, Any]) -> str:
+    metadata = report.get('hacktivity_metadata') or {}
+    severity = bounty = ''
+    if metadata.get('severity'):
+        severity = ('<span data-testid="report-severity"><span><span><span><span><span>'
+                    f'{html.escape(metadata["severity"])}</span></span></span></span></span></span>')
+    if metadata.get('bounty'):
+        bounty = f'<span class="spec-amount-in-currency"><span>{html.escape(metadata["bounty"])}</span></span>'
+    return HACKTIVITY_ITEM.format(
+        title=html.escape(report.get('title') or ''),
+        path=html.escape(report_path(report['url'])),
+        severity=severity,
+        bounty=bounty,
+        date=html.escape(metadata.get('date') or ''),
+    )
+
+
+def render_report_page(report: Dict[str, Any], body: str) -> str:
+    return REPORT_PAGE.format(title=html.escape(report.get('title') or ''), body=render_markdown_html(body))
+
+
+class FixtureCorpus:
+    """Reports grouped by team plus report bodies keyed by URL path"""
+
+    def __init__(self, reports: List[Dict[str, Any]], content: List[Dict[str, Any]]):
+        self.teams: Dict[str, List[Dict[str, Any]]] = {}
+        self.reports: Dict[str, Dict[str, Any]] = {}
+        for report in reports:
+            if not report.get('url'):
+                continue
+            self.teams.setdefault(report.get('team') or 'unknown', []).append(report)
+            self.reports[report_path(report['url'])] = report
+        self.bodies = {
+            report_path(item['url']): item['original_report']
+            for item in content if item.get('url') and item.get('original_report')
+        }
+
+    @classmethod
+    def from_files(cls, reports_file: str = REPORTS_FILE, content_file: str = CONTENT_JSON_FILE) -> 'FixtureCorpus':
+        return cls(load_records(reports_file), load_records(content_file))
+
+    def hacktivity_batch(self, team: str, offset: int, size: int = FEED_PAGE_SIZE) -> Tuple[str, int, bool]:
+        """(items html, item count, whether the feed is exhausted) of one feed batch"""
+        reports = self.teams.get(team, [])
+        batch = reports[offset:offset + size]
+        return ''.join(render_hacktivity_item(report) for report in batch), len(batch), offset + size >= len(reports)
+
+    def hacktivity_page(self, team: str) -> Optional[str]:
+        if team not in self.teams:
+            return None
+        items, count, done = self.hacktivity_batch(team, 0)
+        return HACKTIVITY_PAGE.format(team=html.escape(team), items=items, count=count, done=json.dumps(done))
+
+    def report_page(self, path: str) -> Optional[str]:
+        if path not in self.bodies:
+            return None
+        return render_report_page(self.reports.get(path, {}), self.bodies[path])
+
+    def report_json(self, path: str) -> Optional[str]:
+        if path not in self.bodies:
+            return None
+        report = self.reports.get(path, {})
+        return json.dumps({
+            'id': int(path.rsplit('/', 1)[-1]),
+            'title': report.get('title'),
+            'vulnerability_information': self.bodies[path],
+        })
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Threaded server over a FixtureCorpus with injectable latency, failures and dropped connections"""
+
+    daemon_threads = True
+
+    def __init__(self, corpus: FixtureCorpus, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, drop_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        super().__init__((host, port), FixtureHandler)
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'ok': 0, 'not_found': 0, 'failed': 0, 'dropped': 0}
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+    def draw(self) -> Tuple[float, str]:
+        """Delay and outcome ('ok', 'failed' or 'dropped') of the next response"""
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            roll = self.random.random()
+        if roll < self.drop_rate:
+            return delay, 'dropped'
+        if roll < self.drop_rate + self.failure_rate:
+            return delay, 'failed'
+        return delay, 'ok'
+
+    def start_background(self) -> 'FixtureServer':
+        """Serve from a daemon thread, e.g. inside a benchmark; stop with shutdown()"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server: FixtureServer
+
+    def do_GET(self):
+        self.server.count('requests')
+        delay, outcome = self.server.draw()
+        if delay:
+            time.sleep(delay)
+
+        if outcome == 'dropped':
+            # Close without a response, which clients see as "Connection closed"
+            self.server.count('dropped')
+            self.close_connection = True
+            return
+        if outcome == 'failed':
+            self.server.count('failed')
+            self.respond(503, 'text/plain', 'Injected failure')
+            return
+
+        url = urlparse(self.path)
+        content_type, body = self.route(url.path, parse_qs(url.query))
+        if body is None:
+            self.server.count('not_found')
+            self.respond(404, 'text/plain', 'Not found')
+        else:
+            self.server.count('ok')
+            self.respond(200, content_type, body)
+
+    def route(self, path: str, query: Dict[str, List[str]]) -> Tuple[str, Optional[str]]:
+        corpus = self.server.corpus
+        report = REPORT_PATH_RE.match(path)
+        if report:
+            report_path = f'/reports/{report.group(1)}'
+            if report.group(2):
+                return 'application/json', corpus.report_json(report_path)
+            return 'text/html; charset=utf-8', corpus.report_page(report_path)
+
+        hacktivity = HACKTIVITY_PATH_RE.match(path)
+        if hacktivity:
+            team = hacktivity.group(1)
+            if not hacktivity.group(2):
+                return 'text/html; charset=utf-8', corpus.hacktivity_page(team)
+            if team not in corpus.teams:
+                return 'application/json', None
+            offset = int(query.get('offset', ['0'])[0])
+            items, count, done = corpus.hacktivity_batch(team, offset)
+            return 'application/json', json.dumps({'html': items, 'count': count, 'done': done})
+
+        return 'text/plain', None
+
+    def respond(self, status: int, content_type: str, body: str) -> None:
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the saved corpus as local hacktivity and report pages")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--reports', default=REPORTS_FILE, help="Hacktivity metadata (.json array or .jsonl)")
+    parser.add_argument('--content', default=CONTENT_JSON_FILE, help="Report bodies (.json array or .jsonl)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra random seconds per response")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests answered with a 503")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Share of requests closed without a response")
+    parser.add_argument('--seed', type=int, help="Seed for the injected latency and failures")
+    args = parser.parse_args(argv)
+
+    corpus = FixtureCorpus.from_files(args.reports, args.content)
+    server = FixtureServer(corpus, args.host, args.port, args.latency, args.jitter,
+                           args.failure_rate, args.drop_rate, args.seed)
+    print(f"Serving {len(corpus.reports)} reports ({len(corpus.bodies)} with bodies) from "
+          f"{len(corpus.teams)} teams at {server.base_url}")
+    for team in sorted(corpus.teams):
+        print(f"  {server.base_url}/{team}/hacktivity")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,35 @@ Scrapes publicly disclosed vulnerability reports and extracts features
 """
 
 import scrapy
-from scrapy_playwright.page import PageMethod
 import time
 from urllib.parse import urljoin
 import logging
+import os
+
+from adaptive_concurrency import install_adaptive_concurrency, record_render_failure
+from browser_utils import install_resource_blocker, scroll_until_loaded
+from crawl_stats import record_stage, timed_stage
+from report_store import REPORTS_FILE, REPORTS_JSONL_FILE, COMBINED_FILE, load_known_urls, prepend_records
+
+HACKERONE_BASE_URL = 'https://hackerone.com'
+TEAMS_FILE = 'teams.txt'
+DEFAULT_TEAMS = ['curl']
+
+# Upper bound on browser pages open at once across all team sessions
+DEFAULT_MAX_PAGES = 4
+
+HACKTIVITY_ITEM_SELECTOR = 'div[data-testid="hacktivity-item"]'
+REPORT_LINK_SELECTOR = '.md\\:text-md a'
+
+# Returns the report hrefs of the hacktivity items from index `start` onwards
+NEW_ITEM_LINKS_JS = """
+(args) => Array.from(document.querySelectorAll(args.itemSelector))
+    .slice(args.start)
+    .map(item => {
+        const link = item.querySelector(args.linkSelector);
+        return link ? link.getAttribute('href') : null;
+    })
+"""
 
 class HackerOneSpiderHacktivity(scrapy.Spider):
     name = "hackerone_hacktivity"
@@ -60,23 +85,107 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
         'AUTOTHROTTLE_START_DELAY': 0.5,
         'AUTOTHROTTLE_MAX_DELAY': 10,
         'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,
+        'EXTENSIONS': {
+            'crawl_stats.CrawlStats': 500,
+            'adaptive_concurrency.AdaptiveConcurrency': 510,
+        },
     }
 
+    def __init__(self, incremental=False, teams=None, teams_file=None, max_pages=DEFAULT_MAX_PAGES,
+                 output_format='json', adaptive=False, base_url=HACKERONE_BASE_URL, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if output_format not in ('json', 'jsonl'):
+            raise ValueError(f"Unknown output_format {output_format!r}, expected 'json' or 'jsonl'")
+        self.output_format = output_format
+        # Scrapy passes -a arguments as strings
+        self.incremental = str(incremental).lower() in ('1', 'true', 'yes')
+        self.adaptive = str(adaptive).lower() in ('1', 'true', 'yes')
+        # Overridable so the spider can be pointed at a local fixture server
+        self.base_url = base_url.rstrip('/')
+        self.known_urls = set()
+        self.new_reports = []
+
+        self.teams = load_teams(teams, teams_file)
+        self.max_pages = max(1, int(max_pages))
+        self.team_progress = {
+            team: {'status': 'pending', 'scrolls': 0, 'items_loaded': 0, 'items_emitted': 0, 'started': None, 'elapsed': 0.0}
+            for team in self.teams
+        }
+        self.logger.info(f"Tracking {len(self.teams)} teams with a budget of {self.max_pages} pages")
+
+        if self.incremental:
+            self.known_urls = load_known_urls([REPORTS_FILE, REPORTS_JSONL_FILE, COMBINED_FILE])
+            self.logger.info(f"Incremental mode: {len(self.known_urls)} known reports")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        install_resource_blocker(crawler)
+
+        # Each team scrolls in its own browser context; run as many in parallel as the page budget allows
+        parallel_sessions = min(len(spider.teams), spider.max_pages)
+        crawler.settings.set('CONCURRENT_REQUESTS', parallel_sessions, priority='spider')
+        crawler.settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', parallel_sessions, priority='spider')
+        crawler.settings.set('AUTOTHROTTLE_TARGET_CONCURRENCY', float(parallel_sessions), priority='spider')
+        crawler.settings.set('PLAYWRIGHT_MAX_CONTEXTS', spider.max_pages, priority='spider')
+        crawler.settings.set('PLAYWRIGHT_MAX_PAGES_PER_CONTEXT', 1, priority='spider')
+        if spider.adaptive:
+            # Start with one team session and add more while render latency and errors allow
+            install_adaptive_concurrency(crawler, maximum=parallel_sessions, start=1)
+
+        if spider.output_format == 'jsonl':
+            # JSONL stores are appended to line by line, so incremental runs just add the new items
+            crawler.settings.set('FEEDS', {
+                REPORTS_JSONL_FILE: {
+                    'format': 'jsonlines',
+                    'encoding': 'utf8',
+                    'overwrite': not spider.incremental
+                }
+            }, priority='spider')
+        elif spider.incremental:
+            # New items are appended to the store at close, so only write this run's items to the feed
+            crawler.settings.set('FEEDS', {
+                'hackerone_reports_new.json': {
+                    'format': 'json',
+                    'encoding': 'utf8',
+                    'indent': 4,
+                    'overwrite': True
+                }
+            }, priority='spider')
+        return spider
+
+    def closed(self, reason):
+        """Report per-team progress and append newly found reports in incremental mode"""
+        self.log_team_progress()
+        if not self.incremental or self.output_format == 'jsonl':
+            return
+        added = prepend_records(REPORTS_FILE, self.new_reports)
+        self.logger.info(f"Incremental crawl finished ({reason}): added {added} new reports to {REPORTS_FILE}")
+
+    def log_team_progress(self):
+        """Log a one-line progress summary per team"""
+        for team, progress in self.team_progress.items():
+            elapsed = progress['elapsed']
+            if progress['status'] == 'scrolling':
+                elapsed = time.time() - progress['started']
+            self.logger.info(
+                f"[{team}] {progress['status']}: {progress['scrolls']} scrolls, "
+                f"{progress['items_loaded']} items loaded, {progress['items_emitted']} emitted, {elapsed:.1f}s"
+            )
+
     async def start(self):
-        teams = ['curl']
-        
-        for team in teams:
-            url = f'https://hackerone.com/{team}/hacktivity?type=team'
+        for team in self.teams:
+            url = f'{self.base_url}/{team}/hacktivity?type=team'
             yield scrapy.Request(
                 url=url,
                 meta={
                     'playwright': True,
                     'playwright_include_page': True,
-                    'playwright_page_methods': [
-                        PageMethod('wait_for_selector', 'div[data-testid="hacktivity-item"]', timeout=15000),
-                    ],
+                    # wait_for_selector runs in the callback so it is timed apart from navigation
                     'team': team,
                     'playwright_page_close': True,
+                    # A separate context per team keeps the infinite-scroll sessions independent
+                    'playwright_context': f'team-{team}',
                 },
                 callback=self.parse_hacktivity_page,
                 errback=self.errback_handler,
@@ -86,6 +195,9 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
     def errback_handler(self, failure):
         """Handle request failures"""
         self.logger.error(f"Request failed: {failure.request.url} - {failure.value}")
+        team = failure.request.meta.get('team')
+        if team in self.team_progress:
+            self.team_progress[team]['status'] = 'failed'
 
     async def parse_hacktivity_page(self, response):
         """Parse the main hacktivity page and handle infinite scroll"""
@@ -96,26 +208,39 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
             return
             
         team = response.meta['team']
+        progress = self.team_progress[team]
+        progress['status'] = 'scrolling'
+        progress['started'] = time.time()
         
         try:
+            with timed_stage(self.crawler, 'wait_for_selector'):
+                await page.wait_for_selector(HACKTIVITY_ITEM_SELECTOR, timeout=15000)
+
             # Handle infinite scroll to load all posts
-            await self.scroll_to_load_all(page)
+            await self.scroll_to_load_all(page, team)
             
             # Get all hacktivity items
-            page_html = await page.content()
-            selector = scrapy.Selector(text=page_html)
+            with timed_stage(self.crawler, 'html_extraction'):
+                page_html = await page.content()
+                selector = scrapy.Selector(text=page_html)
             
             self.logger.info(f"Found hacktivity items for team {team}")
 
-            hacktivity_items = selector.css('div[data-testid="hacktivity-item"]')
+            hacktivity_items = selector.css(HACKTIVITY_ITEM_SELECTOR)
             
             for item in hacktivity_items:
                 # Extract basic info from the hacktivity item
                 title = item.css('div[data-testid="report-title"] span.line-clamp-2::text').get()
-                href = item.css('.md\:text-md a::attr(href)').get()
+                href = item.css(f'{REPORT_LINK_SELECTOR}::attr(href)').get()
                 
                 report_url = urljoin("https://hackerone.com", href)
 
+                # Only emit reports we have not seen before in incremental mode
+                if self.incremental:
+                    if report_url in self.known_urls:
+                        continue
+                    self.known_urls.add(report_url)
+
                 self.logger.info(f"Processing report: {title} URL: {report_url}")
                 
                 # Extract metadata
@@ -128,13 +253,25 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
                     'hacktivity_metadata': metadata,
                 }
 
+                if self.incremental:
+                    self.new_reports.append(report_overview)
+
+                progress['items_emitted'] += 1
                 yield report_overview
+
+            progress['status'] = 'done'
                 
         except Exception as e:
-            self.logger.error(f"Error in parse_hacktivity_page: {e}")
+            progress['status'] = 'failed'
+            self.logger.error(f"Error in parse_hacktivity_page for team {team}: {e}")
+            record_render_failure(self.crawler, e)
         finally:
+            progress['elapsed'] = time.time() - progress['started']
+            self.log_team_progress()
             if page and not page.is_closed():
+                # Drop the team's context with its page so finished sessions release browser memory
                 await page.close()
+                await page.context.close()
     
     async def parse_report_page(self, response):
         """Parse individual report page to extract detailed content"""
@@ -174,37 +311,37 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
         
         yield report_data
 
-    async def scroll_to_load_all(self, page):
+    async def scroll_to_load_all(self, page, team):
         """Handle infinite scroll to load all content"""
-        previous_count = 0
-        scroll_attempts = 0
-        max_scroll_attempts = 100
-        
-        while scroll_attempts < max_scroll_attempts:
-            try:
-                # Count current items
-                current_items = await page.query_selector_all('div[data-testid="hacktivity-item"]')
-                current_count = len(current_items)
-                
-                # If no new items loaded after scrolling, we're done
-                if current_count == previous_count and scroll_attempts > 0:
-                    self.logger.info(f"No new items loaded. Stopping scroll. Total items: {current_count}")
-                    break
-                    
-                previous_count = current_count
-                
-                # Scroll to bottom
-                await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                
-                # Wait for new content to load
-                await page.wait_for_timeout(2000)
-                
-                scroll_attempts += 1
-                self.logger.info(f"Scroll attempt {scroll_attempts}, items loaded: {current_count}")
-                
-            except Exception as e:
-                self.logger.error(f"Error during scrolling: {e}")
-                break
+        progress = self.team_progress[team]
+
+        def record_progress(scrolls, items_loaded):
+            progress['scrolls'] = scrolls
+            progress['items_loaded'] = items_loaded
+
+        # In incremental mode, stop once a freshly loaded batch is entirely known
+        should_stop = (lambda start: self.batch_is_known(page, start)) if self.incremental else None
+
+        return await scroll_until_loaded(
+            page,
+            HACKTIVITY_ITEM_SELECTOR,
+            self.logger,
+            max_scrolls=100,
+            should_stop=should_stop,
+            on_scroll=record_progress,
+            label=team,
+            timer=lambda stage, seconds: record_stage(self.crawler, stage, seconds),
+        )
+
+    async def batch_is_known(self, page, start):
+        """Check whether every hacktivity item loaded from index `start` onwards is already known"""
+        hrefs = await page.evaluate(NEW_ITEM_LINKS_JS, {
+            'itemSelector': HACKTIVITY_ITEM_SELECTOR,
+            'linkSelector': REPORT_LINK_SELECTOR,
+            'start': start,
+        })
+        urls = [urljoin("https://hackerone.com", href) for href in hrefs if href]
+        return bool(urls) and all(url in self.known_urls for url in urls)
 
     async def extract_hacktivity_metadata_simple(self, item: scrapy.Selector, title):
         """Extract metadata from hacktivity item with better error handling"""
@@ -240,8 +377,42 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
             
         return metadata
 
+def load_teams(teams=None, teams_file=None):
+    """Resolve the team list from a comma-separated argument, a teams file, or the default"""
+    if teams:
+        if isinstance(teams, str):
+            teams = teams.split(',')
+        return [team.strip() for team in teams if team.strip()]
+
+    teams_file = teams_file or (TEAMS_FILE if os.path.exists(TEAMS_FILE) else None)
+    if teams_file:
+        with open(teams_file, 'r', encoding='utf-8') as f:
+            # One team handle per line, '#' starts a comment
+            parsed = [line.split('#', 1)[0].strip() for line in f]
+        return [team for team in parsed if team]
+
+    return list(DEFAULT_TEAMS)
+
 if __name__ == "__main__":
+    import argparse
     from scrapy.crawler import CrawlerProcess
+
+    parser = argparse.ArgumentParser(description="Scrape HackerOne hacktivity overviews")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"Only emit reports not already in {REPORTS_FILE}/{COMBINED_FILE} and append them")
+    parser.add_argument('--output-format', choices=['json', 'jsonl'], default='json',
+                        help=f"Write {REPORTS_FILE} as a JSON array or stream to {REPORTS_JSONL_FILE}")
+    parser.add_argument('--teams', help="Comma-separated team handles to crawl, e.g. curl,nodejs")
+    parser.add_argument('--teams-file', help=f"File with one team handle per line (default: {TEAMS_FILE} if present)")
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES,
+                        help="Global budget of browser pages open at once across all teams")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Let the adaptive concurrency controller pick how many teams render at once")
+    parser.add_argument('--base-url', default=HACKERONE_BASE_URL,
+                        help="Site to crawl, e.g. a local fixture_server.py; report URLs stay canonical")
+    parser.add_argument('--stats-file', help="JSON crawl stats summary (default crawl_stats_<spider>.json)")
+    parser.add_argument('--prometheus-file', help="Also write the crawl stats in Prometheus text format")
+    args = parser.parse_args()
     
     # Configure logging
     logging.basicConfig(
@@ -249,6 +420,18 @@ if __name__ == "__main__":
         format='%(asctime)s [%(name)s] %(levelname)s: %(message)s'
     )
     
-    process = CrawlerProcess()
-    process.crawl(HackerOneSpiderHacktivity)
+    process = CrawlerProcess({
+        'CRAWL_STATS_FILE': args.stats_file,
+        'CRAWL_STATS_PROMETHEUS_FILE': args.prometheus_file,
+    })
+    process.crawl(
+        HackerOneSpiderHacktivity,
+        incremental=args.incremental,
+        teams=args.teams,
+        teams_file=args.teams_file,
+        max_pages=args.max_pages,
+        output_format=args.output_format,
+        adaptive=args.adaptive,
+        base_url=args.base_url,
+    )
     process.start()
\ No newline at end of file
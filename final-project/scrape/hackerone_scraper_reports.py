@@ -4,14 +4,41 @@ Scrapes publicly disclosed vulnerability reports and extracts features
 """
 
 import scrapy
-from scrapy_playwright.page import PageMethod
+import asyncio
+import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from urllib.parse import urljoin
-from markdownify import markdownify as md
+from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import logging
 
+from adaptive_concurrency import install_adaptive_concurrency, record_render_failure
+from browser_utils import ContextRecycler, install_resource_blocker, scroll_until_loaded
+from content_cache import RAW_COMPRESSIONS, open_cache
+from crawl_stats import timed_stage
+from html_convert import REPORT_SELECTORS, convert_raw_reports, html_to_markdown, json_to_markdown
+from page_archive import ARCHIVE_DIR, PageArchive
+from report_store import CONTENT_CSV_FILE, CONTENT_JSON_FILE, CONTENT_JSONL_FILE, append_jsonl
+
+HACKERONE_BASE_URL = 'https://hackerone.com'
+
+# JSON mode only issues plain HTTP requests, so it can run far more of them in parallel
+JSON_MODE_CONCURRENCY = 8
+
+# Browser pages open at once; recycling contexts keeps memory flat without going one page at a time
+DEFAULT_MAX_PAGES = 4
+
+# A context is replaced after this many pages, or sooner once Chromium's RSS passes the threshold
+DEFAULT_RECYCLE_PAGES = 50
+DEFAULT_RECYCLE_RSS_MB = 2048
+
+BROWSER_CONTEXT_KWARGS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
 class HackerOneSpiderHacktivity(scrapy.Spider):
     name = "hackerone_hacktivity"
     
@@ -45,125 +72,246 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
                 '--max_old_space_size=4096',  # Increase memory limit
             ]
         },
-        'PLAYWRIGHT_MAX_PAGES_PER_CONTEXT': 1,  # Reduced to prevent memory leaks
+        'PLAYWRIGHT_MAX_PAGES_PER_CONTEXT': DEFAULT_MAX_PAGES,
         'PLAYWRIGHT_CONTEXTS': {
-            'default': {
-                'viewport': {'width': 1920, 'height': 1080},
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+            'default': BROWSER_CONTEXT_KWARGS,
         },
         'DEFAULT_REQUEST_HEADERS': {
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'en',
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         },
-        'FEEDS': {
-            'hackerone_reports_content_output.json': { 
-                'format': 'json',              
-                'encoding': 'utf8',
-                'indent': 4,                   
-                'overwrite': True
-            },
-            'hackerone_reports_content_output.csv': {
-                'format': 'csv',
-                'encoding': 'utf8',
-                'fields': ['url', 'original_report'],
-                'overwrite': True
-            }
-        },
         'AUTOTHROTTLE_ENABLED': True,
         'AUTOTHROTTLE_START_DELAY': 0.5,
         'AUTOTHROTTLE_MAX_DELAY': 10,
         'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,
+        'EXTENSIONS': {
+            'crawl_stats.CrawlStats': 500,
+            'adaptive_concurrency.AdaptiveConcurrency': 510,
+        },
     }
 
+    def __init__(self, fetch_mode='browser', base_url=HACKERONE_BASE_URL, output_format='json',
+                 convert='executor', raw_compression='zlib', archive_dir=None,
+                 max_pages=DEFAULT_MAX_PAGES, recycle_pages=DEFAULT_RECYCLE_PAGES,
+                 recycle_rss_mb=DEFAULT_RECYCLE_RSS_MB, adaptive=False, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if output_format not in ('json', 'jsonl'):
+            raise ValueError(f"Unknown output_format {output_format!r}, expected 'json' or 'jsonl'")
+        self.output_format = output_format
+        if fetch_mode not in ('json', 'browser'):
+            raise ValueError(f"Unknown fetch_mode {fetch_mode!r}, expected 'json' or 'browser'")
+        self.fetch_mode = fetch_mode
+        # Rendered pages keep their raw innerHTML; 'executor' converts it off the event loop as it
+        # arrives, 'deferred' leaves conversion to a batch step when the crawl is done
+        if convert not in ('executor', 'deferred'):
+            raise ValueError(f"Unknown convert {convert!r}, expected 'executor' or 'deferred'")
+        self.convert = convert
+        if raw_compression not in RAW_COMPRESSIONS:
+            raise ValueError(f"Unknown raw_compression {raw_compression!r}, expected one of {RAW_COMPRESSIONS}")
+        self.raw_compression = raw_compression
+        self.max_pages = max(1, int(max_pages))
+        self.recycle_pages = max(1, int(recycle_pages))
+        self.recycle_rss_mb = float(recycle_rss_mb) if recycle_rss_mb else None
+        # Scrapy passes -a arguments as strings
+        self.adaptive = str(adaptive).lower() in ('1', 'true', 'yes')
+        # Overridable so the spider can be pointed at a local fixture server
+        self.base_url = base_url.rstrip('/')
+
+        # Fetched bodies are committed here as they arrive, so a rerun only fetches the remainder
+        self.cache = open_cache(seed_file=CONTENT_JSON_FILE)
+        self.logger.info(f"Content cache holds {len(self.cache)} reports")
+
+        # Optionally archive every fetched page so extraction can be re-run offline (html_convert.py --from-archive).
+        # Compression and index commits run on one worker thread, so they never stall the event loop
+        self.archive = PageArchive(archive_dir) if archive_dir else None
+        self.archive_executor = ThreadPoolExecutor(max_workers=1) if self.archive else None
+
+        if self.output_format == 'jsonl' and not os.path.exists(CONTENT_JSONL_FILE):
+            # Start the append-only store from everything fetched so far
+            append_jsonl(CONTENT_JSONL_FILE, self.cache.iter_records())
+
+    def closed(self, reason):
+        """Export the full content cache to the JSON/CSV outputs used by merge_reports.py"""
+        if self.convert == 'deferred':
+            self.convert_deferred()
+        if self.archive:
+            self.archive_executor.shutdown(wait=True)
+            fetches, objects, size, compressed = self.archive.stats()
+            self.logger.info(f"Page archive: {fetches} fetches, {objects} distinct pages, "
+                             f"{size / 1e6:.1f} MB stored as {compressed / 1e6:.1f} MB")
+            self.archive.close()
+        if self.output_format == 'jsonl':
+            # New items were already appended by the feed
+            self.cache.close()
+            return
+        try:
+            self.cache.export_json(CONTENT_JSON_FILE)
+            self.cache.export_csv(CONTENT_CSV_FILE)
+            self.logger.info(f"Exported {len(self.cache)} cached reports ({reason})")
+        finally:
+            self.cache.close()
+
+    def convert_deferred(self):
+        """Batch-convert the raw HTML stored during the crawl"""
+        start_time = time.time()
+        records = convert_raw_reports(self.cache, self.cache.unconverted_urls())
+        if self.output_format == 'jsonl':
+            count = append_jsonl(CONTENT_JSONL_FILE, records)
+        else:
+            count = sum(1 for _ in records)
+        self.logger.info(f"Converted {count} deferred reports in {time.time() - start_time:.2f}s")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        install_resource_blocker(crawler)
+        spider.contexts = ContextRecycler('reports', spider.recycle_pages, spider.recycle_rss_mb,
+                                          logger=spider.logger, crawler=crawler)
+        crawler.settings.set('PLAYWRIGHT_MAX_PAGES_PER_CONTEXT', spider.max_pages, priority='spider')
+        if spider.output_format == 'jsonl':
+            crawler.settings.set('FEEDS', {
+                CONTENT_JSONL_FILE: {
+                    'format': 'jsonlines',
+                    'encoding': 'utf8',
+                    'overwrite': False
+                }
+            }, priority='spider')
+        if spider.fetch_mode == 'json':
+            # Browser pages are only opened for fallbacks, so lift the one-page-at-a-time limit
+            crawler.settings.set('CONCURRENT_REQUESTS', JSON_MODE_CONCURRENCY, priority='spider')
+            crawler.settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', JSON_MODE_CONCURRENCY, priority='spider')
+            crawler.settings.set('AUTOTHROTTLE_TARGET_CONCURRENCY', float(JSON_MODE_CONCURRENCY), priority='spider')
+        else:
+            crawler.settings.set('CONCURRENT_REQUESTS', spider.max_pages, priority='spider')
+            crawler.settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', spider.max_pages, priority='spider')
+            crawler.settings.set('AUTOTHROTTLE_TARGET_CONCURRENCY', float(spider.max_pages), priority='spider')
+
+        if spider.adaptive:
+            # Start at one page and let the controller work up to the configured ceiling
+            ceiling = JSON_MODE_CONCURRENCY if spider.fetch_mode == 'json' else spider.max_pages
+            install_adaptive_concurrency(crawler, maximum=ceiling, start=1)
+        return spider
+
+    def local_url(self, report_url, suffix=''):
+        """Map a canonical report URL onto the configured base URL"""
+        return f"{self.base_url}{urlparse(report_url).path}{suffix}"
+
+    def browser_request(self, report_url):
+        """Build a Playwright request that renders the full report page"""
+        return scrapy.Request(
+            url=self.local_url(report_url),
+            meta={
+                'playwright': True,
+                'playwright_include_page': True,
+                # wait_for_selector runs in the callback so it is timed apart from navigation
+                'playwright_page_close': True,
+                # Rotated to a fresh context every recycle_pages pages (or on high browser RSS)
+                'playwright_context': self.contexts.acquire(),
+                'playwright_context_kwargs': BROWSER_CONTEXT_KWARGS,
+                'playwright_page_init_callback': self.contexts.page_opened,
+                'report_url': report_url,
+            },
+            callback=self.parse_report_page,
+            errback=self.errback_browser,
+            dont_filter=True
+        )
+
+    def json_request(self, report_url):
+        """Build a plain HTTP request for the report's JSON representation"""
+        return scrapy.Request(
+            url=self.local_url(report_url, '.json'),
+            headers={'Accept': 'application/json'},
+            meta={'report_url': report_url},
+            callback=self.parse_report_json,
+            errback=self.errback_json,
+            dont_filter=True
+        )
+
     async def start(self):
-        """Start method with memory optimization"""
+        """Request every report that is not cached yet"""
         try:
             reports_init = pd.read_json("hackerone_reports_output.json")
-            self.logger.info(f"Loaded {len(reports_init)} reports to process")
+            # Reports with raw HTML only still count as fetched; conversion catches up separately
+            cached_urls = self.cache.cached_urls() | self.cache.raw_urls()
+            pending_urls = [url for url in reports_init['url'] if url not in cached_urls]
+            self.logger.info(f"Loaded {len(reports_init)} reports, {len(pending_urls)} not yet cached to process")
             
-            for i, url in enumerate(reports_init['url']):
-                # Add memory cleanup every 10 requests
-                if i % 10 == 0 and i > 0:
-                    self.logger.info(f"Processed {i} reports, performing memory cleanup...")
-                    await self.cleanup_memory()
-                
-                yield scrapy.Request(
-                    url=url,
-                    meta={
-                        'playwright': True,
-                        'playwright_include_page': True,
-                        'playwright_page_methods': [
-                            PageMethod('wait_for_selector', 'div#report-information', timeout=15000),
-                        ],
-                        'playwright_page_close': True,
-                        'playwright_context': 'default',  # Use shared context
-                    },
-                    callback=self.parse_report_page,
-                    errback=self.errback_handler,
-                    dont_filter=True
-                )
+            for url in pending_urls:
+                if self.fetch_mode == 'json':
+                    yield self.json_request(url)
+                else:
+                    yield self.browser_request(url)
         except Exception as e:
             self.logger.error(f"Error in start method: {e}")
     
-    async def cleanup_memory(self):
-        """Perform memory cleanup to prevent accumulation"""
-        try:
-            import gc
-            gc.collect()
-            self.logger.info("Memory cleanup completed")
-        except Exception as e:
-            self.logger.error(f"Error during memory cleanup: {e}")
-
     def errback_handler(self, failure):
         """Handle request failures"""
         self.logger.error(f"Request failed: {failure.request.url} - {failure.value}")
 
+    def errback_browser(self, failure):
+        """Handle a failed browser request and release its slot in the browser context"""
+        self.errback_handler(failure)
+        self.contexts.release(failure.request.meta['playwright_context'])
+
+    def errback_json(self, failure):
+        """Fall back to rendering the page when the JSON endpoint fails"""
+        report_url = failure.request.meta['report_url']
+        self.logger.warning(f"JSON request failed for {report_url} ({failure.value}), falling back to browser")
+        yield self.browser_request(report_url)
+
+    def extract_markdown_from_json(self, data):
+        """Pull the raw markdown report body out of a report JSON document"""
+        return json_to_markdown(data)
+
+    async def archive_page(self, report_url, content, source):
+        """Add one fetched page to the archive on the archive's worker thread"""
+        await asyncio.get_running_loop().run_in_executor(
+            self.archive_executor, self.archive.put, report_url, content, source
+        )
+
+    async def parse_report_json(self, response):
+        """Parse a report's JSON representation, falling back to Playwright if it has no body"""
+        start_time = time.time()
+        report_url = response.meta['report_url']
+        if self.archive:
+            with timed_stage(self.crawler, 'archive_write'):
+                await self.archive_page(report_url, response.text, 'json')
+
+        try:
+            text = self.extract_markdown_from_json(json.loads(response.text))
+        except ValueError as e:
+            self.logger.warning(f"Invalid JSON for {report_url}: {e}")
+            text = None
+
+        if not text:
+            self.logger.info(f"No vulnerability_information in JSON for {report_url}, falling back to browser")
+            yield self.browser_request(report_url)
+            return
+
+        processing_time = time.time() - start_time
+        self.logger.info(f"Report processed in {processing_time:.2f}s (json): {report_url}")
+
+        with timed_stage(self.crawler, 'store_write'):
+            self.cache.put(report_url, text)
+
+        yield {
+            'url': report_url,
+            'original_report': text
+        }
+
     async def scroll_to_load_all(self, page):
         """Handle infinite scroll to load all content"""
-        previous_count = 0
-        scroll_attempts = 0
-        max_scroll_attempts = 50
-        
-        while scroll_attempts < max_scroll_attempts:
-            try:
-                # Count current items
-                current_items = await page.query_selector_all('.timeline-item')
-                current_count = len(current_items)
-                
-                # If no new items loaded after scrolling, we're done
-                if current_count == previous_count and scroll_attempts > 0:
-                    self.logger.info(f"No new items loaded. Stopping scroll. Total items: {current_count}")
-                    break
-                    
-                previous_count = current_count
-                
-                # Scroll to bottom
-                await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                
-                # Wait for new content to load
-                await page.wait_for_timeout(2000)
-                
-                scroll_attempts += 1
-                self.logger.info(f"Scroll attempt {scroll_attempts}, items loaded: {current_count}")
-                
-            except Exception as e:
-                self.logger.error(f"Error during scrolling: {e}")
-                break
+        return await scroll_until_loaded(page, '.timeline-item', self.logger, max_scrolls=50)
     
     async def get_report_content_css(self, selector):
         """Extract report content using CSS selector"""
         try:
-            report_wrapper = selector.css('div#report-information div.spec-vulnerability-information div.interactive-markdown')
-            if report_wrapper:
-                self.logger.info("Report content found with primary selector.")
-                return 1, report_wrapper[0]
-            
-            report_wrapper = selector.css('div.spec-full-summary-content')
-            if report_wrapper:
-                self.logger.info("Report content found with secondary selector.")
-                return 2, report_wrapper[0]
+            for report_type, css in enumerate(REPORT_SELECTORS, start=1):
+                report_wrapper = selector.css(css)
+                if report_wrapper:
+                    self.logger.info(f"Report content found with selector #{report_type}.")
+                    return report_type, report_wrapper[0]
             
             return 0, None
         except Exception as e:
@@ -198,92 +346,108 @@ class HackerOneSpiderHacktivity(scrapy.Spider):
         clean_text = soup.prettify()            
         return clean_text
     
-    def extract_text_optimized(self, html_content):
-        """Optimized text extraction with minimal processing"""
-        try:
-            # Use BeautifulSoup for basic cleaning only
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove code blocks efficiently
-            for code_block in soup.find_all('div', class_='interactive-markdown__code'):
-                code_block.decompose()
-            
-            # Remove SVG elements
-            for svg in soup.find_all('svg', class_='injected-svg'):
-                svg.decompose()
-            
-            # Convert to markdown with minimal processing
-            text = md(str(soup))
-            
-            # Basic cleanup
-            text = text.strip()
-            
-            return text
-            
-        except Exception as e:
-            self.logger.error(f"Error in text extraction: {e}")
-            # Fallback to basic text extraction
-            return html_content.strip()
-
     async def parse_report_page(self, response):
         """Parse individual report page to extract detailed content - Optimized version"""
         start_time = time.time()
+        report_url = response.meta.get('report_url', response.url)
         
-        self.logger.info(f"Processing Report URL: {response.url}")
+        self.logger.info(f"Processing Report URL: {report_url}")
 
         page = response.meta.get('playwright_page')
         
         try:
+            with timed_stage(self.crawler, 'wait_for_selector'):
+                await page.wait_for_selector('div#report-information', timeout=15000)
+
+            if self.archive:
+                # Archive the whole rendered page first, so a selector miss can be fixed offline
+                with timed_stage(self.crawler, 'archive_write'):
+                    await self.archive_page(report_url, await page.content(), 'browser')
+
             # Use Playwright's built-in selectors instead of loading full HTML
             report_content = None
             
-            # Try primary selector first
-            try:
-                report_element = await page.query_selector('div#report-information div.spec-vulnerability-information div.interactive-markdown')
-                if report_element:
-                    report_content = await report_element.inner_html()
-                    self.logger.info("Report content found with primary selector.")
-            except Exception:
-                pass
-            
-            # Try secondary selector if primary failed
-            if not report_content:
-                try:
-                    report_element = await page.query_selector('div.spec-full-summary-content')
-                    if report_element:
-                        report_content = await report_element.inner_html()
-                        self.logger.info("Report content found with secondary selector.")
-                except Exception:
-                    pass
+            # Try the selectors in order until one matches
+            with timed_stage(self.crawler, 'html_extraction'):
+                for report_type, css in enumerate(REPORT_SELECTORS, start=1):
+                    try:
+                        report_element = await page.query_selector(css)
+                        if report_element:
+                            report_content = await report_element.inner_html()
+                            self.logger.info(f"Report content found with selector #{report_type}.")
+                            break
+                    except Exception:
+                        pass
             
             if not report_content:
-                self.logger.warning(f"No report content found for {response.url}")
+                self.logger.warning(f"No report content found for {report_url}")
                 return
             
-            # Optimized HTML processing - do minimal parsing
-            text = self.extract_text_optimized(report_content)
+            with timed_stage(self.crawler, 'store_write'):
+                self.cache.put_raw(report_url, report_content, self.raw_compression)
+            if self.convert == 'deferred':
+                self.logger.info(f"Stored raw HTML in {time.time() - start_time:.2f}s: {report_url}")
+                return
+
+            # Parse and convert in a worker thread so other in-flight pages keep being serviced
+            with timed_stage(self.crawler, 'html_to_markdown'):
+                text = await asyncio.get_running_loop().run_in_executor(None, html_to_markdown, report_content)
             
             processing_time = time.time() - start_time
-            self.logger.info(f"Report processed in {processing_time:.2f}s: {response.url}")
+            self.logger.info(f"Report processed in {processing_time:.2f}s: {report_url}")
 
             report_data = {
-                'url': response.url,
+                'url': report_url,
                 'original_report': text
             }
+
+            with timed_stage(self.crawler, 'store_write'):
+                self.cache.put(report_url, text)
             
             yield report_data
             
         except Exception as e:
-            self.logger.error(f"Error parsing report URL {response.url}: {e}")
+            self.logger.error(f"Error parsing report URL {report_url}: {e}")
+            record_render_failure(self.crawler, e)
         finally:
             # Ensure page is properly closed
             try:
                 await page.close()
             except Exception:
                 pass
+            # Closes the context once it is retired and its last page is done
+            self.contexts.release(response.meta['playwright_context'])
 
 if __name__ == "__main__":
+    import argparse
     from scrapy.crawler import CrawlerProcess
+
+    parser = argparse.ArgumentParser(description="Scrape HackerOne report bodies")
+    parser.add_argument('--fetch-mode', choices=['json', 'browser'], default='browser',
+                        help="Render every report page with Playwright, or fetch /reports/<id>.json over plain HTTP "
+                             "and render only the reports it fails for")
+    parser.add_argument('--base-url', default=HACKERONE_BASE_URL,
+                        help="Site to fetch reports from, e.g. a local fixture server")
+    parser.add_argument('--output-format', choices=['json', 'jsonl'], default='json',
+                        help=f"Export {CONTENT_JSON_FILE}/.csv from the cache at close, or append to {CONTENT_JSONL_FILE}")
+    parser.add_argument('--convert', choices=['executor', 'deferred'], default='executor',
+                        help="Convert rendered HTML in a worker thread as pages arrive, or in one batch after the crawl")
+    parser.add_argument('--raw-compression', choices=RAW_COMPRESSIONS, default='zlib',
+                        help="How raw report HTML is stored in the content cache")
+    parser.add_argument('--archive-dir', nargs='?', const=ARCHIVE_DIR, metavar='DIR',
+                        help=f"Add every fetched page to a zstd page archive (default dir: {ARCHIVE_DIR}; "
+                             f"requires zstandard)")
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES,
+                        help="Browser pages rendered at once in browser mode")
+    parser.add_argument('--recycle-pages', type=int, default=DEFAULT_RECYCLE_PAGES,
+                        help="Replace the browser context after this many pages")
+    parser.add_argument('--recycle-rss-mb', type=float, default=DEFAULT_RECYCLE_RSS_MB,
+                        help="Replace the browser context early once browser RSS exceeds this (0 disables)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Let the adaptive concurrency controller pick parallel requests from latency and errors")
+    parser.add_argument('--stats-file', help="JSON crawl stats summary (default crawl_stats_<spider>.json)")
+    parser.add_argument('--prometheus-file', help="Also write the crawl stats in Prometheus text format")
+    args = parser.parse_args()
     
     # Configure logging
     logging.basicConfig(
@@ -291,6 +455,14 @@ if __name__ == "__main__":
         format='%(asctime)s [%(name)s] %(levelname)s: %(message)s'
     )
     
-    process = CrawlerProcess()
-    process.crawl(HackerOneSpiderHacktivity)
+    process = CrawlerProcess({
+        'CRAWL_STATS_FILE': args.stats_file,
+        'CRAWL_STATS_PROMETHEUS_FILE': args.prometheus_file,
+    })
+    process.crawl(HackerOneSpiderHacktivity, fetch_mode=args.fetch_mode, base_url=args.base_url,
+                  output_format=args.output_format, convert=args.convert,
+                  raw_compression=args.raw_compression,
+                  archive_dir=args.archive_dir,
+                  max_pages=args.max_pages, recycle_pages=args.recycle_pages,
+                  recycle_rss_mb=args.recycle_rss_mb, adaptive=args.adaptive)
     process.start()
\ No newline at end of file
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+HTML-to-markdown conversion of report bodies, run apart from the crawl
+
+The content spider stores each report's raw innerHTML in the content cache. This module turns
+it into the markdown body used downstream, either in a worker thread during the crawl or as a
+batch step afterwards, so conversion rules can change without re-crawling. Bodies can also be
+re-extracted from the page archive, so selector changes do not need a re-crawl either.
+"""
+
+import argparse
+import json
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from markdownify import markdownify as md
+
+from content_cache import CACHE_FILE, ContentCache
+from page_archive import ARCHIVE_DIR, PageArchive
+from report_store import CONTENT_CSV_FILE, CONTENT_JSON_FILE, CONTENT_JSONL_FILE, append_jsonl
+
+logger = logging.getLogger(__name__)
+
+# Reports sent to each worker per task in batch conversion
+CHUNK_SIZE = 16
+
+# Report body containers on a rendered report page, tried in order
+REPORT_SELECTORS = [
+    'div#report-information div.spec-vulnerability-information div.interactive-markdown',
+    'div.spec-full-summary-content',
+]
+
+# Fenced code blocks are dropped, matching the removal of interactive-markdown__code divs in browser mode
+FENCED_CODE_BLOCK_RE = re.compile(r'^[ \t]*(```|~~~).*?^[ \t]*\1[^\n]*$\n?', re.MULTILINE | re.DOTALL)
+
+# JSON bodies are the reporter's own markdown and rendered pages go through markdownify, so both are
+# brought to one dialect: '*' list markers at every depth, '#' headings, no backslash escapes.
+# Otherwise count_bullets() and the character-based rates would depend on how a report was fetched
+MARKDOWNIFY_OPTIONS = {'bullets': '*', 'heading_style': 'ATX', 'escape_asterisks': False, 'escape_underscores': False}
+# '-' and '+' list markers, but not '- - -' style rules
+LIST_MARKER_RE = re.compile(r'^([ \t]*)[-+](?=[ \t]+\S)(?!(?:[ \t]*[-*_]){2,}[ \t]*$)', re.MULTILINE)
+TRAILING_SPACE_RE = re.compile(r'[ \t]+$', re.MULTILINE)
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def normalize_markdown(text: str) -> str:
+    """Bring a markdown body to the shared dialect, whichever way it was fetched"""
+    text = LIST_MARKER_RE.sub(r'\1*', text)
+    text = TRAILING_SPACE_RE.sub('', text)
+    return BLANK_LINES_RE.sub('\n\n', text).strip()
+
+
+def html_to_markdown(html_content: str) -> str:
+    """Strip code blocks and menu SVGs from a report's innerHTML and convert it to markdown"""
+    try:
+        # Use BeautifulSoup for basic cleaning only
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Remove code blocks efficiently
+        for code_block in soup.find_all('div', class_='interactive-markdown__code'):
+            code_block.decompose()
+
+        # Remove SVG elements
+        for svg in soup.find_all('svg', class_='injected-svg'):
+            svg.decompose()
+
+        # Convert to markdown with minimal processing
+        return normalize_markdown(md(str(soup), **MARKDOWNIFY_OPTIONS))
+
+    except Exception as e:
+        logger.error(f"Error in text extraction: {e}")
+        # Fallback to basic text extraction
+        return html_content.strip()
+
+
+def json_to_markdown(data: Dict[str, Any]) -> Optional[str]:
+    """Pull the raw markdown report body out of a report JSON document"""
+    markdown = data.get('vulnerability_information')
+    if not markdown:
+        return None
+    return normalize_markdown(FENCED_CODE_BLOCK_RE.sub('', markdown))
+
+
+def extract_report_html(page_html: str) -> Optional[str]:
+    """Find the report body container in a full rendered page, as parse_report_page does live"""
+    from parsel import Selector
+
+    selector = Selector(text=page_html)
+    for css in REPORT_SELECTORS:
+        match = selector.css(css)
+        if match:
+            return match[0].get()
+    return None
+
+
+def extract_archived(item: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+    """Re-run extraction on one archived fetch (url, source, content); None if it holds no body"""
+    url, source, content = item
+    if source == 'json':
+        try:
+            text = json_to_markdown(json.loads(content))
+        except ValueError:
+            text = None
+    else:
+        report_html = extract_report_html(content)
+        text = html_to_markdown(report_html) if report_html else None
+    return {'url': url, 'original_report': text} if text else None
+
+
+def _convert(item: Tuple[str, str]) -> Dict[str, Any]:
+    url, html = item
+    return {'url': url, 'original_report': html_to_markdown(html)}
+
+
+def convert_raw_reports(cache: ContentCache, urls: Optional[Iterable[str]] = None, workers: int = 1,
+                        chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Convert stored raw HTML (default: every report), store the bodies and yield them in fetch order"""
+    raw = cache.iter_raw(urls)
+
+    if workers <= 1:
+        for item in raw:
+            record = _convert(item)
+            cache.put_many([record])
+            yield record
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(islice(raw, workers * chunk_size))
+            if not batch:
+                break
+            records = list(pool.map(_convert, batch, chunksize=chunk_size))
+            cache.put_many(records)
+            yield from records
+
+
+def reextract_archive(archive: PageArchive, cache: ContentCache, workers: int = 1,
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Re-extract every report body from its newest archived page, store them and yield them"""
+    pages = archive.iter_latest()
+
+    if workers <= 1:
+        for item in pages:
+            record = extract_archived(item)
+            if record:
+                cache.put_many([record])
+                yield record
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(islice(pages, workers * chunk_size))
+            if not batch:
+                break
+            records = [record for record in pool.map(extract_archived, batch, chunksize=chunk_size) if record]
+            cache.put_many(records)
+            yield from records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert stored raw report HTML to markdown bodies")
+    parser.add_argument('--cache', default=CACHE_FILE, help="Content cache holding the raw HTML")
+    parser.add_argument('--all', action='store_true',
+                        help="Re-convert every stored report, e.g. after changing the conversion rules")
+    parser.add_argument('--from-archive', nargs='?', const=ARCHIVE_DIR, metavar='DIR',
+                        help="Re-extract every report from the page archive (selectors and cleaning) instead")
+    parser.add_argument('--workers', type=int, default=1, help="Processes converting reports")
+    parser.add_argument('--output-format', choices=['json', 'jsonl'], default='json',
+                        help=f"Re-export {CONTENT_JSON_FILE}/.csv from the cache, or append to {CONTENT_JSONL_FILE}")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    cache = ContentCache(args.cache)
+    archive = PageArchive(args.from_archive) if args.from_archive else None
+    try:
+        if archive:
+            records = reextract_archive(archive, cache, args.workers)
+        else:
+            urls = None if args.all else cache.unconverted_urls()
+            records = convert_raw_reports(cache, urls, args.workers)
+        if args.output_format == 'jsonl':
+            # Later lines win, so re-converted bodies replace the old ones for readers
+            count = append_jsonl(CONTENT_JSONL_FILE, records)
+        else:
+            count = sum(1 for _ in records)
+            cache.export_json(CONTENT_JSON_FILE)
+            cache.export_csv(CONTENT_CSV_FILE)
+        print(f"Converted {count} reports in {time.time() - start_time:.2f}s")
+    finally:
+        cache.close()
+        if archive:
+            archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Long-running ingestion service: poll hacktivity, fetch new report bodies, update every derived store
+
+Replaces the hacktivity spider -> reports spider -> merge_reports.py batch run for day-to-day
+freshness. Each team's hacktivity feed is polled every --interval seconds in a headless browser;
+only the newest batch is read, and reports not seen before are queued. Fetch workers pull each
+report's /reports/<id>.json body, and a single store task applies small batches of finished
+reports to the content cache (so the spiders skip them), the full-text index, the near-duplicate
+index, the feature table, the slop score table (with --model) and the metric rollup cube. Each of
+these batch updates costs the same per report whatever the size of the corpus.
+
+The stores the batch tools and analysis.r read are whole JSON arrays and CSV tables:
+hackerone_reports_output.json, _content_output.json/.csv, _combined.json and the cluster and
+rollup CSVs. These cannot be appended to, so each export rewrites them in full and costs time
+proportional to the corpus. Stored reports are therefore journalled to
+hackerone_ingest_pending.jsonl and exported at most every --export-interval seconds, and on
+shutdown. A journal left by a crash is exported on the next start. The JSONL stores
+(hackerone_reports_output.jsonl, _content_output.jsonl) are appended to per batch when present.
+Typo and sentiment features need their scorers: a later metrics.py --typos --sentiment run over
+the merged output covers the daemon's reports too, followed by rollups.py.
+
+Queue depth, the age of the oldest queued report and the discovery/disclosure-to-stored lag are
+logged periodically and served in Prometheus text format with --metrics-port (/metrics, and
+/status as JSON).
+"""
+
+import argparse
+import asyncio
+import csv
+import http.client
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlparse
+from urllib.request import Request, urlopen
+
+from playwright.async_api import async_playwright
+
+from browser_utils import (
+    DEFAULT_ALLOWED_DOMAINS, DEFAULT_ALLOWED_RESOURCE_TYPES, DEFAULT_BLOCKED_URL_PATTERNS, ResourceBlocker
+)
+from content_cache import open_cache
+from hackerone_scraper_hacktivity import (
+    HACKERONE_BASE_URL, HACKTIVITY_ITEM_SELECTOR, REPORT_LINK_SELECTOR, TEAMS_FILE, load_teams
+)
+from html_convert import json_to_markdown
+from metrics import FEATURE_COLUMNS, FEATURES_FILE, extract_features
+from near_duplicates import CLUSTERS_FILE, NearDuplicateIndex, write_clusters
+from parquet_store import parse_report_date, to_utc
+from report_index import ReportIndex, report_date
+from report_store import (
+    COMBINED_FILE, CONTENT_CSV_FILE, CONTENT_JSON_FILE, CONTENT_JSONL_FILE, REPORTS_FILE, REPORTS_JSONL_FILE,
+    append_jsonl, load_known_urls, load_records, prepend_records
+)
+from rollups import ROLLUP_CSV_FILE, RollupStore, collect_updates, export_cells
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 300.0
+DEFAULT_FETCH_WORKERS = 2
+
+# Finished reports are applied to the stores in batches of up to this many, or after this long
+STORE_BATCH_SIZE = 20
+STORE_FLUSH_SECONDS = 5.0
+
+# Reports stored since the last export to the JSON stores, one per line
+PENDING_FILE = 'hackerone_ingest_pending.jsonl'
+
+# Each export rewrites the JSON stores and CSV tables whole, so it is spaced out
+DEFAULT_EXPORT_INTERVAL = 300.0
+STATUS_INTERVAL = 60.0
+
+FETCH_RETRIES = 3
+FETCH_TIMEOUT = 30
+FEED_TIMEOUT = 30000  # ms to wait for the first hacktivity items
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/91.0.4472.124 Safari/537.36')
+
+# Reads every loaded hacktivity item with the selectors the hacktivity spider uses
+FEED_ITEMS_JS = """
+(args) => Array.from(document.querySelectorAll(args.itemSelector)).map(item => {
+    const text = (selector) => {
+        const element = item.querySelector(selector);
+        return element ? element.textContent.trim() : null;
+    };
+    const link = item.querySelector(args.linkSelector);
+    const dated = item.querySelector('span[title]');
+    return {
+        title: text('div[data-testid="report-title"] span.line-clamp-2'),
+        href: link ? link.getAttribute('href') : null,
+        bounty: text('.spec-amount-in-currency span'),
+        severity: text('span[data-testid="report-severity"] span span span span span'),
+        date: dated ? dated.getAttribute('title') : null,
+    };
+})
+"""
+
+
+def overview_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in record.items() if key != 'original_report'}
+
+
+def overview_record(team: str, item: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Hacktivity item in the layout the hacktivity spider emits"""
+    metadata = {key: item[key] for key in ('bounty', 'severity', 'date') if item.get(key)}
+    return {
+        'team': team,
+        'title': item.get('title'),
+        'url': urljoin(HACKERONE_BASE_URL, item['href']),
+        'hacktivity_metadata': metadata,
+    }
+
+
+def fetch_report_body(base_url: str, report_url: str) -> Optional[str]:
+    """Markdown body from a report's JSON document; None when it has none, HTTPError/URLError on failure"""
+    request = Request(f"{base_url}{urlparse(report_url).path}.json",
+                      headers={'Accept': 'application/json', 'User-Agent': USER_AGENT})
+    with urlopen(request, timeout=FETCH_TIMEOUT) as response:
+        return json_to_markdown(json.loads(response.read().decode('utf-8')))
+
+
+def disclosure_time(record: Dict[str, Any]) -> Optional[float]:
+    raw = (record.get('hacktivity_metadata') or {}).get('date')
+    disclosed = to_utc(parse_report_date(raw), raw)
+    return disclosed.timestamp() if disclosed else None
+
+
+def append_feature_rows(rows: List[Dict[str, Any]], filepath: str = FEATURES_FILE) -> None:
+    """Append rows under the feature table's existing header; columns the daemon does not compute stay empty"""
+    columns = FEATURE_COLUMNS
+    exists = os.path.exists(filepath) and os.path.getsize(filepath) > 0
+    if exists:
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            columns = next(csv.reader(f))
+    with open(filepath, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval='', extrasaction='ignore', lineterminator='\n')
+        if not exists:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def append_scores(scores: List[Tuple[str, float]], filepath: str) -> None:
+    exists = os.path.exists(filepath) and os.path.getsize(filepath) > 0
+    with open(filepath, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        if not exists:
+            writer.writerow(['url', 'slop_score'])
+        writer.writerows([url, round(score, 6)] for url, score in scores)
+
+
+class Stores:
+    """Every store the daemon updates; created and used only on the store thread (SQLite connections are per-thread)"""
+
+    def __init__(self, model_file: Optional[str], export_interval: float):
+        self.export_interval = export_interval
+        self.cache = open_cache(seed_file=CONTENT_JSON_FILE)
+        self.index = ReportIndex()
+        self.clusters = NearDuplicateIndex()
+        # Loaded once and extended with each batch's links, so exports do not re-read every pair
+        self.forest = self.clusters.forest()
+        self.rollups = RollupStore()
+        self.model = None
+        if model_file:
+            from slop_score import SlopModel
+            self.model = SlopModel.load(model_file)
+        self.pending = load_records(PENDING_FILE)
+        self.dirty = bool(self.pending)
+        self.last_export = 0.0
+        if self.pending:
+            logger.info(f"Exporting {len(self.pending)} reports journalled before the last shutdown")
+            self.export()
+
+    def known_urls(self) -> set:
+        return self.cache.cached_urls() | load_known_urls([REPORTS_FILE, REPORTS_JSONL_FILE, COMBINED_FILE])
+
+    def apply(self, records: List[Dict[str, Any]]) -> None:
+        """Store a batch of merged reports (overview fields plus original_report) and update everything derived"""
+        content = [{'url': record['url'], 'original_report': record['original_report']} for record in records]
+        self.cache.put_many(content)
+        append_jsonl(PENDING_FILE, records)
+        self.pending.extend(records)
+        # Keep the append-only stores of the JSONL workflow in step when it is in use
+        if os.path.exists(CONTENT_JSONL_FILE):
+            append_jsonl(CONTENT_JSONL_FILE, content)
+        if os.path.exists(REPORTS_JSONL_FILE):
+            append_jsonl(REPORTS_JSONL_FILE, [overview_fields(record) for record in records])
+
+        self.index.update(records)
+        self.clusters.update(records)
+        for record in records:
+            self.forest.add(record['url'], report_date(record))
+        for url_a, url_b in self.clusters.links(record['url'] for record in records):
+            self.forest.link(url_a, url_b)
+
+        features = {record['url']: extract_features(record) for record in records}
+        if self.model:
+            scores = self.model.score_batch(records).tolist()
+            from slop_score import SCORES_FILE
+            append_scores(list(zip(features, scores)), SCORES_FILE)
+        append_feature_rows(list(features.values()))
+        self.rollups.apply(collect_updates(records, features))
+        self.dirty = True
+
+        if time.time() - self.last_export >= self.export_interval:
+            self.export()
+
+    def export(self) -> None:
+        """Rewrite the JSON stores with the journalled reports, and the cluster and rollup CSVs the R side reads
+
+        Every file is written whole, so this is O(corpus); it runs at most every export_interval seconds.
+        """
+        if self.pending:
+            # Newest first, as the hacktivity feed and its incremental crawl order them
+            newest_first = sorted(self.pending, key=lambda record: disclosure_time(record) or 0.0, reverse=True)
+            prepend_records(REPORTS_FILE, [overview_fields(record) for record in newest_first])
+            prepend_records(COMBINED_FILE, newest_first)
+            self.cache.export_json(CONTENT_JSON_FILE)
+            self.cache.export_csv(CONTENT_CSV_FILE)
+            # prepend_records skips known URLs, so a crash before this point only repeats the export
+            os.remove(PENDING_FILE)
+            logger.info(f"Exported {len(self.pending)} reports to {REPORTS_FILE}, {CONTENT_JSON_FILE} and {COMBINED_FILE}")
+            self.pending = []
+        if self.dirty:
+            write_clusters(self.forest.rows(), CLUSTERS_FILE)
+            export_cells(self.rollups.cells(), ROLLUP_CSV_FILE)
+            self.dirty = False
+        self.last_export = time.time()
+
+    def close(self) -> None:
+        self.export()
+        for store in (self.cache, self.index, self.clusters, self.rollups):
+            store.close()
+
+
+class IngestMetrics:
+    """Counters and gauges describing the daemon's progress"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {'polls': 0, 'poll_errors': 0, 'discovered': 0, 'fetched': 0, 'fetch_errors': 0,
+                         'no_body': 0, 'stored': 0}
+        self.last_poll: Dict[str, float] = {}
+        self.last_discovery_lag: Optional[float] = None
+        self.last_disclosure_lag: Optional[float] = None
+
+    def observe_stored(self, discovered_at: float, disclosed_at: Optional[float]) -> None:
+        now = time.time()
+        self.counters['stored'] += 1
+        self.last_discovery_lag = now - discovered_at
+        if disclosed_at is not None:
+            self.last_disclosure_lag = now - disclosed_at
+
+    def snapshot(self, queues: Dict[str, asyncio.Queue], oldest_pending: Optional[float]) -> Dict[str, Any]:
+        return {
+            'uptime': time.time() - self.started,
+            'queue_depth': {name: queue.qsize() for name, queue in queues.items()},
+            'oldest_pending_seconds': time.time() - oldest_pending if oldest_pending else 0.0,
+            'last_discovery_lag_seconds': self.last_discovery_lag,
+            'last_disclosure_lag_seconds': self.last_disclosure_lag,
+            'last_poll': dict(self.last_poll),
+            **self.counters,
+        }
+
+    def prometheus_text(self, snapshot: Dict[str, Any]) -> str:
+        lines = ['# TYPE ingest_queue_depth gauge']
+        lines += [f'ingest_queue_depth{{queue="{name}"}} {depth}' for name, depth in snapshot['queue_depth'].items()]
+        for name, key in (('ingest_oldest_pending_seconds', 'oldest_pending_seconds'),
+                          ('ingest_discovery_lag_seconds', 'last_discovery_lag_seconds'),
+                          ('ingest_disclosure_lag_seconds', 'last_disclosure_lag_seconds')):
+            if snapshot[key] is not None:
+                lines += [f'# TYPE {name} gauge', f'{name} {snapshot[key]:.3f}']
+        lines.append('# TYPE ingest_last_poll_timestamp gauge')
+        lines += [f'ingest_last_poll_timestamp{{team="{team}"}} {at:.0f}' for team, at in snapshot['last_poll'].items()]
+        for key in self.counters:
+            lines += [f'# TYPE ingest_{key}_total counter', f'ingest_{key}_total {snapshot[key]}']
+        return '\n'.join(lines) + '\n'
+
+
+class IngestDaemon:
+    """Pollers feed a fetch queue, fetch workers feed a store queue, one store task drains it in batches"""
+
+    def __init__(self, teams: List[str], base_url: str = HACKERONE_BASE_URL, interval: float = DEFAULT_POLL_INTERVAL,
+                 workers: int = DEFAULT_FETCH_WORKERS, model_file: Optional[str] = None, export_interval: float = DEFAULT_EXPORT_INTERVAL,
+                 metrics_port: Optional[int] = None):
+        self.teams = teams
+        self.base_url = base_url.rstrip('/')
+        self.interval = interval
+        self.workers = max(1, workers)
+        self.model_file = model_file
+        self.export_interval = export_interval
+        self.metrics_port = metrics_port
+
+        self.fetch_queue: asyncio.Queue = asyncio.Queue()
+        self.store_queue: asyncio.Queue = asyncio.Queue()
+        # Discovery time of every report queued but not stored yet, for the oldest-pending gauge
+        self.pending: Dict[str, float] = {}
+        self.known: set = set()
+        self.metrics = IngestMetrics()
+        self.stopping = asyncio.Event()
+        # SQLite connections belong to the thread that opened them, so all store work runs on one thread
+        self.store_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest-store')
+        self.stores: Optional[Stores] = None
+        self.browser = None
+
+    async def on_store_thread(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.store_thread, func, *args)
+
+    def status(self) -> Dict[str, Any]:
+        oldest = min(self.pending.values()) if self.pending else None
+        return self.metrics.snapshot({'fetch': self.fetch_queue, 'store': self.store_queue}, oldest)
+
+    async def read_feed(self, team: str) -> List[Dict[str, Optional[str]]]:
+        """Load a team's hacktivity page and read its first batch of items (newest first)"""
+        context = await self.browser.new_context()
+        blocker = ResourceBlocker(DEFAULT_ALLOWED_RESOURCE_TYPES, DEFAULT_ALLOWED_DOMAINS, DEFAULT_BLOCKED_URL_PATTERNS)
+
+        async def route(request_route):
+            if blocker(request_route.request):
+                await request_route.abort()
+            else:
+                await request_route.continue_()
+
+        try:
+            page = await context.new_page()
+            await page.route('**/*', route)
+            await page.goto(f'{self.base_url}/{team}/hacktivity?type=team', wait_until='domcontentloaded')
+            await page.wait_for_selector(HACKTIVITY_ITEM_SELECTOR, timeout=FEED_TIMEOUT)
+            return await page.evaluate(FEED_ITEMS_JS, {
+                'itemSelector': HACKTIVITY_ITEM_SELECTOR,
+                'linkSelector': REPORT_LINK_SELECTOR,
+            })
+        finally:
+            # A fresh context per poll keeps a week-long run from accumulating browser memory
+            await context.close()
+
+    async def sleep_unless_stopped(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=max(0.0, seconds))
+        except asyncio.TimeoutError:
+            pass
+
+    async def poll_team(self, team: str, delay: float) -> None:
+        await self.sleep_unless_stopped(delay)
+        while not self.stopping.is_set():
+            started = time.time()
+            self.metrics.counters['polls'] += 1
+            try:
+                items = await self.read_feed(team)
+            except Exception as e:
+                self.metrics.counters['poll_errors'] += 1
+                logger.warning(f"[{team}] Hacktivity poll failed: {e}")
+                items = []
+            else:
+                self.metrics.last_poll[team] = time.time()
+
+            fresh = [overview_record(team, item) for item in items if item.get('href')]
+            fresh = [record for record in fresh if record['url'] not in self.known]
+            for record in fresh:
+                self.known.add(record['url'])
+                self.pending[record['url']] = time.time()
+                self.fetch_queue.put_nowait(record)
+            self.metrics.counters['discovered'] += len(fresh)
+            if fresh:
+                logger.info(f"[{team}] {len(fresh)} new reports queued")
+            if items and len(fresh) == len(items) and self.metrics.last_poll.get(team, 0) > started:
+                logger.warning(f"[{team}] Every item on the first feed page is new; older reports may have been "
+                               f"missed, backfill with hackerone_scraper_hacktivity.py --incremental")
+
+            await self.sleep_unless_stopped(self.interval - (time.time() - started))
+
+    async def fetch_worker(self) -> None:
+        while True:
+            record = await self.fetch_queue.get()
+            try:
+                try:
+                    body = await self.fetch_with_retries(record['url'])
+                except Exception as e:
+                    # Nothing awaits the workers until shutdown, so an escaping error would end this one silently
+                    self.metrics.counters['fetch_errors'] += 1
+                    logger.exception(f"Unexpected error fetching {record['url']}: {e}")
+                    self.known.discard(record['url'])
+                    body = None
+                if body:
+                    self.metrics.counters['fetched'] += 1
+                    self.store_queue.put_nowait(dict(record, original_report=body))
+                else:
+                    self.pending.pop(record['url'], None)
+            finally:
+                self.fetch_queue.task_done()
+
+    async def fetch_with_retries(self, report_url: str) -> Optional[str]:
+        for attempt in range(FETCH_RETRIES):
+            try:
+                body = await asyncio.to_thread(fetch_report_body, self.base_url, report_url)
+            except HTTPError as e:
+                if e.code < 500 and e.code != 429:
+                    self.metrics.counters['fetch_errors'] += 1
+                    logger.warning(f"Report JSON unavailable for {report_url} ({e.code})")
+                    return None
+                error = e
+            except (URLError, http.client.HTTPException, ConnectionError, TimeoutError, ValueError) as e:
+                # HTTPException includes a body cut off mid-read (IncompleteRead)
+                error = e
+            else:
+                if not body:
+                    self.metrics.counters['no_body'] += 1
+                    logger.warning(f"No vulnerability_information in JSON for {report_url}; "
+                                   f"hackerone_scraper_reports.py --fetch-mode browser can render it")
+                return body
+            await asyncio.sleep(2 ** attempt)
+        self.metrics.counters['fetch_errors'] += 1
+        logger.warning(f"Giving up on {report_url} after {FETCH_RETRIES} attempts: {error}")
+        # Forget it so the next poll queues it again
+        self.known.discard(report_url)
+        return None
+
+    async def store_batches(self) -> None:
+        """Apply finished reports in batches of up to STORE_BATCH_SIZE, waiting at most STORE_FLUSH_SECONDS"""
+        while True:
+            batch = [await self.store_queue.get()]
+            deadline = time.time() + STORE_FLUSH_SECONDS
+            while len(batch) < STORE_BATCH_SIZE:
+                try:
+                    batch.append(await asyncio.wait_for(self.store_queue.get(), timeout=max(0.0, deadline - time.time())))
+                except asyncio.TimeoutError:
+                    break
+            await self.store(batch)
+
+    async def store(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await self.on_store_thread(self.stores.apply, batch)
+        except Exception as e:
+            logger.error(f"Failed to store {len(batch)} reports: {e}")
+            for record in batch:
+                self.known.discard(record['url'])
+                self.pending.pop(record['url'], None)
+        else:
+            for record in batch:
+                self.metrics.observe_stored(self.pending.pop(record['url'], time.time()), disclosure_time(record))
+            logger.info(f"Stored {len(batch)} reports (discovery lag {self.metrics.last_discovery_lag:.1f}s)")
+        finally:
+            for _ in batch:
+                self.store_queue.task_done()
+
+    async def report_status(self) -> None:
+        while True:
+            await asyncio.sleep(STATUS_INTERVAL)
+            status = self.status()
+            logger.info(f"Queues fetch={status['queue_depth']['fetch']} store={status['queue_depth']['store']}, "
+                        f"oldest pending {status['oldest_pending_seconds']:.0f}s, stored {status['stored']}, "
+                        f"fetch errors {status['fetch_errors']}, poll errors {status['poll_errors']}")
+
+    async def serve_metrics(self, reader, writer) -> None:
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()).strip():
+                pass
+            path = request_line[1] if len(request_line) > 1 else '/'
+            status = self.status()
+            if path.startswith('/status'):
+                body, content_type = json.dumps(status, indent=2), 'application/json'
+            else:
+                body, content_type = self.metrics.prometheus_text(status), 'text/plain; version=0.0.4'
+            data = body.encode('utf-8')
+            writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+                         f"Connection: close\r\n\r\n".encode('latin-1') + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def run(self) -> None:
+        self.stores = await self.on_store_thread(Stores, self.model_file, self.export_interval)
+        self.known = await self.on_store_thread(self.stores.known_urls)
+        logger.info(f"Watching {len(self.teams)} teams every {self.interval:.0f}s, {len(self.known)} reports known")
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stopping.set)
+
+        server = None
+        if self.metrics_port:
+            server = await asyncio.start_server(self.serve_metrics, '127.0.0.1', self.metrics_port)
+            logger.info(f"Metrics at http://127.0.0.1:{self.metrics_port}/metrics")
+
+        async with async_playwright() as playwright:
+            self.browser = await playwright.chromium.launch(headless=True, args=['--no-sandbox', '--disable-dev-shm-usage'])
+            # Spread the team polls over the interval instead of hitting every feed at once
+            spacing = self.interval / max(len(self.teams), 1)
+            pollers = [asyncio.create_task(self.poll_team(team, i * spacing)) for i, team in enumerate(self.teams)]
+            tasks = [asyncio.create_task(self.fetch_worker()) for _ in range(self.workers)]
+            tasks += [asyncio.create_task(self.store_batches()), asyncio.create_task(self.report_status())]
+
+            await self.stopping.wait()
+            logger.info("Stopping: finishing queued reports")
+            await asyncio.gather(*pollers, return_exceptions=True)
+            await self.fetch_queue.join()
+            await self.store_queue.join()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.browser.close()
+
+        if server:
+            server.close()
+            await server.wait_closed()
+        await self.on_store_thread(self.stores.close)
+        self.store_thread.shutdown()
+        logger.info(f"Stopped after storing {self.metrics.counters['stored']} reports")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch hacktivity feeds and ingest new reports as they appear")
+    parser.add_argument('--teams', help="Comma-separated team handles to watch, e.g. curl,nodejs")
+    parser.add_argument('--teams-file', help=f"File with one team handle per line (default: {TEAMS_FILE} if present)")
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between polls of a team")
+    parser.add_argument('--workers', type=int, default=DEFAULT_FETCH_WORKERS, help="Report bodies fetched in parallel")
+    parser.add_argument('--base-url', default=HACKERONE_BASE_URL,
+                        help="Site to poll, e.g. a local fixture_server.py; report URLs stay canonical")
+    parser.add_argument('--model', help="Slop model from slop_score.py train; new reports are scored inline")
+    parser.add_argument('--export-interval', type=float, default=DEFAULT_EXPORT_INTERVAL,
+                        help="Minimum seconds between full rewrites of the JSON stores and CSV tables with new reports")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(name)s] %(levelname)s: %(message)s')
+
+    async def run():
+        daemon = IngestDaemon(load_teams(args.teams, args.teams_file), args.base_url, args.interval, args.workers,
+                              args.model, args.export_interval, args.metrics_port)
+        await daemon.run()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,24 @@
 Script to merge hackerone_reports_output.json with hackerone_reports_content_output.json
 """
 
+import argparse
 import json
+import os
 import sys
-from typing import Dict, List, Any
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
+
+from report_store import (
+    JsonlIndex, RecordWriter, append_jsonl, is_jsonl, iter_latest_records, iter_records, load_records, record_hash
+)
+
+from parquet_store import PARQUET_DIR
+from report_index import INDEX_DB_FILE, update_index
+from slop_score import MODEL_FILE
+
+# Per-URL content hashes of the merged output live next to it
+STATE_SUFFIX = '.state.json'
 
 def load_json_file(filepath: str) -> List[Dict[str, Any]]:
     """Load and parse a JSON file"""
@@ -47,38 +62,271 @@ def merge_reports(reports_data: List[Dict[str, Any]], url_to_content: Dict[str,
     
     return merged_data
 
-def main():
+def merge_reports_streaming(reports: Iterable[Dict[str, Any]],
+                            url_to_content: Union[Dict[str, str], JsonlIndex]) -> Iterator[Dict[str, Any]]:
+    """Merge reports one at a time against a URL -> content lookup (dict or JSONL index)"""
+    for report in reports:
+        merged_report = dict(report)
+        url = report.get('url')
+        merged_report['original_report'] = url_to_content.get(url, "") if url else ""
+        yield merged_report
+
+def build_content_lookup(content_file: str) -> Union[Dict[str, str], JsonlIndex]:
+    """Index the content side: byte offsets for JSONL, an in-memory map for JSON arrays"""
+    if is_jsonl(content_file):
+        return JsonlIndex(content_file)
+    return create_url_to_content_map(load_json_file(content_file))
+
+def load_merge_state(state_file: str) -> Dict[str, str]:
+    """Load the URL -> record hash map written by the previous incremental merge"""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_merge_state(state_file: str, state: Dict[str, str]) -> None:
+    tmp_path = state_file + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_file)
+
+class PreviousOutput:
+    """Lookup of the records in the previous merged output, by URL
+
+    A JSON array output is only loaded on first use, so a run that changes nothing never reads it.
+    """
+
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.index = None
+        self._records = None
+        if os.path.exists(output_file) and is_jsonl(output_file):
+            self.index = JsonlIndex(output_file)
+
+    @property
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        if self._records is None:
+            self._records = {}
+            if os.path.exists(self.output_file) and not self.index:
+                self._records = {record['url']: record for record in load_records(self.output_file) if record.get('url')}
+        return self._records
+
+    def urls(self) -> List[str]:
+        return list(self.index.offsets) if self.index else list(self.records)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        if self.index:
+            return self.index.record(url)
+        return self.records.get(url)
+
+    def close(self) -> None:
+        if self.index:
+            self.index.close()
+
+def incremental_merge(reports: Iterable[Dict[str, Any]],
+                      url_to_content: Union[Dict[str, str], JsonlIndex],
+                      previous: PreviousOutput,
+                      state: Dict[str, str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Merge reports against the previous output, yielding (status, record) and updating `state` in place
+
+    Status is 'added', 'updated' or 'unchanged'. A report whose content is missing keeps the
+    body from the previous output rather than being blanked.
+    """
+    for report in reports:
+        url = report.get('url')
+        merged_report = dict(report)
+        merged_report['original_report'] = url_to_content.get(url, "") if url else ""
+
+        if url and not merged_report['original_report']:
+            previous_report = previous.get(url)
+            if previous_report and previous_report.get('original_report'):
+                merged_report['original_report'] = previous_report['original_report']
+
+        digest = record_hash(merged_report)
+        if url not in state:
+            status = 'added'
+        elif state[url] != digest:
+            status = 'updated'
+        else:
+            status = 'unchanged'
+        if url:
+            state[url] = digest
+        yield status, merged_report
+
+def run_incremental_merge(reports_data: Iterable[Dict[str, Any]],
+                          url_to_content: Union[Dict[str, str], JsonlIndex],
+                          output_file: str, changed: Optional[List[Dict[str, Any]]] = None) -> Counter:
+    """Apply only new or changed records to the merged output and return the delta counts
+
+    When `changed` is given, every added or updated record is also appended to it.
+    """
+    state_file = output_file + STATE_SUFFIX
+    state = load_merge_state(state_file)
+    previous = PreviousOutput(output_file)
+
+    if not state:
+        # First incremental run over an existing output: use it as the baseline
+        for url in previous.urls():
+            state[url] = record_hash(previous.get(url))
+
+    counts = Counter()
+    seen_urls = set()
+    merged = incremental_merge(reports_data, url_to_content, previous, state)
+
+    if is_jsonl(output_file):
+        # Later lines supersede earlier ones, so only new and changed records are appended
+        def changed_records():
+            for status, record in merged:
+                counts[status] += 1
+                if status != 'unchanged':
+                    if changed is not None:
+                        changed.append(record)
+                    yield record
+        append_jsonl(output_file, changed_records())
+    else:
+        # Hash every record before writing anything, so an unchanged output is not rewritten
+        known_urls = list(state)
+        records = []
+        for status, record in merged:
+            counts[status] += 1
+            seen_urls.add(record.get('url'))
+            records.append(record)
+            if changed is not None and status != 'unchanged':
+                changed.append(record)
+        # Reports that dropped out of the overview input are kept
+        counts['retained'] = sum(1 for url in known_urls if url not in seen_urls)
+
+        if counts['added'] or counts['updated'] or not os.path.exists(output_file):
+            with RecordWriter(output_file) as writer:
+                for record in records:
+                    writer.write(record)
+                for url in previous.urls():
+                    if url not in seen_urls:
+                        writer.write(previous.get(url))
+
+    previous.close()
+    save_merge_state(state_file, state)
+    return counts
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Merge hacktivity overviews with report content")
+    parser.add_argument('--reports', default='hackerone_reports_output.json',
+                        help="Overview records (.json array or .jsonl), streamed")
+    parser.add_argument('--content', default='hackerone_reports_content_output.json',
+                        help="Content records (.json array or .jsonl), indexed by URL")
+    parser.add_argument('--output', default='hackerone_reports_combined.json',
+                        help="Merged output; .json keeps the array layout analysis.r reads, .jsonl writes one record per line")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only apply new or changed records to the existing output, keeping bodies missing from the content side")
+    parser.add_argument('--parquet', nargs='?', const=PARQUET_DIR, metavar='DIR',
+                        help="Also write a Parquet dataset partitioned by team and year (requires pyarrow)")
+    parser.add_argument('--index', nargs='?', const=INDEX_DB_FILE, metavar='DB',
+                        help="Also index new and changed reports for full-text search (report_index.py)")
+    parser.add_argument('--score', nargs='?', const=MODEL_FILE, metavar='MODEL',
+                        help="Also score reports with a model trained by slop_score.py (requires numpy); "
+                             "with --incremental only new and changed reports are scored")
+    return parser.parse_args(argv)
+
+def export_parquet(output_file: str, parquet_dir: str) -> None:
+    """Write the merged output as a partitioned Parquet dataset for column-selective loads"""
+    try:
+        from parquet_store import write_parquet_dataset
+        start_time = time.time()
+        rows = write_parquet_dataset(iter_latest_records(output_file), parquet_dir)
+    except ImportError:
+        print("Error: --parquet requires pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    print(f"Wrote {rows} reports to Parquet dataset {parquet_dir} in {time.time() - start_time:.2f}s")
+
+def refresh_index(output_file: str, db: str) -> None:
+    """Bring the full-text index up to date with the merged output"""
+    start_time = time.time()
+    counts = update_index(output_file, db)
+    print(f"Updated full-text index {db} in {time.time() - start_time:.2f}s: "
+          f"added {counts['added']}, updated {counts['updated']}")
+
+def refresh_scores(output_file: str, model_file: str, changed: Optional[List[Dict[str, Any]]] = None) -> None:
+    """Score the merged output with the saved slop model; with `changed`, only those reports are rescored"""
+    from slop_score import SCORES_FILE, SlopModel, score_reports, update_scores, write_scores
+    if changed is not None and not os.path.exists(SCORES_FILE):
+        # No table to update yet, so everything is scored
+        changed = None
+    if changed == []:
+        print(f"No new or changed reports to score, {SCORES_FILE} left as is")
+        return
+
+    start_time = time.time()
+    try:
+        model = SlopModel.load(model_file)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"Error: could not load slop model {model_file}: {e}")
+        sys.exit(1)
+    if changed is None:
+        count = write_scores(score_reports(model, iter_latest_records(output_file)), SCORES_FILE)
+    else:
+        count = update_scores(score_reports(model, changed), SCORES_FILE)
+    print(f"Scored {count} reports with {model_file} in {time.time() - start_time:.2f}s, updated {SCORES_FILE}")
+
+def main(argv=None):
+    args = parse_args(argv)
     # File paths
-    reports_file = 'hackerone_reports_output.json'
-    content_file = 'hackerone_reports_content_output.json'
-    output_file = 'hackerone_reports_combined.json'
-    
-    print("Loading reports data...")
-    reports_data = load_json_file(reports_file)
-    print(f"Loaded {len(reports_data)} reports")
-    
-    print("Loading content data...")
-    content_data = load_json_file(content_file)
-    print(f"Loaded {len(content_data)} content entries")
+    reports_file = args.reports
+    content_file = args.content
+    output_file = args.output
+
+    for filepath in (reports_file, content_file):
+        if not os.path.exists(filepath):
+            print(f"Error: File {filepath} not found")
+            sys.exit(1)
     
-    print("Creating URL to content mapping...")
-    url_to_content = create_url_to_content_map(content_data)
-    print(f"Created mapping for {len(url_to_content)} URLs")
+    print("Indexing content data...")
+    url_to_content = build_content_lookup(content_file)
+    print(f"Indexed {len(url_to_content)} content URLs")
     
     print("Merging data...")
-    merged_data = merge_reports(reports_data, url_to_content)
-    
-    print("Saving merged data...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(merged_data, f, indent=2, ensure_ascii=False)
+    reports_data = iter_records(reports_file) if is_jsonl(reports_file) else load_json_file(reports_file)
+
+    if args.incremental:
+        start_time = time.time()
+        changed = [] if args.score else None
+        counts = run_incremental_merge(reports_data, url_to_content, output_file, changed)
+        if isinstance(url_to_content, JsonlIndex):
+            url_to_content.close()
+        elapsed = time.time() - start_time
+        print(f"Incremental merge into {output_file} finished in {elapsed:.2f}s")
+        print(f"Added: {counts['added']}, updated: {counts['updated']}, unchanged: {counts['unchanged']}"
+              + (f", retained: {counts['retained']}" if counts['retained'] else ""))
+        if args.parquet and (counts['added'] or counts['updated'] or not os.path.exists(args.parquet)):
+            export_parquet(output_file, args.parquet)
+        if args.index:
+            refresh_index(output_file, args.index)
+        if args.score:
+            refresh_scores(output_file, args.score, changed)
+        return
+
+    reports_with_content = 0
+    with RecordWriter(output_file) as writer:
+        for merged_report in merge_reports_streaming(reports_data, url_to_content):
+            if merged_report.get('original_report'):
+                reports_with_content += 1
+            writer.write(merged_report)
+
+    if isinstance(url_to_content, JsonlIndex):
+        url_to_content.close()
     
     print(f"Successfully merged data and saved to {output_file}")
-    print(f"Final output contains {len(merged_data)} reports")
+    print(f"Final output contains {writer.count} reports")
     
     # Show some statistics
-    reports_with_content = sum(1 for report in merged_data if report.get('original_report'))
     print(f"Reports with content: {reports_with_content}")
-    print(f"Reports without content: {len(merged_data) - reports_with_content}")
+    print(f"Reports without content: {writer.count - reports_with_content}")
+
+    if args.parquet:
+        export_parquet(output_file, args.parquet)
+    if args.index:
+        refresh_index(output_file, args.index)
+    if args.score:
+        refresh_scores(output_file, args.score)
 
 if __name__ == "__main__":
     main()
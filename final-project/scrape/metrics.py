@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Compute the per-report LLM-detection features used by analysis/analysis.r in one batch pass
+and write them to a feature table keyed by report URL
+"""
+
+import argparse
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+from near_duplicates import CLUSTER_COLUMNS, CLUSTERS_FILE, load_clusters
+from report_store import COMBINED_FILE, iter_latest_records
+
+FEATURES_FILE = 'hackerone_reports_features.csv'
+SENTENCES_FILE = 'hackerone_reports_sentences.csv'
+
+# Same patterns as the R metric functions
+ALPHA_WORD_RE = re.compile(r'\b[A-Za-z]+\b')
+SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+TITLE_CASE_RE = re.compile(r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\s+[A-Z][a-z]+')
+NUMBERED_ITEM_RE = re.compile(r'\d+\.\s')
+
+# List markers from count_bullets(); '-' is in both sets there, so such lines count twice
+BULLET_MARKERS = set('•●○▪▫-')
+MARKDOWN_MARKERS = set('*+-')
+
+FEATURE_COLUMNS = [
+    'url',
+    'char_count',
+    'word_count_total',
+    'alpha_word_count',
+    'em_dash_count',
+    'en_dash_count',
+    'total_dashes',
+    'dashes_per_1k',
+    'mixed_case_ratio',
+    'bullet_count',
+    'bullets_per_1k',
+]
+
+TYPO_COLUMNS = ['typo_count', 'typo_rate']
+SENTIMENT_COLUMNS = ['sentence_count', 'sentiment_score']
+
+# Reports handed to each worker per task; a batch of workers * CHUNK_SIZE is in flight at once
+CHUNK_SIZE = 64
+
+# A stage adds columns to a report's feature row: stage(record, row)
+Stage = Callable[[Dict[str, Any], Dict[str, Any]], None]
+
+
+def count_list_items(lines: List[str]) -> int:
+    """Line-based equivalent of count_bullets(): bullet, numbered and markdown list markers"""
+    count = 0
+    for line in lines:
+        stripped = line.lstrip()
+        if len(stripped) < 2:
+            continue
+        marker, following = stripped[0], stripped[1]
+        if following.isspace():
+            count += (marker in BULLET_MARKERS) + (marker in MARKDOWN_MARKERS)
+        elif marker.isdigit() and NUMBERED_ITEM_RE.match(stripped):
+            count += 1
+    return count
+
+
+def mixed_case_ratio(text: str) -> float:
+    """Share of sentences (over 10 chars) containing 3+ consecutive capitalised words, as detect_mixed_case()"""
+    sentences = [sentence.strip() for sentence in SENTENCE_SPLIT_RE.split(text)]
+    sentences = [sentence for sentence in sentences if len(sentence) > 10]
+    if not sentences:
+        return 0.0
+    return sum(1 for sentence in sentences if TITLE_CASE_RE.search(sentence)) / len(sentences)
+
+
+def extract_features(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute every text feature of one report from a single read of its body"""
+    text = record.get('original_report') or ''
+    char_count = len(text)
+
+    em_dashes = text.count('—')
+    en_dashes = text.count('–')
+    bullets = count_list_items(text.split('\n'))
+    # Per-1k rates of an empty body are 0, like mixed_case_ratio() of a text with no sentences
+    per_1k = 1000 / char_count if char_count else 0.0
+
+    return {
+        'url': record.get('url'),
+        'char_count': char_count,
+        'word_count_total': len(text.split()),
+        'alpha_word_count': len(ALPHA_WORD_RE.findall(text)),
+        'em_dash_count': em_dashes,
+        'en_dash_count': en_dashes,
+        'total_dashes': em_dashes + en_dashes,
+        'dashes_per_1k': (em_dashes + en_dashes) * per_1k,
+        'mixed_case_ratio': mixed_case_ratio(text),
+        'bullet_count': bullets,
+        'bullets_per_1k': bullets * per_1k,
+    }
+
+
+def typo_stage(scorer) -> Stage:
+    """Stage adding the misspelled-word count and rate (% of alphabetic words, as in analysis.r)"""
+    def add_typos(record, row):
+        typo_count = scorer.score(record['original_report'])
+        row['typo_count'] = typo_count
+        row['typo_rate'] = typo_count / row['alpha_word_count'] * 100 if row['alpha_word_count'] else None
+    return add_typos
+
+
+def sentiment_stage(scorer) -> Stage:
+    """Stage adding the document sentiment aggregate from the content-hash cache"""
+    def add_sentiment(record, row):
+        sentence_count, ave_sentiment = scorer.document_score(record['original_report'])
+        row['sentence_count'] = sentence_count
+        row['sentiment_score'] = ave_sentiment
+    return add_sentiment
+
+
+def cluster_stage(clusters: Dict[str, Dict[str, str]]) -> Stage:
+    """Stage adding each report's near-duplicate cluster from the table written by near_duplicates.py"""
+    def add_cluster(record, row):
+        cluster = clusters.get(record['url'])
+        for column in CLUSTER_COLUMNS:
+            row[column] = cluster[column] if cluster else None
+    return add_cluster
+
+
+def write_sentences(records: Iterable[Dict[str, Any]], scorer, filepath: str) -> int:
+    """Write the per-sentence scores of every report (url, sentence_id, word_count, sentiment)"""
+    count = 0
+    with open(filepath, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['url', 'sentence_id', 'word_count', 'sentiment'])
+        for record in records:
+            if record.get('url') and record.get('original_report'):
+                for sentence_id, word_count, sentiment in scorer.sentence_scores(record['original_report']):
+                    writer.writerow([record['url'], sentence_id, word_count, sentiment])
+                    count += 1
+    return count
+
+
+def compute_features(records: Iterable[Dict[str, Any]], stages: Sequence[Stage] = (), workers: int = 1,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield feature rows for every report with a body (analysis.r drops empty ones), in input order
+
+    With workers > 1 the text features are extracted by a process pool, one batch of reports at a
+    time. Stages run in this process, since their scorers hold primed caches and open databases.
+    """
+    records = (record for record in records if record.get('url') and record.get('original_report'))
+
+    if workers <= 1:
+        for record in records:
+            row = extract_features(record)
+            for stage in stages:
+                stage(record, row)
+            yield row
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(islice(records, workers * chunk_size))
+            if not batch:
+                break
+            # map() returns results in submission order, so the output is the same as a serial run
+            for record, row in zip(batch, pool.map(extract_features, batch, chunksize=chunk_size)):
+                for stage in stages:
+                    stage(record, row)
+                yield row
+
+
+def write_features(rows: Iterable[Dict[str, Any]], filepath: str, columns: List[str] = FEATURE_COLUMNS) -> int:
+    """Stream feature rows to a CSV file that R can read with read.csv()/read_csv()"""
+    count = 0
+    with open(filepath, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, lineterminator='\n')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute per-report LLM-detection features")
+    parser.add_argument('--input', default=COMBINED_FILE, help="Merged reports (.json array or .jsonl)")
+    parser.add_argument('--output', default=FEATURES_FILE, help="Feature table (CSV keyed by url)")
+    parser.add_argument('--typos', action='store_true',
+                        help="Score every report for misspelled words (unique words are checked once and memoized)")
+    parser.add_argument('--spell-backend', choices=['enchant', 'spylls', 'wordlist'],
+                        help="Spell checker to use (default: first available)")
+    parser.add_argument('--wordlist', help="Plain word list to check against instead of a hunspell dictionary")
+    parser.add_argument('--sentiment', action='store_true',
+                        help="Add sentence-level sentiment, scoring only reports whose body hash is not cached")
+    parser.add_argument('--sentences-output', default=SENTENCES_FILE,
+                        help="Per-sentence sentiment table written with --sentiment")
+    parser.add_argument('--clusters', nargs='?', const=CLUSTERS_FILE, metavar='CSV',
+                        help="Add near-duplicate cluster id, size and first-seen date from near_duplicates.py")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes extracting text features (0 = one per CPU core)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="Reports sent to a worker at a time")
+    args = parser.parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+
+    start_time = time.time()
+    columns = list(FEATURE_COLUMNS)
+    stages = []
+
+    if args.typos:
+        from typos import open_typo_scorer
+        scorer = open_typo_scorer(args.spell_backend, args.wordlist)
+        print(f"Spell-checking with {scorer.checker_name}")
+        checked = scorer.prime(record.get('original_report') or '' for record in iter_latest_records(args.input))
+        print(f"Spell-checked {checked} new unique words with {scorer.checker_name} "
+              f"({len(scorer.verdicts)} memoized) in {time.time() - start_time:.2f}s")
+        columns += TYPO_COLUMNS
+        stages.append(typo_stage(scorer))
+
+    if args.sentiment:
+        from sentiment import open_sentiment_scorer
+        sentiment_scorer = open_sentiment_scorer()
+        stage_start = time.time()
+        scored = sentiment_scorer.prime(record.get('original_report') or '' for record in iter_latest_records(args.input))
+        print(f"Scored sentiment for {scored} new or edited reports with {sentiment_scorer.scorer_name} "
+              f"in {time.time() - stage_start:.2f}s")
+        columns += SENTIMENT_COLUMNS
+        stages.append(sentiment_stage(sentiment_scorer))
+
+    if args.clusters:
+        clusters = load_clusters(args.clusters)
+        print(f"Loaded near-duplicate clusters for {len(clusters)} reports from {args.clusters}")
+        columns += CLUSTER_COLUMNS
+        stages.append(cluster_stage(clusters))
+
+    print(f"Computing features for {args.input} with {workers} worker(s)...")
+    rows = compute_features(iter_latest_records(args.input), stages, workers, args.chunk_size)
+    count = write_features(rows, args.output, columns)
+    print(f"Wrote features for {count} reports to {args.output} in {time.time() - start_time:.2f}s")
+
+    if args.sentiment:
+        sentences = write_sentences(iter_latest_records(args.input), sentiment_scorer, args.sentences_output)
+        print(f"Wrote {sentences} sentence scores to {args.sentences_output}")
+
+
+if __name__ == "__main__":
+    main()
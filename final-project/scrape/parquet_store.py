@@ -0,0 +1,137 @@
+"""
+Columnar Parquet copy of the combined reports, partitioned by team and year
+"""
+
+import os
+import re
+import shutil
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+PARQUET_DIR = 'hackerone_reports_parquet'
+
+# Rows are converted and written in chunks so memory stays bounded on large corpora
+CHUNK_SIZE = 10000
+
+DATE_FORMAT = '%B %d, %Y %H:%M:%S'
+
+# Hacktivity dates carry US timezone abbreviations, which strptime cannot resolve
+TZ_OFFSETS = {
+    'UTC': 0, 'GMT': 0,
+    'EST': -5, 'EDT': -4,
+    'CST': -6, 'CDT': -5,
+    'MST': -7, 'MDT': -6,
+    'PST': -8, 'PDT': -7,
+}
+
+
+def parse_report_date(raw: Optional[str]) -> Optional[datetime]:
+    """Parse a hacktivity date like 'September 26, 2025 06:34:56 MDT' as local wall-clock time"""
+    if not raw:
+        return None
+    parts = raw.rsplit(' ', 1)
+    text = parts[0] if len(parts) == 2 and parts[1] in TZ_OFFSETS else raw
+    try:
+        return datetime.strptime(text, DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def to_utc(local: Optional[datetime], raw: Optional[str]) -> Optional[datetime]:
+    """Attach the abbreviation's UTC offset to a parsed local time"""
+    if local is None:
+        return None
+    offset = TZ_OFFSETS.get(raw.rsplit(' ', 1)[-1], 0)
+    return local.replace(tzinfo=timezone(timedelta(hours=offset))).astimezone(timezone.utc)
+
+
+def parse_bounty(raw: Optional[str]) -> Optional[float]:
+    """Turn a bounty string like '$1,200' into a number"""
+    if not raw:
+        return None
+    digits = re.sub(r'[^0-9.]', '', raw)
+    return float(digits) if digits else None
+
+
+def to_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a combined report into typed columns"""
+    metadata = record.get('hacktivity_metadata') or {}
+    date_raw = metadata.get('date')
+    local = parse_report_date(date_raw)
+    body = record.get('original_report') or ''
+    return {
+        'team': record.get('team') or 'unknown',
+        # Year follows the wall-clock date, matching mdy_hms() in analysis.r
+        'year': local.year if local else None,
+        'url': record.get('url'),
+        'title': record.get('title'),
+        'date_raw': date_raw,
+        'date': to_utc(local, date_raw),
+        'bounty': parse_bounty(metadata.get('bounty')),
+        'severity': metadata.get('severity'),
+        'original_report': body,
+        'report_length': len(body),
+    }
+
+
+def schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('team', pa.string()),
+        ('year', pa.int16()),
+        ('url', pa.string()),
+        ('title', pa.string()),
+        ('date_raw', pa.string()),
+        ('date', pa.timestamp('s', tz='UTC')),
+        ('bounty', pa.float64()),
+        ('severity', pa.dictionary(pa.int8(), pa.string())),
+        ('original_report', pa.string()),
+        ('report_length', pa.int32()),
+    ])
+
+
+def _write_chunk(rows: List[Dict[str, Any]], root: str, chunk_number: int) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pylist(rows, schema=schema())
+    pq.write_to_dataset(
+        table,
+        root_path=root,
+        partition_cols=['team', 'year'],
+        basename_template=f'part-{chunk_number}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def write_parquet_dataset(records: Iterable[Dict[str, Any]], root: str = PARQUET_DIR) -> int:
+    """Rewrite the partitioned dataset (team=/year=) from combined report records; returns the row count"""
+    # Fail before deleting anything if pyarrow is not installed
+    import pyarrow  # noqa: F401
+
+    if os.path.exists(root):
+        shutil.rmtree(root)
+
+    rows = []
+    total = 0
+    chunk_number = 0
+    for record in records:
+        rows.append(to_row(record))
+        if len(rows) >= CHUNK_SIZE:
+            _write_chunk(rows, root, chunk_number)
+            total += len(rows)
+            chunk_number += 1
+            rows = []
+    if rows:
+        _write_chunk(rows, root, chunk_number)
+        total += len(rows)
+    return total
+
+
+def read_parquet_dataset(root: str = PARQUET_DIR, columns: Optional[List[str]] = None, years: Optional[List[int]] = None):
+    """Load selected columns (and optionally years) of the dataset as a pyarrow Table"""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(root, format='parquet', partitioning='hive')
+    row_filter = ds.field('year').isin(years) if years else None
+    return dataset.to_table(columns=columns, filter=row_filter)
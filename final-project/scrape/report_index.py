@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+SQLite FTS5 full-text index over report titles and bodies, with team and date filters
+
+The index keeps a content hash per report URL, so updating it from the merged output only
+re-indexes new and changed reports. merge_reports.py --index refreshes it after every merge.
+
+    python report_index.py update
+    python report_index.py search "I hope this helps" --phrase --team curl --since 2024
+    python report_index.py search "certainly AND delve" --count
+"""
+
+import argparse
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from parquet_store import parse_report_date
+from report_store import COMBINED_FILE, iter_latest_records, record_hash
+
+INDEX_DB_FILE = 'hackerone_reports_index.sqlite3'
+
+# Columns of the full-text table, usable with --field
+TEXT_FIELDS = ['title', 'original_report']
+
+# Reports written per transaction while updating
+BATCH_SIZE = 1000
+
+
+def phrase_query(text: str) -> str:
+    """Quote text as a single FTS5 phrase, so punctuation and operators in it are matched literally"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def report_date(record: Dict[str, Any]) -> Optional[str]:
+    """ISO wall-clock hacktivity date of a report, which sorts and compares as text"""
+    local = parse_report_date((record.get('hacktivity_metadata') or {}).get('date'))
+    return local.isoformat(sep=' ') if local else None
+
+
+class ReportIndex:
+    """Reports table plus an external-content FTS5 table kept in sync by triggers"""
+
+    def __init__(self, path: str = INDEX_DB_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                team TEXT,
+                date TEXT,
+                title TEXT,
+                original_report TEXT,
+                hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS reports_date ON reports (date);
+            CREATE INDEX IF NOT EXISTS reports_team_date ON reports (team, date);
+
+            -- Bodies are stored once, in reports; the FTS table only holds the inverted index
+            CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+                title, original_report,
+                content='reports', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+                INSERT INTO reports_fts (rowid, title, original_report)
+                VALUES (new.id, new.title, new.original_report);
+            END;
+            CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+                INSERT INTO reports_fts (reports_fts, rowid, title, original_report)
+                VALUES ('delete', old.id, old.title, old.original_report);
+            END;
+            CREATE TRIGGER IF NOT EXISTS reports_au AFTER UPDATE ON reports BEGIN
+                INSERT INTO reports_fts (reports_fts, rowid, title, original_report)
+                VALUES ('delete', old.id, old.title, old.original_report);
+                INSERT INTO reports_fts (rowid, title, original_report)
+                VALUES (new.id, new.title, new.original_report);
+            END;
+            """
+        )
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def stored_hash(self, url: str) -> Optional[str]:
+        row = self.conn.execute("SELECT hash FROM reports WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def update(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Index new reports and re-index changed ones; returns added/updated/unchanged counts
+
+        Stored hashes are looked up per report, so a small update costs the same on any index size.
+        """
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+        pending = 0
+
+        for record in records:
+            url = record.get('url')
+            if not url:
+                continue
+            digest = record_hash(record)
+            stored = self.stored_hash(url)
+            if stored == digest:
+                counts['unchanged'] += 1
+                continue
+
+            values = (record.get('team'), report_date(record), record.get('title'),
+                      record.get('original_report') or '', digest, url)
+            if stored is not None:
+                counts['updated'] += 1
+                self.conn.execute(
+                    "UPDATE reports SET team = ?, date = ?, title = ?, original_report = ?, hash = ? WHERE url = ?",
+                    values,
+                )
+            else:
+                counts['added'] += 1
+                self.conn.execute(
+                    "INSERT INTO reports (team, date, title, original_report, hash, url) VALUES (?, ?, ?, ?, ?, ?)",
+                    values,
+                )
+
+            pending += 1
+            if pending >= BATCH_SIZE:
+                self.conn.commit()
+                pending = 0
+        self.conn.commit()
+        return counts
+
+    def optimize(self) -> None:
+        """Merge the FTS index segments, which speeds up queries after large updates"""
+        self.conn.execute("INSERT INTO reports_fts (reports_fts) VALUES ('optimize')")
+        self.conn.commit()
+
+    def search(self, query: str, phrase: bool = False, field: Optional[str] = None, team: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None, order: str = 'rank',
+               limit: Optional[int] = None, snippets: bool = False) -> List[Dict[str, Any]]:
+        """Reports matching an FTS5 query (or a literal phrase), optionally limited to one field, team and date range
+
+        `since` and `until` are inclusive date prefixes: '2024', '2024-03' or '2024-03-15'.
+        Results are ordered by BM25 relevance ('rank') or by date, newest first ('date').
+        """
+        columns = "r.url, r.team, r.date, r.title"
+        if snippets:
+            columns += ", snippet(reports_fts, -1, '[', ']', '...', 12) AS snippet"
+        sql = f"SELECT {columns} FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid WHERE reports_fts MATCH ?"
+        params: List[Any] = [self._match(query, phrase, field)]
+        sql, params = self._filters(sql, params, team, since, until)
+        sql += " ORDER BY r.date DESC" if order == 'date' else " ORDER BY rank"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        cursor = self.conn.execute(sql, params)
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def count(self, query: str, phrase: bool = False, field: Optional[str] = None, team: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> int:
+        sql = "SELECT COUNT(*) FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid WHERE reports_fts MATCH ?"
+        sql, params = self._filters(sql, [self._match(query, phrase, field)], team, since, until)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    @staticmethod
+    def _match(query: str, phrase: bool, field: Optional[str]) -> str:
+        match = phrase_query(query) if phrase else query
+        if field:
+            if field not in TEXT_FIELDS:
+                raise ValueError(f"Unknown field {field!r}, expected one of {TEXT_FIELDS}")
+            match = f'{field} : ({match})'
+        return match
+
+    @staticmethod
+    def _filters(sql: str, params: List[Any], team: Optional[str], since: Optional[str],
+                 until: Optional[str]) -> Tuple[str, List[Any]]:
+        if team:
+            sql += " AND r.team = ?"
+            params.append(team)
+        if since:
+            sql += " AND r.date >= ?"
+            params.append(since)
+        if until:
+            # Compare on the prefix length, so until='2024' still includes December 2024
+            sql += " AND substr(r.date, 1, ?) <= ?"
+            params += [len(until), until]
+        return sql, params
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def update_index(input_file: str = COMBINED_FILE, db: str = INDEX_DB_FILE) -> Dict[str, int]:
+    index = ReportIndex(db)
+    try:
+        return index.update(iter_latest_records(input_file))
+    finally:
+        index.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text index and phrase search over report titles and bodies")
+    parser.add_argument('--db', default=INDEX_DB_FILE, help="SQLite file holding the index")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    update = commands.add_parser('update', help="Index new and changed reports from the merged output")
+    update.add_argument('--input', default=COMBINED_FILE, help="Merged reports (.json array or .jsonl)")
+    update.add_argument('--optimize', action='store_true', help="Merge index segments after updating")
+
+    search = commands.add_parser('search', help="List reports matching a query")
+    search.add_argument('query', help="FTS5 query, e.g. 'hope NEAR helps' or 'certainly AND delve*'")
+    search.add_argument('--phrase', action='store_true', help="Match the query as one literal phrase")
+    search.add_argument('--field', choices=TEXT_FIELDS, help="Only search the title or the body")
+    search.add_argument('--team', help="Only reports of this team")
+    search.add_argument('--since', help="Earliest hacktivity date, e.g. 2024 or 2024-03-15")
+    search.add_argument('--until', help="Latest hacktivity date (inclusive), e.g. 2024 or 2024-06")
+    search.add_argument('--order', choices=['rank', 'date'], default='rank', help="Relevance or newest first")
+    search.add_argument('--limit', type=int, default=50, help="Maximum matches listed (0 = all)")
+    search.add_argument('--snippets', action='store_true', help="Show the matching passage of each report")
+    search.add_argument('--count', action='store_true', help="Only print the number of matches")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    index = ReportIndex(args.db)
+    try:
+        if args.command == 'update':
+            counts = index.update(iter_latest_records(args.input))
+            if args.optimize:
+                index.optimize()
+            print(f"Index updated in {time.time() - start_time:.2f}s: added {counts['added']}, "
+                  f"updated {counts['updated']}, unchanged {counts['unchanged']} ({len(index)} reports indexed)")
+            return
+
+        try:
+            if args.count:
+                total = index.count(args.query, args.phrase, args.field, args.team, args.since, args.until)
+                print(f"{total} matching reports ({(time.time() - start_time) * 1000:.1f} ms)")
+                return
+            matches = index.search(args.query, args.phrase, args.field, args.team, args.since, args.until,
+                                   args.order, args.limit, args.snippets)
+        except sqlite3.OperationalError as e:
+            # Malformed FTS5 syntax is reported as an OperationalError
+            parser.error(f"Invalid query {args.query!r}: {e} (use --phrase to match it literally)")
+
+        for match in matches:
+            print(f"{match['url']}\t{match['team']}\t{(match['date'] or '')[:10]}\t{match['title']}")
+            if args.snippets:
+                print(f"    {' '.join(match['snippet'].split())}")
+        print(f"{len(matches)} matches ({(time.time() - start_time) * 1000:.1f} ms)")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Helpers for reading and updating the scraped report stores on disk
+"""
+
+import hashlib
+import json
+import os
+import textwrap
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+# Default store locations (relative to the scrape directory)
+REPORTS_FILE = 'hackerone_reports_output.json'
+COMBINED_FILE = 'hackerone_reports_combined.json'
+REPORTS_JSONL_FILE = 'hackerone_reports_output.jsonl'
+CONTENT_JSON_FILE = 'hackerone_reports_content_output.json'
+CONTENT_CSV_FILE = 'hackerone_reports_content_output.csv'
+CONTENT_JSONL_FILE = 'hackerone_reports_content_output.jsonl'
+
+
+def is_jsonl(filepath: str) -> bool:
+    return filepath.endswith('.jsonl')
+
+
+def iter_jsonl(filepath: str) -> Iterator[Dict[str, Any]]:
+    """Stream records from a JSON Lines file one at a time"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_records(filepath: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over a store in either format; JSONL is streamed, JSON arrays are loaded whole"""
+    if not os.path.exists(filepath):
+        return
+    if is_jsonl(filepath):
+        yield from iter_jsonl(filepath)
+    else:
+        yield from load_records(filepath)
+
+
+def load_records(filepath: str) -> List[Dict[str, Any]]:
+    """Load a store, returning an empty list if it does not exist yet"""
+    if not os.path.exists(filepath):
+        return []
+    if is_jsonl(filepath):
+        return list(iter_jsonl(filepath))
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_known_urls(filepaths: Iterable[str]) -> Set[str]:
+    """Collect the set of report URLs already present in the given stores"""
+    known_urls = set()
+    for filepath in filepaths:
+        for record in iter_records(filepath):
+            url = record.get('url')
+            if url:
+                known_urls.add(url)
+    return known_urls
+
+
+def write_records(filepath: str, records: List[Dict[str, Any]]) -> None:
+    """Write records in the same layout as Scrapy's JSON feed exporter (indent=4)"""
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        f.write(',\n'.join(json.dumps(record, indent=4, ensure_ascii=False) for record in records))
+        f.write('\n]')
+    os.replace(tmp_path, filepath)
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """Stable content hash of a record, independent of key order"""
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def append_jsonl(filepath: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Append records to a JSON Lines store without touching what is already there"""
+    count = 0
+    with open(filepath, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def prepend_records(filepath: str, new_records: List[Dict[str, Any]]) -> int:
+    """Add new records to the top of a store (hacktivity is newest first), skipping known URLs"""
+    existing = load_records(filepath)
+    existing_urls = {record.get('url') for record in existing}
+
+    fresh = []
+    for record in new_records:
+        if record.get('url') not in existing_urls:
+            existing_urls.add(record.get('url'))
+            fresh.append(record)
+
+    if fresh:
+        write_records(filepath, fresh + existing)
+    return len(fresh)
+
+
+class JsonlIndex:
+    """URL -> byte offset index over a JSONL file, reading full records only on demand
+
+    Only the URLs and offsets are held in memory; when a URL appears more than once the
+    last (most recently appended) record wins.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.offsets: Dict[str, int] = {}
+        self._file = open(filepath, 'rb')
+
+        offset = 0
+        for line in self._file:
+            if line.strip():
+                url = json.loads(line).get('url')
+                if url:
+                    self.offsets[url] = offset
+            offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.offsets
+
+    def record(self, url: str) -> Optional[Dict[str, Any]]:
+        offset = self.offsets.get(url)
+        if offset is None:
+            return None
+        self._file.seek(offset)
+        return json.loads(self._file.readline())
+
+    def get(self, url: str, default: Any = None) -> Any:
+        """Return the record's original_report, mirroring dict.get on a URL -> content map"""
+        record = self.record(url)
+        if record is None:
+            return default
+        return record.get('original_report', default)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def iter_latest_records(filepath: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over a store yielding one record per URL; in JSONL stores later lines supersede earlier ones"""
+    if not is_jsonl(filepath):
+        yield from iter_records(filepath)
+        return
+    if not os.path.exists(filepath):
+        return
+    index = JsonlIndex(filepath)
+    try:
+        for url in list(index.offsets):
+            yield index.record(url)
+    finally:
+        index.close()
+
+
+class RecordWriter:
+    """Write records one at a time as a JSON array (json.dump indent=2 layout) or as JSONL"""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.jsonl = is_jsonl(filepath)
+        self.count = 0
+        self._tmp_path = filepath + '.tmp'
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        return self
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self.jsonl:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            self._file.write('[\n' if self.count == 0 else ',\n')
+            self._file.write(textwrap.indent(json.dumps(record, indent=2, ensure_ascii=False), '  '))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.jsonl:
+            self._file.write('[]' if self.count == 0 else '\n]')
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.filepath)
+        else:
+            os.remove(self._tmp_path)
+        return False
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Materialized (team, year, quarter, month) x metric rollup of the per-report features
+
+Each cell holds n, sum, sum of squares, min and max, so any coarser rollup (per year, per
+quarter, across teams) and its mean/sd/se can be derived without rescanning the reports.
+"""
+
+import argparse
+import csv
+import math
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import FEATURES_FILE
+from parquet_store import parse_report_date
+from report_store import COMBINED_FILE, iter_latest_records
+
+ROLLUP_DB_FILE = 'hackerone_metric_rollups.sqlite3'
+ROLLUP_CSV_FILE = 'hackerone_metric_rollups.csv'
+
+CELL_KEYS = ['team', 'year', 'quarter', 'month']
+AGGREGATES = ['n', 'sum', 'sumsq', 'min', 'max']
+
+# Feature-table columns rolled up, plus per-1k dash rates derived from the counts
+METRICS = [
+    'sentiment_score',
+    'typo_rate',
+    'mixed_case_ratio',
+    'dashes_per_1k',
+    'em_dashes_per_1k',
+    'en_dashes_per_1k',
+    'char_count',
+    'word_count_total',
+    'bullets_per_1k',
+]
+
+
+def load_feature_table(filepath: str = FEATURES_FILE) -> Dict[str, Dict[str, str]]:
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        return {row['url']: row for row in csv.DictReader(f)}
+
+
+def metric_values(features: Dict[str, str]) -> Dict[str, float]:
+    """Numeric metric values of one feature row, skipping metrics that are missing or empty"""
+    values = {}
+    for metric in METRICS:
+        raw = features.get(metric)
+        if raw not in (None, ''):
+            values[metric] = float(raw)
+
+    char_count = float(features.get('char_count') or 0)
+    if char_count:
+        for dash, column in (('em', 'em_dash_count'), ('en', 'en_dash_count')):
+            if features.get(column) not in (None, ''):
+                values[f'{dash}_dashes_per_1k'] = float(features[column]) / char_count * 1000
+    return values
+
+
+def report_cell(record: Dict[str, Any]) -> Optional[Tuple[str, int, int, int]]:
+    """(team, year, quarter, month) of a report, from its wall-clock hacktivity date"""
+    local = parse_report_date((record.get('hacktivity_metadata') or {}).get('date'))
+    if local is None:
+        return None
+    return (record.get('team') or 'unknown', local.year, (local.month - 1) // 3 + 1, local.month)
+
+
+class RollupStore:
+    """SQLite-backed cube that is updated incrementally from per-report contributions
+
+    New reports are folded into their cell directly. When a report's values change, its old
+    contribution is replaced and only the affected cells are re-aggregated (min/max cannot be
+    subtracted out).
+    """
+
+    def __init__(self, path: str = ROLLUP_DB_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS contributions (
+                url TEXT NOT NULL,
+                team TEXT NOT NULL, year INTEGER NOT NULL, quarter INTEGER NOT NULL, month INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (url, metric)
+            );
+            CREATE TABLE IF NOT EXISTS cube (
+                team TEXT NOT NULL, year INTEGER NOT NULL, quarter INTEGER NOT NULL, month INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                n INTEGER NOT NULL, sum REAL NOT NULL, sumsq REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL,
+                PRIMARY KEY (team, year, quarter, month, metric)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def contribution(self, url: str) -> Dict[str, Tuple[Tuple, float]]:
+        """metric -> (cell, value) of one report's current contribution (empty if it has none)"""
+        return {
+            metric: ((team, year, quarter, month), value)
+            for team, year, quarter, month, metric, value in self.conn.execute(
+                "SELECT team, year, quarter, month, metric, value FROM contributions WHERE url = ?", (url,)
+            )
+        }
+
+    def apply(self, updates: Iterable[Tuple[str, Tuple, Dict[str, float]]]) -> Dict[str, int]:
+        """Fold (url, cell, metric values) updates into the cube; returns added/updated/unchanged counts
+
+        Contributions are looked up per report (a URL repeated in the input sees what was just
+        written), so a small update costs the same on any cube size.
+        """
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+        dirty = set()
+
+        with self.conn:
+            for url, cell, values in updates:
+                previous = self.contribution(url)
+                current = {metric: (cell, value) for metric, value in values.items()}
+                if previous == current:
+                    counts['unchanged'] += 1
+                    continue
+
+                if previous:
+                    counts['updated'] += 1
+                    self.conn.execute("DELETE FROM contributions WHERE url = ?", (url,))
+                    dirty.update((old_cell, metric) for metric, (old_cell, _) in previous.items())
+                    dirty.update((cell, metric) for metric in values)
+                else:
+                    counts['added'] += 1
+
+                for metric, value in values.items():
+                    self.conn.execute(
+                        "INSERT INTO contributions (url, team, year, quarter, month, metric, value) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (url, *cell, metric, value),
+                    )
+                    if not previous:
+                        self._fold(cell, metric, value)
+
+            for cell, metric in dirty:
+                self._recompute(cell, metric)
+        return counts
+
+    def _fold(self, cell: Tuple, metric: str, value: float) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO cube (team, year, quarter, month, metric, n, sum, sumsq, min, max)
+            VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT (team, year, quarter, month, metric) DO UPDATE SET
+                n = n + 1, sum = sum + excluded.sum, sumsq = sumsq + excluded.sumsq,
+                min = MIN(min, excluded.min), max = MAX(max, excluded.max)
+            """,
+            (*cell, metric, value, value * value, value, value),
+        )
+
+    def _recompute(self, cell: Tuple, metric: str) -> None:
+        self.conn.execute(
+            "DELETE FROM cube WHERE team = ? AND year = ? AND quarter = ? AND month = ? AND metric = ?",
+            (*cell, metric),
+        )
+        self.conn.execute(
+            """
+            INSERT INTO cube (team, year, quarter, month, metric, n, sum, sumsq, min, max)
+            SELECT team, year, quarter, month, metric, COUNT(*), SUM(value), SUM(value * value), MIN(value), MAX(value)
+            FROM contributions
+            WHERE team = ? AND year = ? AND quarter = ? AND month = ? AND metric = ?
+            GROUP BY team, year, quarter, month, metric
+            """,
+            (*cell, metric),
+        )
+
+    def cells(self) -> List[Dict[str, Any]]:
+        cursor = self.conn.execute(
+            "SELECT team, year, quarter, month, metric, n, sum, sumsq, min, max FROM cube "
+            "ORDER BY team, year, month, metric"
+        )
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def rollup(cells: Iterable[Dict[str, Any]], by: Sequence[str]) -> List[Dict[str, Any]]:
+    """Merge cube cells up to a coarser grouping (e.g. by=['year', 'metric']) and add mean/sd/se"""
+    merged: Dict[Tuple, Dict[str, Any]] = {}
+    for cell in cells:
+        key = tuple(cell[column] for column in by)
+        target = merged.get(key)
+        if target is None:
+            merged[key] = dict({column: cell[column] for column in by},
+                               n=cell['n'], sum=cell['sum'], sumsq=cell['sumsq'], min=cell['min'], max=cell['max'])
+        else:
+            target['n'] += cell['n']
+            target['sum'] += cell['sum']
+            target['sumsq'] += cell['sumsq']
+            target['min'] = min(target['min'], cell['min'])
+            target['max'] = max(target['max'], cell['max'])
+
+    rows = []
+    for key in sorted(merged):
+        row = merged[key]
+        n = row['n']
+        row['mean'] = row['sum'] / n
+        variance = (row['sumsq'] - row['sum'] ** 2 / n) / (n - 1) if n > 1 else float('nan')
+        row['sd'] = math.sqrt(max(variance, 0.0)) if n > 1 else float('nan')
+        row['se'] = row['sd'] / math.sqrt(n) if n > 1 else float('nan')
+        rows.append(row)
+    return rows
+
+
+def collect_updates(records: Iterable[Dict[str, Any]], features: Dict[str, Dict[str, str]]):
+    """Pair each dated report that has a feature row with its cube cell and metric values"""
+    for record in records:
+        url = record.get('url')
+        cell = report_cell(record)
+        if url in features and cell is not None:
+            yield url, cell, metric_values(features[url])
+
+
+def export_cells(cells: List[Dict[str, Any]], filepath: str) -> None:
+    with open(filepath, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CELL_KEYS + ['metric'] + AGGREGATES, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(cells)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or incrementally update the metric rollup cube")
+    parser.add_argument('--input', default=COMBINED_FILE, help="Merged reports (.json array or .jsonl)")
+    parser.add_argument('--features', default=FEATURES_FILE, help="Feature table written by metrics.py")
+    parser.add_argument('--db', default=ROLLUP_DB_FILE, help="SQLite store holding the cube and contributions")
+    parser.add_argument('--output', default=ROLLUP_CSV_FILE, help="Cube exported as CSV for analysis.r")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    store = RollupStore(args.db)
+    counts = store.apply(collect_updates(iter_latest_records(args.input), load_feature_table(args.features)))
+    cells = store.cells()
+    export_cells(cells, args.output)
+    store.close()
+
+    print(f"Rollup updated in {time.time() - start_time:.2f}s: added {counts['added']}, "
+          f"updated {counts['updated']}, unchanged {counts['unchanged']} reports")
+    print(f"Wrote {len(cells)} cells to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
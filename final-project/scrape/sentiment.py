@@ -0,0 +1,170 @@
+"""
+Batched sentence-level sentiment scoring, cached by the SHA-256 of each report body
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SENTIMENT_CACHE_FILE = 'hackerone_sentiment_cache.sqlite3'
+
+# Uncached documents are scored this many at a time and committed per batch
+BATCH_SIZE = 256
+
+# Sentence boundaries: terminal punctuation followed by whitespace, or a blank line
+SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = (sentence.strip() for sentence in SENTENCE_BOUNDARY_RE.split(text))
+    return [sentence for sentence in sentences if sentence]
+
+
+def average_downweighted_zero(scores: List[float]) -> float:
+    """Document score as sentimentr's default aggregate: neutral sentences pull the mean down less"""
+    if not scores:
+        return 0.0
+    non_zero = [score for score in scores if score != 0]
+    zeros = len(scores) - len(non_zero)
+    return sum(non_zero) / (len(non_zero) + math.sqrt(math.log(1 + zeros)))
+
+
+def build_sentence_scorer(backend: Optional[str] = None) -> Tuple[str, Callable[[List[str]], List[float]]]:
+    """Return (name, score_batch) for the first available sentence scorer (VADER compound score, -1..1)"""
+    if backend in (None, 'vader'):
+        try:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        except ImportError:
+            try:
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+            except ImportError:
+                raise RuntimeError("Sentiment scoring requires vaderSentiment (pip install vaderSentiment) or nltk")
+        analyzer = SentimentIntensityAnalyzer()
+        return 'vader', lambda sentences: [analyzer.polarity_scores(sentence)['compound'] for sentence in sentences]
+    raise ValueError(f"Unknown sentiment backend {backend!r}")
+
+
+class SentimentCache:
+    """SQLite store of per-sentence and per-document scores, keyed by scorer and content hash"""
+
+    def __init__(self, path: str = SENTIMENT_CACHE_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS document_sentiment (
+                scorer TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                sentence_count INTEGER NOT NULL,
+                ave_sentiment REAL NOT NULL,
+                PRIMARY KEY (scorer, sha)
+            );
+            CREATE TABLE IF NOT EXISTS sentence_sentiment (
+                scorer TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                sentence_id INTEGER NOT NULL,
+                word_count INTEGER NOT NULL,
+                sentiment REAL NOT NULL,
+                PRIMARY KEY (scorer, sha, sentence_id)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def cached_shas(self, scorer: str) -> set:
+        rows = self.conn.execute("SELECT sha FROM document_sentiment WHERE scorer = ?", (scorer,))
+        return {row[0] for row in rows}
+
+    def documents(self, scorer: str) -> Dict[str, Tuple[int, float]]:
+        rows = self.conn.execute(
+            "SELECT sha, sentence_count, ave_sentiment FROM document_sentiment WHERE scorer = ?", (scorer,)
+        )
+        return {sha: (sentence_count, ave) for sha, sentence_count, ave in rows}
+
+    def sentences(self, scorer: str, sha: str) -> List[Tuple[int, int, float]]:
+        rows = self.conn.execute(
+            "SELECT sentence_id, word_count, sentiment FROM sentence_sentiment "
+            "WHERE scorer = ? AND sha = ? ORDER BY sentence_id",
+            (scorer, sha),
+        )
+        return rows.fetchall()
+
+    def store_batch(self, scorer: str, documents: Dict[str, Tuple[List[str], List[float]]]) -> None:
+        """Store a batch of {sha: (sentences, scores)} in one transaction"""
+        with self.conn:
+            for sha, (sentences, scores) in documents.items():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO document_sentiment (scorer, sha, sentence_count, ave_sentiment) "
+                    "VALUES (?, ?, ?, ?)",
+                    (scorer, sha, len(scores), average_downweighted_zero(scores)),
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO sentence_sentiment (scorer, sha, sentence_id, word_count, sentiment) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(scorer, sha, i + 1, len(sentence.split()), score)
+                     for i, (sentence, score) in enumerate(zip(sentences, scores))],
+                )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class SentimentScorer:
+    """Scores only reports whose body hash is not cached yet, in batches"""
+
+    def __init__(self, scorer_name: str, score_batch: Callable[[List[str]], List[float]], cache: SentimentCache,
+                 batch_size: int = BATCH_SIZE):
+        self.scorer_name = scorer_name
+        self.score_batch = score_batch
+        self.cache = cache
+        self.batch_size = batch_size
+        self.document_scores: Dict[str, Tuple[int, float]] = {}
+
+    def _flush(self, pending: Dict[str, List[str]]) -> None:
+        sentences = [sentence for document in pending.values() for sentence in document]
+        scores = self.score_batch(sentences)
+        batch, offset = {}, 0
+        for sha, document in pending.items():
+            batch[sha] = (document, scores[offset:offset + len(document)])
+            offset += len(document)
+        self.cache.store_batch(self.scorer_name, batch)
+
+    def prime(self, texts: Iterable[str]) -> int:
+        """Score every new or edited report body; returns the number of documents scored"""
+        cached = self.cache.cached_shas(self.scorer_name)
+        pending: Dict[str, List[str]] = {}
+        scored = 0
+        for text in texts:
+            sha = content_hash(text)
+            if sha in cached or sha in pending:
+                continue
+            pending[sha] = split_sentences(text)
+            if len(pending) >= self.batch_size:
+                self._flush(pending)
+                scored += len(pending)
+                cached.update(pending)
+                pending = {}
+        if pending:
+            self._flush(pending)
+            scored += len(pending)
+        self.document_scores = self.cache.documents(self.scorer_name)
+        return scored
+
+    def document_score(self, text: str) -> Tuple[int, float]:
+        """(sentence count, downweighted average sentiment) for a primed report body"""
+        return self.document_scores[content_hash(text)]
+
+    def sentence_scores(self, text: str) -> List[Tuple[int, int, float]]:
+        """(sentence id, word count, sentiment) rows for a primed report body"""
+        return self.cache.sentences(self.scorer_name, content_hash(text))
+
+
+def open_sentiment_scorer(backend: Optional[str] = None, cache_path: str = SENTIMENT_CACHE_FILE,
+                          batch_size: int = BATCH_SIZE) -> SentimentScorer:
+    scorer_name, score_batch = build_sentence_scorer(backend)
+    return SentimentScorer(scorer_name, score_batch, SentimentCache(cache_path), batch_size)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Per-report "slop score": logistic regression over hashed word n-grams and the metrics features
+
+Training is an offline step that saves the model to a .npz file; scoring loads it once and
+scores reports in vectorized batches, fast enough to run inline after every merge
+(merge_reports.py --score) or in the ingestion path.
+
+Labels come from a CSV of url,label (1 = AI slop, 0 = genuine). Without one, --era-labels uses
+the corpus's own time split as a proxy: reports disclosed before ChatGPT's release count as 0
+and reports from POSITIVE_ERA_START on as 1, reports in between are left out. A model trained
+that way scores how much a report reads like recent submissions rather than detecting AI text,
+so hand labels should replace it as soon as there are enough of them.
+
+Requires numpy (pip install numpy).
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import extract_features
+from report_index import report_date
+from report_store import COMBINED_FILE, iter_latest_records
+
+MODEL_FILE = 'hackerone_slop_model.npz'
+SCORES_FILE = 'hackerone_reports_slop_scores.csv'
+
+# Hashed n-gram space; 2^18 buckets keep collisions rare for a vocabulary of a few 100k n-grams
+HASH_BITS = 18
+NGRAM_SIZES = (1, 2)
+
+# Dense features from metrics.extract_features; counts are log-scaled before standardising
+DENSE_FEATURES = ['char_count', 'word_count_total', 'dashes_per_1k', 'mixed_case_ratio', 'bullets_per_1k']
+LOG_FEATURES = {'char_count', 'word_count_total'}
+
+# --era-labels: before ChatGPT's public release is 0, from the start of 2025 on is 1
+LLM_ERA_START = '2022-11-30'
+POSITIVE_ERA_START = '2025-01-01'
+
+EPOCHS = 300
+LEARNING_RATE = 0.5
+L2 = 1e-4
+
+# Share of labelled reports held out (by URL hash, so the split is stable) to report accuracy and AUC
+HOLDOUT_SHARE = 0.2
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Odd 32-bit constant mixing consecutive token hashes into an n-gram hash
+NGRAM_MULTIPLIER = 0x9E3779B1
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("The slop score requires numpy (pip install numpy)")
+    return numpy
+
+
+def ngram_buckets(text: str, bits: int = HASH_BITS, sizes: Sequence[int] = NGRAM_SIZES) -> Dict[int, float]:
+    """Signed hashed n-gram counts of a text, as bucket -> count
+
+    Tokens are hashed once with CRC32 (stable across processes) and longer n-grams combine their
+    token hashes, so no n-gram strings are built.
+    """
+    hashes = [zlib.crc32(token.encode('utf-8')) for token in TOKEN_RE.findall(text.lower())]
+    grams: List[int] = []
+    for size in sizes:
+        if size == 1:
+            grams.extend(hashes)
+            continue
+        combined = hashes[:len(hashes) - size + 1]
+        for offset in range(1, size):
+            combined = [(h * NGRAM_MULTIPLIER ^ nxt) & 0xFFFFFFFF for h, nxt in zip(combined, hashes[offset:])]
+        grams.extend(combined)
+
+    # The top bit picks the sign, so colliding n-grams tend to cancel rather than add up
+    mask = (1 << bits) - 1
+    counts: Dict[int, float] = {}
+    for key, count in Counter(h & mask if h >> 31 else ~(h & mask) for h in grams).items():
+        bucket, sign = (key, 1.0) if key >= 0 else (~key, -1.0)
+        counts[bucket] = counts.get(bucket, 0.0) + sign * count
+    return counts
+
+
+class SparseBatch:
+    """CSR rows of sublinear-tf, L2-normalised hashed n-grams plus a dense feature matrix"""
+
+    def __init__(self, texts: Sequence[str], bits: int = HASH_BITS, sizes: Sequence[int] = NGRAM_SIZES):
+        np = _numpy()
+        indptr, indices, counts = [0], [], []
+        for text in texts:
+            buckets = ngram_buckets(text, bits, sizes)
+            indices.extend(buckets)
+            counts.extend(buckets.values())
+            indptr.append(len(indices))
+        self.rows = len(texts)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.row_ids = np.repeat(np.arange(self.rows), np.diff(self.indptr))
+
+        counts = np.asarray(counts, dtype=np.float64)
+        magnitudes = np.abs(counts)
+        data = np.sign(counts) * (1 + np.log(np.where(magnitudes > 0, magnitudes, 1)))
+        norms = np.sqrt(np.bincount(self.row_ids, weights=data * data, minlength=self.rows))
+        norms[norms == 0] = 1.0
+        self.data = data / norms[self.row_ids]
+
+    def dot(self, weights):
+        """X @ w"""
+        np = _numpy()
+        return np.bincount(self.row_ids, weights=self.data * weights[self.indices], minlength=self.rows)
+
+    def transpose_dot(self, residuals, size: int):
+        """X.T @ r"""
+        np = _numpy()
+        return np.bincount(self.indices, weights=self.data * residuals[self.row_ids], minlength=size)
+
+
+def dense_features(records: Sequence[Dict[str, Any]]):
+    np = _numpy()
+    rows = []
+    for record in records:
+        features = extract_features(record) if record.get('original_report') else {}
+        rows.append([
+            math.log1p(features.get(name) or 0.0) if name in LOG_FEATURES else float(features.get(name) or 0.0)
+            for name in DENSE_FEATURES
+        ])
+    return np.asarray(rows, dtype=np.float64).reshape(len(records), len(DENSE_FEATURES))
+
+
+def sigmoid(values):
+    np = _numpy()
+    return 1.0 / (1.0 + np.exp(-np.clip(values, -35, 35)))
+
+
+def auc(labels, scores) -> Optional[float]:
+    """Area under the ROC curve from score ranks (ties averaged)"""
+    np = _numpy()
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+    if not positives or not negatives:
+        return None
+    order = np.argsort(scores, kind='mergesort')
+    ranks = np.empty(len(scores))
+    sorted_scores = scores[order]
+    i = 0
+    while i < len(scores):
+        j = i
+        while j + 1 < len(scores) and sorted_scores[j + 1] == sorted_scores[i]:
+            j += 1
+        ranks[order[i:j + 1]] = (i + j) / 2 + 1
+        i = j + 1
+    return float((ranks[labels == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+class SlopModel:
+    """Logistic regression weights over hashed n-grams and standardised dense features"""
+
+    def __init__(self, sparse_weights, dense_weights, bias: float, mean, std, metadata: Dict[str, Any]):
+        self.sparse_weights = sparse_weights
+        self.dense_weights = dense_weights
+        self.bias = bias
+        self.mean = mean
+        self.std = std
+        self.metadata = metadata
+
+    @classmethod
+    def train(cls, records: Sequence[Dict[str, Any]], labels: Sequence[int], epochs: int = EPOCHS,
+              learning_rate: float = LEARNING_RATE, l2: float = L2, metadata: Optional[Dict[str, Any]] = None) -> 'SlopModel':
+        """Full-batch gradient descent on the class-balanced log loss"""
+        np = _numpy()
+        size = 1 << HASH_BITS
+        y = np.asarray(labels, dtype=np.float64)
+        sparse = SparseBatch([record.get('original_report') or '' for record in records])
+        dense = dense_features(records)
+        mean, std = dense.mean(axis=0), dense.std(axis=0)
+        std[std == 0] = 1.0
+        dense = (dense - mean) / std
+
+        # Each class contributes half of the loss, however unbalanced the labels are
+        positives = max(y.sum(), 1.0)
+        negatives = max(len(y) - y.sum(), 1.0)
+        sample_weights = np.where(y == 1, 0.5 / positives, 0.5 / negatives)
+
+        sparse_weights = np.zeros(size)
+        dense_weights = np.zeros(dense.shape[1])
+        bias = 0.0
+        for _ in range(epochs):
+            predictions = sigmoid(sparse.dot(sparse_weights) + dense @ dense_weights + bias)
+            residuals = (predictions - y) * sample_weights
+            sparse_weights -= learning_rate * (sparse.transpose_dot(residuals, size) + l2 * sparse_weights)
+            dense_weights -= learning_rate * (dense.T @ residuals + l2 * dense_weights)
+            bias -= learning_rate * residuals.sum()
+
+        metadata = dict(metadata or {})
+        metadata.update({
+            'hash_bits': HASH_BITS,
+            'ngram_sizes': list(NGRAM_SIZES),
+            'dense_features': DENSE_FEATURES,
+            'trained_at': time.time(),
+            'train_reports': len(y),
+            'train_positives': int(y.sum()),
+        })
+        return cls(sparse_weights, dense_weights, float(bias), mean, std, metadata)
+
+    def score_batch(self, records: Sequence[Dict[str, Any]]):
+        """Slop probability of each report, scored as one vectorized batch"""
+        if not records:
+            return _numpy().zeros(0)
+        sparse = SparseBatch([record.get('original_report') or '' for record in records],
+                             self.metadata['hash_bits'], self.metadata['ngram_sizes'])
+        dense = (dense_features(records) - self.mean) / self.std
+        return sigmoid(sparse.dot(self.sparse_weights) + dense @ self.dense_weights + self.bias)
+
+    def save(self, path: str = MODEL_FILE) -> None:
+        np = _numpy()
+        np.savez_compressed(
+            path, sparse_weights=self.sparse_weights, dense_weights=self.dense_weights,
+            bias=np.asarray(self.bias), mean=self.mean, std=self.std,
+            metadata=np.asarray(json.dumps(self.metadata)),
+        )
+
+    @classmethod
+    def load(cls, path: str = MODEL_FILE) -> 'SlopModel':
+        np = _numpy()
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            if metadata.get('dense_features') != DENSE_FEATURES:
+                raise ValueError(f"{path} was trained on features {metadata.get('dense_features')}, retrain it")
+            return cls(data['sparse_weights'], data['dense_weights'], float(data['bias']),
+                       data['mean'], data['std'], metadata)
+
+
+def load_labels(filepath: str) -> Dict[str, int]:
+    """url -> 0/1 from a CSV with url and label columns"""
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        return {row['url']: int(row['label']) for row in csv.DictReader(f) if row.get('url') and row.get('label')}
+
+
+def era_label(record: Dict[str, Any]) -> Optional[int]:
+    date = report_date(record)
+    if date is None:
+        return None
+    if date < LLM_ERA_START:
+        return 0
+    if date >= POSITIVE_ERA_START:
+        return 1
+    return None
+
+
+def labelled_reports(records: Iterable[Dict[str, Any]], labels: Optional[Dict[str, int]],
+                     era_labels: bool) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Reports with a body and a label; explicit labels win over era labels"""
+    selected, targets = [], []
+    for record in records:
+        if not record.get('url') or not record.get('original_report'):
+            continue
+        label = labels.get(record['url']) if labels else None
+        if label is None and era_labels:
+            label = era_label(record)
+        if label is not None:
+            selected.append(record)
+            targets.append(label)
+    return selected, targets
+
+
+def is_holdout(url: str) -> bool:
+    return hashlib.sha256(url.encode('utf-8')).digest()[0] < 256 * HOLDOUT_SHARE
+
+
+def score_reports(model: SlopModel, records: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Iterable[Tuple[str, float]]:
+    """Yield (url, score) for every report with a body, scoring batch_size reports at a time"""
+    batch = []
+    for record in records:
+        if record.get('url') and record.get('original_report'):
+            batch.append(record)
+        if len(batch) >= batch_size:
+            yield from zip([record['url'] for record in batch], model.score_batch(batch).tolist())
+            batch = []
+    if batch:
+        yield from zip([record['url'] for record in batch], model.score_batch(batch).tolist())
+
+
+def write_scores(scores: Iterable[Tuple[str, float]], filepath: str = SCORES_FILE) -> int:
+    count = 0
+    with open(filepath, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['url', 'slop_score'])
+        for url, score in scores:
+            writer.writerow([url, round(score, 6)])
+            count += 1
+    return count
+
+
+def load_scores(filepath: str = SCORES_FILE) -> Dict[str, str]:
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        return {row['url']: row['slop_score'] for row in csv.DictReader(f)}
+
+
+def update_scores(scores: Iterable[Tuple[str, float]], filepath: str = SCORES_FILE) -> int:
+    """Replace or add the given reports' rows in an existing score table; returns the rows written"""
+    table = load_scores(filepath)
+    count = 0
+    for url, score in scores:
+        table[url] = round(score, 6)
+        count += 1
+    if count:
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['url', 'slop_score'])
+            writer.writerows(table.items())
+        os.replace(tmp_path, filepath)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or apply the per-report slop score model")
+    parser.add_argument('--model', default=MODEL_FILE, help="Saved model (.npz)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = commands.add_parser('train', help="Fit the model on labelled reports and save it")
+    train.add_argument('--input', default=COMBINED_FILE, help="Merged reports (.json array or .jsonl)")
+    train.add_argument('--labels', help="CSV with url and label (1 = slop, 0 = genuine) columns")
+    train.add_argument('--era-labels', action='store_true',
+                       help=f"Label unlabelled reports by date: before {LLM_ERA_START} = 0, from {POSITIVE_ERA_START} = 1")
+    train.add_argument('--epochs', type=int, default=EPOCHS)
+
+    score = commands.add_parser('score', help="Score every report and write the score table")
+    score.add_argument('--input', default=COMBINED_FILE, help="Merged reports (.json array or .jsonl)")
+    score.add_argument('--output', default=SCORES_FILE, help="Score table (CSV keyed by url)")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    if args.command == 'score':
+        model = SlopModel.load(args.model)
+        count = write_scores(score_reports(model, iter_latest_records(args.input)), args.output)
+        print(f"Scored {count} reports in {time.time() - start_time:.2f}s, wrote {args.output}")
+        return
+
+    if not args.labels and not args.era_labels:
+        parser.error("train needs --labels, --era-labels or both")
+    labels = load_labels(args.labels) if args.labels else None
+    records, targets = labelled_reports(iter_latest_records(args.input), labels, args.era_labels)
+    if len(set(targets)) < 2:
+        parser.error(f"Need both labels to train, got {len(targets)} reports labelled {sorted(set(targets))}")
+
+    holdout = [is_holdout(record['url']) for record in records]
+    train_records = [record for record, held in zip(records, holdout) if not held]
+    train_targets = [target for target, held in zip(targets, holdout) if not held]
+    label_source = ('labels' if args.labels else '') + ('+era' if args.era_labels else '')
+    model = SlopModel.train(train_records, train_targets, epochs=args.epochs,
+                            metadata={'label_source': label_source.strip('+')})
+    print(f"Trained on {len(train_records)} reports ({sum(train_targets)} labelled slop) "
+          f"in {time.time() - start_time:.2f}s")
+
+    test_records = [record for record, held in zip(records, holdout) if held]
+    if test_records:
+        np = _numpy()
+        test_targets = np.asarray([target for target, held in zip(targets, holdout) if held])
+        predictions = model.score_batch(test_records)
+        accuracy = float(((predictions >= 0.5) == (test_targets == 1)).mean())
+        area = auc(test_targets, predictions)
+        model.metadata.update({'holdout_reports': len(test_records), 'holdout_accuracy': accuracy, 'holdout_auc': area})
+        auc_text = f"{area:.3f}" if area is not None else "n/a (one class only)"
+        print(f"Holdout of {len(test_records)} reports: accuracy {accuracy:.3f}, AUC {auc_text}")
+
+    model.save(args.model)
+    print(f"Saved model to {args.model}")
+
+
+if __name__ == "__main__":
+    main()
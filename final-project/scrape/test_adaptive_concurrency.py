@@ -0,0 +1,156 @@
+"""
+Drives the adaptive concurrency controller with synthetic observations and against fixture_server.py
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from urllib.request import urlopen
+
+import pytest
+
+pytest.importorskip('scrapy')
+
+from scrapy import Request
+from scrapy.utils.test import get_crawler
+
+from adaptive_concurrency import AdaptiveConcurrency, ConcurrencyController, is_overload_error
+from fixture_server import FixtureCorpus, FixtureServer
+
+REPORTS = [{'team': 'curl', 'title': f'Report {n}', 'url': f'https://hackerone.com/reports/{n}'} for n in range(1, 9)]
+CONTENT = [{'url': report['url'], 'original_report': f"Body of {report['title']}"} for report in REPORTS]
+
+
+def observe_window(controller, latencies, errors=()):
+    for latency in latencies:
+        controller.observe(latency)
+    for error in errors:
+        controller.observe(error=is_overload_error(error))
+    return controller.decide()
+
+
+def test_adds_one_page_per_window_up_to_the_maximum():
+    controller = ConcurrencyController(start=1, maximum=4, target_p95=1.0)
+    levels = [observe_window(controller, [0.1] * 8)['to'] for _ in range(5)]
+    assert levels == [2, 3, 4, 4, 4]
+
+
+def test_waits_for_enough_finished_requests():
+    controller = ConcurrencyController(start=2, min_samples=4)
+    assert observe_window(controller, [0.1] * 3) is None
+    assert controller.concurrency == 2
+
+
+def test_halves_when_p95_latency_exceeds_target():
+    controller = ConcurrencyController(start=8, maximum=8, target_p95=1.0)
+    # One slow request in 20 is still under the nearest-rank p95, two are not
+    assert observe_window(controller, [0.2] * 19 + [5.0])['to'] == 8
+    decision = observe_window(controller, [0.2] * 18 + [5.0] * 2)
+    assert (decision['from'], decision['to']) == (8, 4)
+    assert 'p95' in decision['reason']
+
+
+@pytest.mark.parametrize('error', [
+    TimeoutError('timed out'),
+    Exception('Connection closed'),
+    Exception('Target closed'),
+    Exception('net::ERR_EMPTY_RESPONSE at http://127.0.0.1/reports/1'),
+])
+def test_halves_on_overload_errors_down_to_the_minimum(error):
+    controller = ConcurrencyController(start=6, minimum=2, maximum=8)
+    levels = [observe_window(controller, [0.1] * 4, [error] * 2)['to'] for _ in range(3)]
+    assert levels == [3, 2, 2]
+
+
+def test_ignores_errors_that_are_not_overload():
+    controller = ConcurrencyController(start=2, maximum=8)
+    decision = observe_window(controller, [0.1] * 4, [ValueError('Expecting value: line 1 column 1')])
+    assert decision['errors'] == 0
+    assert decision['to'] == 3
+
+
+def fetch_window(controller, server, requests=8, timeout=5.0):
+    """Fetch report pages at the controller's concurrency, feed it each outcome and let it decide"""
+    def fetch(n):
+        start = time.perf_counter()
+        try:
+            with urlopen(f'{server.base_url}/reports/{n % len(REPORTS) + 1}', timeout=timeout) as response:
+                response.read()
+        except Exception as e:
+            return None, e
+        return time.perf_counter() - start, None
+
+    with ThreadPoolExecutor(max_workers=controller.concurrency) as pool:
+        for latency, error in pool.map(fetch, range(requests)):
+            if error is None:
+                controller.observe(latency)
+            else:
+                controller.observe(error=is_overload_error(error))
+    return controller.decide()
+
+
+@pytest.fixture
+def server():
+    server = FixtureServer(FixtureCorpus(REPORTS, CONTENT), port=0, seed=1).start_background()
+    yield server
+    server.shutdown()
+
+
+def test_follows_latency_and_dropped_connections_from_the_fixture_server(server):
+    controller = ConcurrencyController(start=1, maximum=4, target_p95=0.25)
+
+    assert [fetch_window(controller, server)['to'] for _ in range(3)] == [2, 3, 4]
+
+    server.latency = 0.4
+    decision = fetch_window(controller, server)
+    assert (decision['from'], decision['to'], decision['errors']) == (4, 2, 0)
+
+    server.latency = 0.0
+    server.drop_rate = 1.0
+    decision = fetch_window(controller, server)
+    assert (decision['from'], decision['to'], decision['errors']) == (2, 1, 8)
+
+
+def adaptive_extension(start=2):
+    crawler = get_crawler(settings_dict={
+        'ADAPTIVE_CONCURRENCY_ENABLED': True,
+        'ADAPTIVE_CONCURRENCY_MAX': 8,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': start,
+    })
+    crawler.engine = SimpleNamespace(downloader=SimpleNamespace(slots={}, DOWNLOAD_SLOT='download_slot'))
+    return AdaptiveConcurrency.from_crawler(crawler)
+
+
+def test_extension_brings_new_slots_to_the_current_level():
+    extension = adaptive_extension(start=2)
+    extension.controller.concurrency = 5
+    slots = extension.crawler.engine.downloader.slots
+    slots['127.0.0.1'] = SimpleNamespace(concurrency=2)
+
+    extension.request_reached_downloader(Request('http://127.0.0.1/', meta={'download_slot': '127.0.0.1'}), None)
+    assert slots['127.0.0.1'].concurrency == 5
+
+
+def test_extension_halves_every_slot_on_download_exceptions():
+    extension = adaptive_extension(start=4)
+    slots = extension.crawler.engine.downloader.slots
+    slots.update({'a': SimpleNamespace(concurrency=4), 'b': SimpleNamespace(concurrency=4)})
+    for n in range(4):
+        request = Request(f'http://a/{n}')
+        extension.request_reached_downloader(request, None)
+        extension.response_received(SimpleNamespace(), request, None)
+    extension.crawler.stats.set_value('downloader/exception_count', 2)
+
+    extension.adjust()
+    assert extension.controller.history[-1]['errors'] == 2
+    assert [slot.concurrency for slot in slots.values()] == [2, 2]
+
+
+def test_extension_counts_render_failures_as_finished_requests():
+    extension = adaptive_extension(start=4)
+    for _ in range(4):
+        extension.render_failed(Exception('Timeout 30000ms exceeded'))
+    extension.render_failed(Exception('No report body found'))
+
+    decision = extension.controller.decide()
+    assert (decision['requests'], decision['errors'], decision['to']) == (4, 4, 2)
@@ -0,0 +1,95 @@
+"""
+Runs the report spider's JSON fetch mode, and its fallback to rendering, against fixture_server.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('scrapy')
+pytest.importorskip('scrapy_playwright')
+
+from fixture_server import FixtureCorpus, FixtureServer
+from html_convert import json_to_markdown
+from report_store import CONTENT_JSON_FILE, REPORTS_FILE
+
+SPIDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hackerone_scraper_reports.py')
+
+REPORTS = [
+    {'team': 'curl', 'title': f'Report {n}', 'url': f'https://hackerone.com/reports/{n}',
+     'hacktivity_metadata': {'date': 'October 1, 2025, 12:00pm UTC'}}
+    for n in (101, 102, 103)
+]
+BODIES = {
+    'https://hackerone.com/reports/101': "## Summary\n\nA *buffer overflow* in `curl_easy_setopt`.",
+    'https://hackerone.com/reports/102': "Steps:\n\n- build curl\n- run `curl -v`\n\nNo crash.",
+    'https://hackerone.com/reports/103': "Plain text report with no markup at all.",
+}
+
+
+class RecordingCorpus(FixtureCorpus):
+    """Fixture corpus that remembers which representation of each report was served"""
+
+    def __init__(self, *args, missing_json=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.missing_json = set(missing_json)
+        self.served = []
+
+    def report_json(self, path):
+        self.served.append(('json', path))
+        return None if path in self.missing_json else super().report_json(path)
+
+    def report_page(self, path):
+        self.served.append(('page', path))
+        return super().report_page(path)
+
+
+def chromium_available():
+    from playwright.sync_api import sync_playwright
+
+    try:
+        with sync_playwright() as playwright:
+            playwright.chromium.launch(headless=True, args=['--no-sandbox']).close()
+    except Exception:
+        return False
+    return True
+
+
+def crawl(tmp_path, corpus, fetch_mode):
+    """Run the spider in tmp_path against a fixture server and return its content output by URL"""
+    with open(tmp_path / REPORTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(REPORTS, f)
+    server = FixtureServer(corpus, port=0).start_background()
+    try:
+        subprocess.run([sys.executable, SPIDER, '--fetch-mode', fetch_mode, '--base-url', server.base_url],
+                       cwd=tmp_path, check=True, timeout=300, capture_output=True)
+    finally:
+        server.shutdown()
+    with open(tmp_path / CONTENT_JSON_FILE, encoding='utf-8') as f:
+        return {record['url']: record['original_report'] for record in json.load(f)}
+
+
+def fixture_corpus(**kwargs):
+    return RecordingCorpus(REPORTS, [{'url': url, 'original_report': body} for url, body in BODIES.items()], **kwargs)
+
+
+def test_json_mode_fetches_every_body_without_rendering(tmp_path):
+    corpus = fixture_corpus()
+    content = crawl(tmp_path, corpus, 'json')
+
+    assert content == {url: json_to_markdown({'vulnerability_information': body}) for url, body in BODIES.items()}
+    assert sorted(corpus.served) == [('json', f'/reports/{n}') for n in (101, 102, 103)]
+
+
+@pytest.mark.skipif(not chromium_available(), reason="Playwright's chromium is not installed")
+def test_json_failure_falls_back_to_rendering_the_page(tmp_path):
+    corpus = fixture_corpus(missing_json={'/reports/102'})
+    content = crawl(tmp_path, corpus, 'json')
+
+    assert set(content) == set(BODIES)
+    assert ('page', '/reports/102') in corpus.served
+    assert not any(kind == 'page' and path != '/reports/102' for kind, path in corpus.served)
+    assert 'build curl' in content['https://hackerone.com/reports/102']
@@ -0,0 +1,160 @@
+"""
+Full-corpus typo scoring: every unique word is spell-checked once and the verdict memoized on disk
+"""
+
+import logging
+import os
+import re
+import sqlite3
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SPELL_CACHE_FILE = 'hackerone_spell_cache.sqlite3'
+ALLOWLIST_FILE = 'technical_terms.txt'
+
+# Same tokenisation as count_typos() in analysis.r: alphabetic words longer than two letters. '_' and
+# digits are word characters for \b, so identifiers such as CURLOPT_URL never yield a word
+ALPHA_WORD_RE = re.compile(r'\b[A-Za-z]+\b')
+MIN_WORD_LENGTH = 3
+
+
+def candidate_words(text: str):
+    """Words that count_typos() would spell-check"""
+    return [word for word in ALPHA_WORD_RE.findall(text) if len(word) >= MIN_WORD_LENGTH]
+
+
+def load_allowlist(path: str = ALLOWLIST_FILE) -> Set[str]:
+    """Lower-cased technical terms (curl options, protocols, ...) that are never counted as typos"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        terms = (line.split('#', 1)[0].strip().lower() for line in f)
+        return {term for term in terms if term}
+
+
+def build_checker(backend: Optional[str] = None, wordlist: Optional[str] = None) -> Tuple[str, Callable[[str], bool]]:
+    """Return (name, check) for the first available spell-checking backend
+
+    'enchant' wraps the hunspell C library (as R's hunspell package does), 'spylls' is a pure-Python
+    hunspell port shipping the same en_US dictionary, and 'wordlist' checks against a plain word list.
+    """
+    if wordlist:
+        backend = 'wordlist'
+
+    if backend in (None, 'enchant'):
+        try:
+            import enchant
+        except ImportError:
+            if backend == 'enchant':
+                raise
+        else:
+            try:
+                dictionary = enchant.Dict('en_US')
+                logger.info("Spell-checking with enchant (hunspell en_US)")
+                return 'enchant:en_US', dictionary.check
+            except enchant.errors.Error as e:
+                if backend == 'enchant':
+                    raise
+                logger.warning(f"enchant is installed but has no en_US dictionary ({e}); falling back, "
+                               f"so verdicts may differ from R's hunspell")
+
+    if backend in (None, 'spylls'):
+        try:
+            import spylls.hunspell
+            data_dir = os.path.join(os.path.dirname(spylls.hunspell.__file__), 'data', 'en', 'en_US')
+            dictionary = spylls.hunspell.Dictionary.from_files(data_dir)
+            logger.info("Spell-checking with spylls (pure-Python hunspell, en_US)")
+            return 'spylls:en_US', dictionary.lookup
+        except ImportError:
+            if backend == 'spylls':
+                raise
+
+    wordlist = wordlist or '/usr/share/dict/words'
+    if not os.path.exists(wordlist):
+        raise RuntimeError("No spell checker available: install pyenchant or spylls, or pass a word list")
+    with open(wordlist, 'r', encoding='utf-8') as f:
+        words = {line.strip().lower() for line in f if line.strip()}
+    logger.warning(f"Spell-checking against the word list {wordlist}; verdicts will differ from R's hunspell")
+    return f'wordlist:{os.path.basename(wordlist)}', lambda word: word.lower() in words
+
+
+class SpellCache:
+    """Persistent word -> verdict memo, kept per checker so switching dictionaries never reuses verdicts"""
+
+    def __init__(self, path: str = SPELL_CACHE_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spell_verdicts (
+                checker TEXT NOT NULL,
+                word TEXT NOT NULL,
+                correct INTEGER NOT NULL,
+                PRIMARY KEY (checker, word)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def load(self, checker: str) -> Dict[str, bool]:
+        rows = self.conn.execute("SELECT word, correct FROM spell_verdicts WHERE checker = ?", (checker,))
+        return {word: bool(correct) for word, correct in rows}
+
+    def store(self, checker: str, verdicts: Dict[str, bool]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO spell_verdicts (checker, word, correct) VALUES (?, ?, ?)",
+            [(checker, word, int(correct)) for word, correct in verdicts.items()],
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class TypoScorer:
+    """Scores reports by misspelled words after checking the corpus vocabulary once"""
+
+    def __init__(self, checker_name: str, check: Callable[[str], bool], cache: SpellCache,
+                 allowlist: Optional[Set[str]] = None):
+        self.checker_name = checker_name
+        self.check = check
+        self.cache = cache
+        self.allowlist = allowlist or set()
+        self.verdicts = cache.load(checker_name)
+        self.checked = 0
+
+    def prime(self, texts: Iterable[str]) -> int:
+        """Spell-check every not-yet-memoized word of the corpus once; returns how many were checked"""
+        vocabulary = set()
+        for text in texts:
+            vocabulary.update(candidate_words(text))
+
+        # Allowlisted terms are applied at scoring time, so the memo only ever holds dictionary verdicts
+        new_verdicts = {
+            word: bool(self.check(word))
+            for word in vocabulary
+            if word not in self.verdicts and word.lower() not in self.allowlist
+        }
+        self.verdicts.update(new_verdicts)
+        self.cache.store(self.checker_name, new_verdicts)
+        self.checked += len(new_verdicts)
+        return len(new_verdicts)
+
+    def is_typo(self, word: str) -> bool:
+        if word.lower() in self.allowlist:
+            return False
+        correct = self.verdicts.get(word)
+        if correct is None:
+            correct = bool(self.check(word))
+            self.verdicts[word] = correct
+        return not correct
+
+    def score(self, text: str) -> int:
+        """Number of misspelled words in a report"""
+        return sum(1 for word in candidate_words(text) if self.is_typo(word))
+
+
+def open_typo_scorer(backend: Optional[str] = None, wordlist: Optional[str] = None,
+                     cache_path: str = SPELL_CACHE_FILE, allowlist_path: str = ALLOWLIST_FILE) -> TypoScorer:
+    checker_name, check = build_checker(backend, wordlist)
+    return TypoScorer(checker_name, check, SpellCache(cache_path), load_allowlist(allowlist_path))